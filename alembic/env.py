@@ -5,6 +5,7 @@ from sqlalchemy import engine_from_config, pool
 from alembic import context
 from app.config import settings
 from app.db.base import BaseModel
+from app.db.migrations import configure_lock_timeout
 from app.models.order import *  # noqa
 from app.models.product import *  # noqa
 
@@ -28,7 +29,9 @@ target_metadata = BaseModel.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
-config.set_main_option("sqlalchemy.url", settings.db_url)
+# "-x db_url=..." migrates another database than the configured one, e.g. in tests
+db_url = context.get_x_argument(as_dictionary=True).get("db_url", settings.db_url)
+config.set_main_option("sqlalchemy.url", db_url.replace("%", "%%"))
 
 
 def run_migrations_offline() -> None:
@@ -69,7 +72,15 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        # Online schema changes, see app.db.migrations: DDL gives up on locks it
+        # cannot get quickly, and each revision commits on its own so a failed
+        # revision can be retried without redoing the ones before it
+        configure_lock_timeout(connection, settings.MIGRATION_LOCK_TIMEOUT_MS)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            transaction_per_migration=True,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,53 @@
+"""Add product stock shards
+
+Revision ID: 4c2f9a7d1e3b
+Revises: b866b8fb9814
+Create Date: 2026-10-19 10:12:31.402117
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4c2f9a7d1e3b"
+down_revision: Union[str, None] = "b866b8fb9814"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "products",
+        sa.Column("stock_shards", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.create_table(
+        "product_stock_shards",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("stock", sa.Integer(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["product_id"],
+            ["products.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("product_id", "shard"),
+    )
+    op.create_index(
+        op.f("ix_product_stock_shards_id"),
+        "product_stock_shards",
+        ["id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_product_stock_shards_id"), table_name="product_stock_shards")
+    op.drop_table("product_stock_shards")
+    op.drop_column("products", "stock_shards")
@@ -0,0 +1,30 @@
+"""Index order item foreign keys
+
+Revision ID: 6d3a8e2f4b17
+Revises: 9e1b7c3a5f20
+Create Date: 2026-10-19 15:42:08.513277
+
+"""
+
+from typing import Sequence, Union
+
+from app.db.migrations import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = "6d3a8e2f4b17"
+down_revision: Union[str, None] = "9e1b7c3a5f20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Order lookups load items by order, product deletes check for order items
+    create_index_concurrently("ix_order_items_order_id", "order_items", ["order_id"])
+    create_index_concurrently(
+        "ix_order_items_product_id", "order_items", ["product_id"]
+    )
+
+
+def downgrade() -> None:
+    drop_index_concurrently("ix_order_items_product_id", "order_items")
+    drop_index_concurrently("ix_order_items_order_id", "order_items")
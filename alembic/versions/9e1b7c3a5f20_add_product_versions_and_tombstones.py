@@ -0,0 +1,71 @@
+"""Add product change versions and tombstones
+
+Revision ID: 9e1b7c3a5f20
+Revises: 4c2f9a7d1e3b
+Create Date: 2026-10-19 11:03:47.215904
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+from app.db.migrations import (
+    backfill,
+    create_index_concurrently,
+    drop_index_concurrently,
+    set_not_null,
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "9e1b7c3a5f20"
+down_revision: Union[str, None] = "4c2f9a7d1e3b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    postgresql = op.get_bind().dialect.name == "postgresql"
+    if postgresql:
+        op.execute(sa.schema.CreateSequence(sa.Sequence("product_change_seq")))
+
+    op.add_column("products", sa.Column("version", sa.BigInteger(), nullable=True))
+    # Existing rows get versions batch by batch in id order, without locking the
+    # whole table
+    version = "nextval('product_change_seq')" if postgresql else "id"
+    backfill("products", {"version": version}, where="version IS NULL")
+    set_not_null("products", "version", sa.BigInteger())
+    create_index_concurrently("ix_products_version", "products", ["version"])
+
+    op.create_table(
+        "product_tombstones",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_product_tombstones_id"), "product_tombstones", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_product_tombstones_version"),
+        "product_tombstones",
+        ["version"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_product_tombstones_version"), table_name="product_tombstones"
+    )
+    op.drop_index(op.f("ix_product_tombstones_id"), table_name="product_tombstones")
+    op.drop_table("product_tombstones")
+    drop_index_concurrently("ix_products_version", "products")
+    with op.batch_alter_table("products") as batch:
+        batch.drop_column("version")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(sa.schema.DropSequence(sa.Sequence("product_change_seq")))
@@ -0,0 +1,40 @@
+"""Add customer-facing order references
+
+Revision ID: a7c4e9f2b318
+Revises: 6d3a8e2f4b17
+Create Date: 2026-10-19 17:26:51.094618
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+from app.db.migrations import (
+    backfill,
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c4e9f2b318"
+down_revision: Union[str, None] = "6d3a8e2f4b17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("orders", sa.Column("reference", sa.String(length=16), nullable=True))
+    # Orders placed by workers still running the previous release stay without a
+    # reference; rerun the backfill once they are gone before making it NOT NULL
+    backfill("orders", {"reference": "'ORD-' || id"}, where="reference IS NULL")
+    create_index_concurrently(
+        "ix_orders_reference", "orders", ["reference"], unique=True
+    )
+
+
+def downgrade() -> None:
+    drop_index_concurrently("ix_orders_reference", "orders")
+    with op.batch_alter_table("orders") as batch:
+        batch.drop_column("reference")
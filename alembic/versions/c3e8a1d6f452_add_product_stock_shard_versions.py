@@ -0,0 +1,52 @@
+"""Add change versions to product stock shards
+
+Revision ID: c3e8a1d6f452
+Revises: a7c4e9f2b318
+Create Date: 2026-10-20 10:14:22.730519
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+from app.db.migrations import (
+    backfill,
+    create_index_concurrently,
+    drop_index_concurrently,
+    set_not_null,
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e8a1d6f452"
+down_revision: Union[str, None] = "a7c4e9f2b318"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "product_stock_shards", sa.Column("version", sa.BigInteger(), nullable=True)
+    )
+    # Existing shards get versions after every change so far, so sync clients
+    # re-read sharded products once and pick up stock they missed
+    if op.get_bind().dialect.name == "postgresql":
+        version = "nextval('product_change_seq')"
+    else:
+        version = (
+            "(SELECT coalesce(max(version), 0) FROM ("
+            "SELECT max(version) AS version FROM products "
+            "UNION ALL SELECT max(version) FROM product_tombstones)) + id"
+        )
+    backfill("product_stock_shards", {"version": version}, where="version IS NULL")
+    set_not_null("product_stock_shards", "version", sa.BigInteger())
+    create_index_concurrently(
+        "ix_product_stock_shards_version", "product_stock_shards", ["version"]
+    )
+
+
+def downgrade() -> None:
+    drop_index_concurrently("ix_product_stock_shards_version", "product_stock_shards")
+    with op.batch_alter_table("product_stock_shards") as batch:
+        batch.drop_column("version")
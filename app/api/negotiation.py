@@ -0,0 +1,140 @@
+"""
+Response format negotiation.
+
+Routes return JSON by default. Clients can ask for a more compact encoding through
+the ``Accept`` header:
+
+* ``application/msgpack``: MessagePack, needs the optional ``msgpack`` package
+* ``application/vnd.ecommerce.columnar+json``: JSON with the keys listed once,
+  ``{"columns": [...], "rows": [[...], ...]}``
+"""
+
+import json
+from typing import Any, List, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+COLUMNAR = "application/vnd.ecommerce.columnar+json"
+
+_ALIASES = {"application/x-msgpack": MSGPACK}
+
+
+def available_formats() -> List[str]:
+    """Media types this server can produce, in order of preference on ties."""
+    formats = [JSON, COLUMNAR]
+    if msgpack is not None:
+        formats.insert(1, MSGPACK)
+    return formats
+
+
+def _parse_accept(header: str) -> List[Tuple[str, float]]:
+    """Split an Accept header into (media type, quality) pairs."""
+    accepted = []
+    for part in header.split(","):
+        media_type, *params = (item.strip() for item in part.split(";"))
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted.append((_ALIASES.get(media_type.lower(), media_type.lower()), quality))
+    return accepted
+
+
+def choose_format(accept: Optional[str]) -> str:
+    """
+    Pick the response media type for an Accept header.
+
+    Falls back to JSON when the header is missing or names nothing we can produce.
+
+    Args:
+        accept: Value of the Accept header
+
+    Returns:
+        One of JSON, MSGPACK or COLUMNAR
+    """
+    if not accept:
+        return JSON
+
+    formats = available_formats()
+    best, best_quality = JSON, 0.0
+    for media_type, quality in _parse_accept(accept):
+        if media_type in formats and quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+def to_columnar(data: Any) -> dict:
+    """
+    Convert a list of objects, or a single object, into the columnar layout.
+    """
+    rows = data if isinstance(data, list) else [data]
+    columns = list(rows[0]) if rows else []
+    return {"columns": columns, "rows": [[row[key] for key in columns] for row in rows]}
+
+
+def render(adapter: TypeAdapter, value: Any, media_type: str) -> bytes:
+    """
+    Serialise an already validated value in the requested format.
+
+    Args:
+        adapter: TypeAdapter for the response schema
+        value: Instance(s) of the response schema
+        media_type: Format returned by choose_format
+
+    Returns:
+        Serialised body
+    """
+    if media_type == JSON:
+        return adapter.dump_json(value)
+
+    data = adapter.dump_python(value, mode="json")
+    if media_type == MSGPACK:
+        return msgpack.packb(data)
+    return json.dumps(to_columnar(data), separators=(",", ":")).encode()
+
+
+def negotiated_response(
+    request: Request,
+    adapter: TypeAdapter,
+    value: Any,
+    status_code: int = 200,
+    body: Optional[bytes] = None,
+) -> Response:
+    """
+    Build a response in the format the client asked for.
+
+    Args:
+        request: Incoming request, its Accept header selects the format
+        adapter: TypeAdapter for the response schema
+        value: ORM object(s) or schema instance(s) to return
+        status_code: HTTP status of the response
+        body: Pre-rendered body in the negotiated format, e.g. from a cache
+
+    Returns:
+        Response with the matching Content-Type and ``Vary: Accept``
+    """
+    media_type = choose_format(request.headers.get("accept"))
+    if body is None:
+        body = render(
+            adapter, adapter.validate_python(value, from_attributes=True), media_type
+        )
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type=media_type,
+        headers={"Vary": "Accept"},
+    )
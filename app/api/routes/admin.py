@@ -0,0 +1,115 @@
+import asyncio
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.exceptions.http_exceptions import (
+    AdminAccessDeniedException,
+    ProfilerStateException,
+)
+from app.middleware.profiling import valid_admin_token
+from app.profiling.memory import memory_tracker
+from app.profiling.sampler import StackSampler
+
+
+def require_admin(
+    request: Request, x_admin_token: Optional[str] = Header(None)
+) -> None:
+    """
+    Let the request through only with the admin token the app was configured with.
+
+    Raises:
+        AdminAccessDeniedException: If the token is missing or wrong
+    """
+    if not valid_admin_token(
+        x_admin_token, getattr(request.app.state, "admin_token", None)
+    ):
+        raise AdminAccessDeniedException()
+
+
+router = APIRouter(
+    prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)]
+)
+
+# Only one whole-worker profile at a time, overlapping samplers would skew both
+_worker_profile = asyncio.Lock()
+
+
+@router.post("/profile/cpu", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=settings.PROFILING_MAX_SECONDS),
+    interval_ms: float = Query(settings.PROFILING_SAMPLE_INTERVAL_MS, ge=1, le=100),
+):
+    """
+    Sample every thread of this worker for a while.
+
+    Args:
+        seconds: How long to sample
+        interval_ms: Time between samples
+
+    Returns:
+        Folded stacks, one ``frame;frame;... count`` line per distinct stack
+
+    Raises:
+        ProfilerStateException: If a worker profile is already running
+    """
+    if _worker_profile.locked():
+        raise ProfilerStateException("A worker profile is already running")
+    async with _worker_profile:
+        sampler = StackSampler(interval_ms / 1000).start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+    return PlainTextResponse(
+        sampler.folded(), headers={"X-Profile-Samples": str(sampler.samples)}
+    )
+
+
+@router.post("/profile/memory/start")
+def start_memory_tracing(frames: int = Query(10, ge=1, le=100)):
+    """
+    Start tracing allocations and take the baseline for later diffs.
+
+    Tracing slows down every allocation of the worker until it is stopped.
+
+    Args:
+        frames: Stack depth kept per allocation
+    """
+    memory_tracker.start(frames)
+    return {"tracing": True}
+
+
+@router.get("/profile/memory/diff", response_class=PlainTextResponse)
+def diff_memory(
+    top: int = Query(25, ge=1, le=1000),
+    group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+    reset: bool = False,
+):
+    """
+    Show where memory grew since the baseline.
+
+    Args:
+        top: Number of allocation sites to report
+        group_by: Granularity of the allocation sites
+        reset: Make this snapshot the baseline of the next diff
+
+    Returns:
+        Largest growth first, one allocation site per line
+
+    Raises:
+        ProfilerStateException: If tracing was not started
+    """
+    try:
+        return memory_tracker.diff(top, group_by, reset)
+    except RuntimeError as e:
+        raise ProfilerStateException(str(e))
+
+
+@router.post("/profile/memory/stop")
+def stop_memory_tracing():
+    """Stop tracing allocations."""
+    memory_tracker.stop()
+    return {"tracing": False}
@@ -1,24 +1,174 @@
-from fastapi import APIRouter, Depends, status
+from typing import Callable, Hashable
+
+from fastapi import APIRouter, Depends, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
+from app.api.negotiation import (
+    available_formats,
+    choose_format,
+    negotiated_response,
+    render,
+)
+from app.cache.response_cache import ResponseCache
+from app.config import settings
 from app.crud import order as crud_order
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
+from app.db.events import Changes, on_commit
+from app.models.order import Order, OrderStatus
 from app.schemas.order import Order as OrderSchema
-from app.schemas.order import OrderCreate
+from app.schemas.order import OrderCreate, OrderUpdate
+from app.tracing.routing import TracedRoute
+
+router = APIRouter(prefix="/orders", tags=["orders"], route_class=TracedRoute)
+
+order_adapter = TypeAdapter(OrderSchema)
+
+# Serialised orders by ("id", order_id, format) and ("reference", reference,
+# format). Completed orders are immutable and only leave by eviction, pending ones
+# expire quickly and are dropped when their order changes
+completed_order_cache = ResponseCache(
+    max_entries=settings.ORDER_CACHE_MAX_ENTRIES, ttl=float("inf")
+)
+pending_order_cache = ResponseCache(
+    max_entries=settings.ORDER_CACHE_MAX_ENTRIES,
+    ttl=settings.ORDER_PENDING_CACHE_TTL_SECONDS,
+)
+
+
+def _discard_changed_orders(changes: Changes) -> None:
+    """Drop cached copies of orders changed by a committed transaction."""
+    keys = []
+    for order_id, values in changes.items():
+        keys.extend(("id", order_id, media_type) for media_type in available_formats())
+        reference = (values or {}).get("reference")
+        if reference is not None:
+            keys.extend(
+                ("reference", reference, media_type)
+                for media_type in available_formats()
+            )
+    pending_order_cache.discard(keys)
+    completed_order_cache.discard(keys)
+
+
+on_commit("orders", _discard_changed_orders)
+
+
+def _cached_order_response(request: Request, key: Hashable, load: Callable[[], Order]):
+    """Return an order from the cache, loading, rendering and caching it on a miss."""
+    media_type = choose_format(request.headers.get("accept"))
+    key = (*key, media_type)
+    # The cache an order goes to depends on its status, known only once loaded, so
+    # the hits and misses get_or_set would count are recorded here
+    for cache in (completed_order_cache, pending_order_cache):
+        body = cache.get(key)
+        if body is not None:
+            cache.record(hit=True)
+            return negotiated_response(request, order_adapter, None, body=body)
 
-router = APIRouter(prefix="/orders", tags=["orders"])
+    order = load()
+    body = render(
+        order_adapter,
+        order_adapter.validate_python(order, from_attributes=True),
+        media_type,
+    )
+    cache = (
+        completed_order_cache
+        if order.status == OrderStatus.COMPLETED.value
+        else pending_order_cache
+    )
+    # A pending order changing while it is rendered may leave a stale copy,
+    # for at most the pending TTL; completed orders cannot change any more
+    if cache.enabled:
+        cache.record(hit=False)
+        cache.set(key, body)
+    return negotiated_response(request, order_adapter, None, body=body)
 
 
 @router.post("/", response_model=OrderSchema, status_code=status.HTTP_201_CREATED)
-def create_order(order: OrderCreate, db: Session = Depends(get_db)):
+def create_order(request: Request, order: OrderCreate, db: Session = Depends(get_db)):
     """
     Place a new order.
 
     Args:
+        request: Incoming request, used for format negotiation
         order: Validated order data
         db: Database session
 
     Returns:
         Created order
     """
-    return crud_order.create_order(db=db, order=order)
+    created = crud_order.create_order(db=db, order=order)
+    return negotiated_response(
+        request, order_adapter, created, status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.get("/by-reference/{reference}", response_model=OrderSchema)
+def get_order_by_reference(
+    request: Request, reference: str, db: Session = Depends(get_read_db)
+):
+    """
+    Look up an order by the reference shown to the customer.
+
+    Args:
+        request: Incoming request, used for format negotiation and the cache key
+        reference: Order reference, e.g. "ORD-7KQ2M9XD4F", case-insensitive
+        db: Database session
+
+    Returns:
+        Order with its items
+    """
+    reference = reference.strip().upper()
+    return _cached_order_response(
+        request,
+        ("reference", reference),
+        lambda: crud_order.get_order_by_reference(db, reference),
+    )
+
+
+@router.get("/{order_id}", response_model=OrderSchema)
+def get_order(request: Request, order_id: int, db: Session = Depends(get_read_db)):
+    """
+    Look up an order by ID.
+
+    Completed orders are served from memory once they were read, pending ones for
+    up to ORDER_PENDING_CACHE_TTL_SECONDS.
+
+    Args:
+        request: Incoming request, used for format negotiation and the cache key
+        order_id: ID of the order
+        db: Database session
+
+    Returns:
+        Order with its items
+    """
+    return _cached_order_response(
+        request, ("id", order_id), lambda: crud_order.get_order(db, order_id)
+    )
+
+
+@router.patch("/{order_id}", response_model=OrderSchema)
+def update_order(
+    request: Request,
+    order_id: int,
+    update: OrderUpdate,
+    db: Session = Depends(get_db),
+):
+    """
+    Change the status of an order. Completed orders can no longer change.
+
+    Args:
+        request: Incoming request, used for format negotiation
+        order_id: ID of the order
+        update: New status
+        db: Database session
+
+    Returns:
+        Updated order
+    """
+    if update.status is None:
+        order = crud_order.get_order(db, order_id)
+    else:
+        order = crud_order.update_order_status(db, order_id, update.status)
+    return negotiated_response(request, order_adapter, order)
@@ -0,0 +1,91 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import make_url
+
+from app.broadcast.broadcaster import Broadcaster, format_sse
+from app.broadcast.bus import create_change_bus
+from app.config import settings
+from app.db.events import on_commit
+from app.exceptions.http_exceptions import TooManySubscribersException
+
+router = APIRouter(prefix="/product-events", tags=["products"])
+
+# One broadcaster per worker, fed by committed product changes
+broadcaster = Broadcaster(
+    history=settings.PRODUCT_EVENTS_HISTORY,
+    max_pending=settings.PRODUCT_EVENTS_MAX_PENDING,
+)
+change_bus = create_change_bus(
+    settings.PRODUCT_EVENTS_BUS,
+    make_url(settings.db_url)
+    .set(drivername="postgresql")
+    .render_as_string(hide_password=False),
+    broadcaster,
+)
+on_commit("products", change_bus.publish)
+
+
+@router.get("/", response_class=StreamingResponse)
+async def stream_product_events(
+    request: Request,
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Stream product stock and price changes as Server-Sent Events.
+
+    Each ``product`` event carries the product id with its new stock and price, so
+    clients can keep a catalog up to date without polling. Reconnecting clients
+    resume after the last event they received; if that event is no longer buffered
+    a ``reset`` event tells them to reload the catalog first. Clients that fall too
+    far behind are disconnected and resume the same way.
+
+    Args:
+        request: Incoming request, used to notice disconnected clients
+        last_event_id: Id of the last event received, for clients that cannot set
+            headers
+        last_event_id_header: Id of the last event received, sent by EventSource
+            when reconnecting
+
+    Returns:
+        text/event-stream response
+
+    Raises:
+        TooManySubscribersException: If this worker already serves the maximum
+            number of streams
+    """
+    if broadcaster.subscriber_count >= settings.PRODUCT_EVENTS_MAX_SUBSCRIBERS:
+        raise TooManySubscribersException()
+
+    resume_from = last_event_id_header if last_event_id is None else last_event_id
+    subscription = broadcaster.subscribe(resume_from)
+
+    async def events():
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield "retry: 1000\n\n"
+            while True:
+                try:
+                    item = await subscription.get(
+                        settings.PRODUCT_EVENTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Comment line keeping proxies from closing an idle stream
+                    yield ": heartbeat\n\n"
+                    continue
+                if item is None:
+                    return
+                yield format_sse(item)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
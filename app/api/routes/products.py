@@ -1,22 +1,107 @@
-from typing import List
+from typing import Any, Callable, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
+from app.api.negotiation import choose_format, negotiated_response, render
+from app.cache.catalog_snapshot import CatalogSnapshot
+from app.cache.catalog_version import CatalogVersion
+from app.cache.response_cache import ResponseCache, make_cache_key
+from app.config import settings
 from app.crud import product as crud_product
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db, pinned_to_primary
+from app.db.events import on_commit
+from app.exceptions.http_exceptions import (
+    InvalidProductIdsException,
+    TooManyAdjustmentsException,
+)
+from app.schemas.product import CartQuote, CartQuoteRequest
 from app.schemas.product import Product as ProductSchema
-from app.schemas.product import ProductCreate
+from app.schemas.product import (
+    ProductBatch,
+    ProductBatchRequest,
+    ProductChanges,
+    ProductCreate,
+    ProductSummary,
+)
+from app.schemas.product import ProductTombstone as ProductTombstoneSchema
+from app.schemas.product import StockAdjustmentBatch, StockAdjustmentReport
+from app.tracing.routing import TracedRoute
 
-router = APIRouter(prefix="/products", tags=["products"])
+router = APIRouter(prefix="/products", tags=["products"], route_class=TracedRoute)
+
+product_adapter = TypeAdapter(ProductSchema)
+product_list_adapter = TypeAdapter(List[ProductSchema])
+product_summary_list_adapter = TypeAdapter(List[ProductSummary])
+cart_quote_adapter = TypeAdapter(CartQuote)
+product_changes_adapter = TypeAdapter(ProductChanges)
+product_tombstone_adapter = TypeAdapter(ProductTombstoneSchema)
+product_batch_adapter = TypeAdapter(ProductBatch)
+stock_adjustment_report_adapter = TypeAdapter(StockAdjustmentReport)
+
+# Serialised product listing pages and batches, keyed by the catalog version so
+# writes by any worker or tool retire them; this worker's own writes drop them
+product_list_cache = ResponseCache(
+    max_entries=settings.PRODUCT_CACHE_MAX_ENTRIES,
+    ttl=settings.PRODUCT_CACHE_TTL_SECONDS,
+)
+catalog_version = CatalogVersion(max_age=settings.PRODUCT_CACHE_VERSION_MAX_AGE_SECONDS)
+on_commit("products", product_list_cache.clear)
+on_commit("products", catalog_version.mark_stale)
+
+# Columnar copy of the catalog answering searches and quotes, None when disabled
+catalog_snapshot: Optional[CatalogSnapshot] = None
+if settings.CATALOG_SNAPSHOT_ENABLED:
+    catalog_snapshot = CatalogSnapshot(
+        max_age=settings.CATALOG_SNAPSHOT_MAX_AGE_SECONDS,
+        overlap=settings.CATALOG_SNAPSHOT_OVERLAP_SECONDS,
+    )
+    on_commit("products", catalog_snapshot.mark_stale)
+
+
+def _cached_body(
+    request: Request, db: Session, params: Dict[str, Any], render: Callable[[], bytes]
+) -> bytes:
+    """
+    Serve a rendered body from the product list cache.
+
+    Clients pinned to the primary after a write bypass the cache, so they are
+    never handed a body rendered from a lagging replica. The catalog version in
+    the key is read from the database at most every
+    PRODUCT_CACHE_VERSION_MAX_AGE_SECONDS, so hits usually need no connection.
+
+    Args:
+        request: Incoming request, its path is part of the key
+        db: Database session the body is rendered with
+        params: Validated parameters that select the body
+        render: Produces the serialised body on a miss
+
+    Returns:
+        Serialised response body
+    """
+    if not product_list_cache.enabled or pinned_to_primary(request):
+        return render()
+    version = catalog_version.get(lambda: crud_product.get_catalog_version(db))
+    key = make_cache_key(request.url.path, {**params, "version": version})
+    return product_list_cache.get_or_set(key, render)
 
 
 @router.get("/", response_model=List[ProductSchema])
-def get_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_products(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_read_db),
+):
     """
     Retrieve a list of all available products.
 
+    Pages are served from the response cache when possible, in the format
+    negotiated through the Accept header.
+
     Args:
+        request: Incoming request, used for format negotiation and the cache key
         skip: Number of products to skip (for pagination)
         limit: Maximum number of products to return
         db: Database session
@@ -24,20 +109,303 @@ def get_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db))
     Returns:
         List of products
     """
-    products = crud_product.get_products(db, skip=skip, limit=limit)
-    return products
+    media_type = choose_format(request.headers.get("accept"))
+
+    def render_page() -> bytes:
+        products = crud_product.get_products(db, skip=skip, limit=limit)
+        return render(
+            product_list_adapter,
+            product_list_adapter.validate_python(products, from_attributes=True),
+            media_type,
+        )
+
+    params = {"skip": skip, "limit": limit, "format": media_type}
+    body = _cached_body(request, db, params, render_page)
+    return negotiated_response(request, product_list_adapter, None, body=body)
+
+
+@router.get("/search", response_model=List[ProductSummary])
+def search_products(
+    request: Request,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_stock: Optional[int] = Query(None, ge=0),
+    sort: Optional[str] = Query(None, pattern="^-?(price|stock)$"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Filter products by price and stock and sort them.
+
+    Served from the in-memory catalog snapshot when it is enabled, which may lag
+    behind the database by up to CATALOG_SNAPSHOT_MAX_AGE_SECONDS.
+
+    Args:
+        request: Incoming request, used for format negotiation
+        min_price: Lowest price to include
+        max_price: Highest price to include
+        min_stock: Lowest stock to include, 1 for products in stock
+        sort: "price", "stock", "-price" or "-stock", ties are ordered by ID
+        skip: Number of products to skip (for pagination)
+        limit: Maximum number of products to return
+        db: Database session
+
+    Returns:
+        List of matching products
+    """
+    filters = dict(
+        min_price=min_price,
+        max_price=max_price,
+        min_stock=min_stock,
+        sort=sort,
+        skip=skip,
+        limit=limit,
+    )
+    if catalog_snapshot is not None:
+        catalog_snapshot.ensure_fresh(db)
+        products = catalog_snapshot.search(**filters)
+    else:
+        products = crud_product.search_products(db, **filters)
+    return negotiated_response(request, product_summary_list_adapter, products)
+
+
+@router.post("/quote", response_model=CartQuote)
+def quote_cart(
+    request: Request, cart: CartQuoteRequest, db: Session = Depends(get_read_db)
+):
+    """
+    Price a cart without placing an order.
+
+    The quote is indicative: placing the order re-checks prices and stock in the
+    database.
+
+    Args:
+        request: Incoming request, used for format negotiation
+        cart: Products and quantities to price
+        db: Database session
+
+    Returns:
+        Per-line prices and availability, the total and any unknown product IDs
+    """
+    items = [(item.product_id, item.quantity) for item in cart.items]
+    if catalog_snapshot is not None:
+        catalog_snapshot.ensure_fresh(db)
+        quote = catalog_snapshot.quote(items)
+    else:
+        quote = crud_product.quote_cart(db, items)
+    return negotiated_response(request, cart_quote_adapter, quote)
+
+
+@router.get("/changes", response_model=ProductChanges)
+def get_product_changes(
+    request: Request,
+    since: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Retrieve products created, updated or deleted since a previous sync.
+
+    Start with since=0 for a full sync, then pass the returned next_since to
+    receive only later changes. Changes are held back until they are
+    PRODUCT_CHANGES_SETTLE_SECONDS old, so that no write is skipped because it
+    committed after a newer one.
+
+    Args:
+        request: Incoming request, used for format negotiation
+        since: next_since from the previous call
+        limit: Maximum number of changes and deletions to return
+        db: Database session
+
+    Returns:
+        Changed products, tombstones of deleted ones and the next since value
+    """
+    changed, deleted, next_since, has_more = crud_product.get_product_changes(
+        db,
+        since=since,
+        limit=limit,
+        settle_seconds=settings.PRODUCT_CHANGES_SETTLE_SECONDS,
+    )
+    return negotiated_response(
+        request,
+        product_changes_adapter,
+        {
+            "changes": changed,
+            "deleted": deleted,
+            "next_since": next_since,
+            "has_more": has_more,
+        },
+    )
+
+
+def parse_product_ids(values: List[str]) -> List[int]:
+    """
+    Read product IDs given as repeated and/or comma separated query values.
+
+    Raises:
+        InvalidProductIdsException: If a value is not an integer
+    """
+    try:
+        return [int(part) for value in values for part in value.split(",") if part]
+    except ValueError:
+        raise InvalidProductIdsException("Product IDs must be integers")
+
+
+def _batch_response(request: Request, product_ids: List[int], db: Session):
+    """Look up a batch of products, through the response cache."""
+    if not product_ids:
+        raise InvalidProductIdsException("At least one product ID is required")
+    if len(product_ids) > settings.PRODUCT_BATCH_MAX_IDS:
+        raise InvalidProductIdsException(
+            f"At most {settings.PRODUCT_BATCH_MAX_IDS} product IDs per batch"
+        )
+    media_type = choose_format(request.headers.get("accept"))
+
+    def render_batch() -> bytes:
+        products, missing = crud_product.get_products_batch(db, product_ids)
+        return render(
+            product_batch_adapter,
+            product_batch_adapter.validate_python(
+                {"products": products, "missing": missing}, from_attributes=True
+            ),
+            media_type,
+        )
+
+    # GET and POST share entries, which go stale with the listing pages
+    params = {"ids": ",".join(map(str, product_ids)), "format": media_type}
+    body = _cached_body(request, db, params, render_batch)
+    return negotiated_response(request, product_batch_adapter, None, body=body)
+
+
+@router.get("/batch", response_model=ProductBatch)
+def get_products_batch(
+    request: Request,
+    ids: List[str] = Query(..., description="Product IDs, e.g. ids=3,1,2"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Retrieve several products by ID in one request.
+
+    Products come back in the order of the IDs, unknown IDs are listed as missing.
+    Use the POST variant when the IDs do not fit in a URL.
+
+    Args:
+        request: Incoming request, used for format negotiation and the cache key
+        ids: Comma separated and/or repeated product IDs
+        db: Database session
+
+    Returns:
+        Found products and the IDs that do not exist
+    """
+    return _batch_response(request, parse_product_ids(ids), db)
+
+
+@router.post("/batch", response_model=ProductBatch)
+def post_products_batch(
+    request: Request, batch: ProductBatchRequest, db: Session = Depends(get_read_db)
+):
+    """
+    Retrieve several products by ID, taking the IDs from the request body.
+
+    Args:
+        request: Incoming request, used for format negotiation and the cache key
+        batch: Product IDs to retrieve
+        db: Database session
+
+    Returns:
+        Found products and the IDs that do not exist
+    """
+    return _batch_response(request, batch.ids, db)
+
+
+@router.post("/adjustments", response_model=StockAdjustmentReport)
+def adjust_products(
+    request: Request, batch: StockAdjustmentBatch, db: Session = Depends(get_db)
+):
+    """
+    Apply a batch of stock and price adjustments.
+
+    Each adjustment sets the stock, or changes it by a delta, and/or sets the
+    price. Adjustments that would take the stock below zero or name an unknown
+    product are skipped and reported, the others are applied. The batch is
+    written in chunks of STOCK_ADJUSTMENT_CHUNK_SIZE, each committed on its own.
+
+    Args:
+        request: Incoming request, used for format negotiation
+        batch: Adjustments, at most one per product
+        db: Database session
+
+    Returns:
+        The outcome of every adjustment in request order, with applied and failed
+        counts
+
+    Raises:
+        TooManyAdjustmentsException: If the batch exceeds STOCK_ADJUSTMENT_MAX_ITEMS
+    """
+    if len(batch.adjustments) > settings.STOCK_ADJUSTMENT_MAX_ITEMS:
+        raise TooManyAdjustmentsException(settings.STOCK_ADJUSTMENT_MAX_ITEMS)
+    results = crud_product.adjust_products(
+        db, batch.adjustments, chunk_size=settings.STOCK_ADJUSTMENT_CHUNK_SIZE
+    )
+    applied = sum(result["status"] == "applied" for result in results)
+    return negotiated_response(
+        request,
+        stock_adjustment_report_adapter,
+        {"results": results, "applied": applied, "failed": len(results) - applied},
+    )
+
+
+@router.get("/{product_id}", response_model=ProductSchema)
+def get_product(request: Request, product_id: int, db: Session = Depends(get_read_db)):
+    """
+    Retrieve a single product by ID.
+
+    Args:
+        request: Incoming request, used for format negotiation
+        product_id: ID of the product
+        db: Database session
+
+    Returns:
+        Product
+    """
+    product = crud_product.read_product(db, product_id)
+    return negotiated_response(request, product_adapter, product)
 
 
 @router.post("/", response_model=ProductSchema, status_code=status.HTTP_201_CREATED)
-def create_product(product: ProductCreate, db: Session = Depends(get_db)):
+def create_product(
+    request: Request, product: ProductCreate, db: Session = Depends(get_db)
+):
     """
     Add a new product to the platform.
 
     Args:
+        request: Incoming request, used for format negotiation
         product: Validated product data
         db: Database session
 
     Returns:
         Created product
     """
-    return crud_product.create_product(db=db, product=product)
+    created = crud_product.create_product(db=db, product=product)
+    return negotiated_response(
+        request, product_adapter, created, status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.delete("/{product_id}", response_model=ProductTombstoneSchema)
+def delete_product(request: Request, product_id: int, db: Session = Depends(get_db)):
+    """
+    Delete a product that no order refers to.
+
+    Args:
+        request: Incoming request, used for format negotiation
+        product_id: ID of the product
+        db: Database session
+
+    Returns:
+        Tombstone recording the deletion
+    """
+    tombstone = crud_product.delete_product(db, product_id)
+    return negotiated_response(request, product_tombstone_adapter, tombstone)
@@ -0,0 +1,201 @@
+import asyncio
+import itertools
+import json
+import secrets
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set
+
+# Event sent instead of the missed events when a client cannot be resumed; the
+# client has to reload the catalog before following the stream again
+RESET_EVENT = "reset"
+PRODUCT_EVENT = "product"
+
+
+class Subscription:
+    """
+    One subscriber's view of the stream, a bounded queue of pending events.
+
+    A subscriber that lets the queue fill up is closed rather than slowing down
+    the broadcaster; it reconnects with the id of the last event it processed.
+    """
+
+    def __init__(self, broadcaster: "Broadcaster", max_pending: int):
+        self._broadcaster = broadcaster
+        self.max_pending = max_pending
+        # One slot more than allowed, reserved for the end-of-stream marker
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending + 1)
+        self.closed = False
+
+    def _offer(self, item: Optional[Dict[str, Any]]) -> None:
+        """Queue an event, or close the subscription if it has fallen behind."""
+        if self.closed:
+            return
+        if self._queue.qsize() >= self.max_pending:
+            # Everything already queued is still delivered, so resuming from the
+            # last event the client processed loses nothing
+            self.close()
+            self._queue.put_nowait(None)
+        else:
+            self._queue.put_nowait(item)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next event.
+
+        Returns:
+            The event, or None when the subscription was closed
+
+        Raises:
+            asyncio.TimeoutError: If no event arrived within ``timeout`` seconds
+        """
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._broadcaster._unsubscribe(self)
+
+
+class Broadcaster:
+    """
+    Fans product change events out to every subscriber of this worker.
+
+    The most recent events are kept so clients can resume after the last id they
+    saw. Ids are issued by the worker that committed a change and travel with it
+    over the change bus, so every worker knows an event under the same id and a
+    client can resume on any of them. ``publish`` may be called from any thread,
+    delivery happens on the event loop the subscribers live on.
+    """
+
+    def __init__(self, history: int = 1000, max_pending: int = 100):
+        self.max_pending = max_pending
+        # Ids issued here are "<epoch>-<sequence>", the epoch tells them apart from
+        # those issued by other workers or earlier runs
+        self.epoch = secrets.token_hex(4)
+        self._issued = itertools.count(1)
+        self._last_seq = 0
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def last_event_id(self) -> Optional[str]:
+        """Id of the newest buffered event, None before the first one."""
+        with self._lock:
+            return self._history[-1]["id"] if self._history else None
+
+    def new_event_ids(self, count: int) -> List[str]:
+        """Issue ids for events this worker is about to publish through the bus."""
+        with self._lock:
+            return [f"{self.epoch}-{next(self._issued)}" for _ in range(count)]
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Start receiving events, must be called from the event loop.
+
+        Args:
+            last_event_id: Id of the last event the client processed. Newer buffered
+                events are replayed; when the id is no longer buffered, or too many
+                events followed it, a reset event is sent instead
+
+        Returns:
+            New subscription
+        """
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self, self.max_pending)
+
+        with self._lock:
+            if last_event_id is not None:
+                missed = self._missed_since(last_event_id)
+                if missed is None or len(missed) >= self.max_pending:
+                    # Resuming from the reset continues after the newest event
+                    reset_id = (
+                        self._history[-1]["id"]
+                        if self._history
+                        else f"{self.epoch}-{next(self._issued)}"
+                    )
+                    subscription._offer({"id": reset_id, "event": RESET_EVENT})
+                else:
+                    for item in missed:
+                        subscription._offer(item)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def _missed_since(self, last_event_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Buffered events after ``last_event_id``, None if it is not buffered."""
+        seq = next(
+            (item["seq"] for item in self._history if item["id"] == last_event_id),
+            None,
+        )
+        if seq is None:
+            return None
+        return [item for item in self._history if item["seq"] > seq]
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(
+        self,
+        payloads: Sequence[Dict[str, Any]],
+        ids: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Deliver change payloads to every subscriber.
+
+        Args:
+            payloads: Event data, e.g. {"id": 1, "stock": 3, "price": 9.99}
+            ids: Event ids issued by the publishing worker, new ones are issued
+                here when not given
+
+        Returns:
+            The published events
+        """
+        if ids is None:
+            ids = self.new_event_ids(len(payloads))
+        with self._lock:
+            events = []
+            for event_id, payload in zip(ids, payloads):
+                self._last_seq += 1
+                events.append(
+                    {
+                        "id": event_id,
+                        "seq": self._last_seq,
+                        "event": PRODUCT_EVENT,
+                        "data": payload,
+                    }
+                )
+            self._history.extend(events)
+
+        loop = self._loop
+        if not events or loop is None or loop.is_closed():
+            return events
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(events)
+        else:
+            loop.call_soon_threadsafe(self._deliver, events)
+        return events
+
+    def _deliver(self, events: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            for item in events:
+                subscription._offer(item)
+
+
+def format_sse(item: Dict[str, Any]) -> str:
+    """Encode an event in the text/event-stream format."""
+    data = json.dumps(item.get("data", {}), separators=(",", ":"))
+    return f"id: {item['id']}\nevent: {item['event']}\ndata: {data}\n\n"
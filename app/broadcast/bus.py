@@ -0,0 +1,196 @@
+import json
+import logging
+import select
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.broadcast.broadcaster import Broadcaster
+from app.db.events import Changes
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY payloads must stay below 8000 bytes
+MAX_NOTIFY_BYTES = 7900
+
+CHANNEL = "product_changes"
+
+
+def change_payloads(changes: Changes) -> List[Dict[str, Any]]:
+    """
+    Turn committed product changes into compact event payloads.
+
+    Args:
+        changes: Changed product rows keyed by id, None for deleted ones
+
+    Returns:
+        One payload per product with its id, new stock and price and the row's
+        change version, or a deleted flag
+    """
+    payloads = []
+    for product_id, values in sorted(changes.items()):
+        if values is None:
+            payloads.append({"id": product_id, "deleted": True})
+            continue
+        payload = {"id": product_id}
+        for field in ("stock", "price", "version"):
+            if field in values:
+                payload[field] = values[field]
+        payloads.append(payload)
+    return payloads
+
+
+class LocalChangeBus:
+    """
+    Delivers changes only to this worker's subscribers.
+
+    Suitable for a single worker and for tests; with several workers each one only
+    sees the changes it committed itself.
+    """
+
+    def __init__(self, broadcaster: Broadcaster):
+        self.broadcaster = broadcaster
+
+    def publish(self, changes: Changes) -> None:
+        self.broadcaster.publish(change_payloads(changes))
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class PostgresChangeBus:
+    """
+    Delivers changes to the subscribers of every worker through LISTEN/NOTIFY.
+
+    Committed changes are sent with ``pg_notify`` and a listener thread in each
+    worker, this one included, hands received notifications to the local
+    broadcaster. Workers therefore see every change in the same order, under the
+    event ids issued by the worker that committed it.
+    """
+
+    # One LISTEN and one NOTIFY connection, both outside the SQLAlchemy pool
+    CONNECTIONS = 2
+
+    def __init__(
+        self,
+        dsn: str,
+        broadcaster: Broadcaster,
+        channel: str = CHANNEL,
+        poll_interval: float = 1.0,
+    ):
+        self.dsn = dsn
+        self.broadcaster = broadcaster
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self._notify_connection = None
+        self._notify_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self):
+        import psycopg2
+
+        connection = psycopg2.connect(self.dsn)
+        connection.autocommit = True
+        return connection
+
+    def publish(self, changes: Changes) -> None:
+        """Send the changes to every worker, split into NOTIFY-sized messages."""
+        payloads = change_payloads(changes)
+        ids = self.broadcaster.new_event_ids(len(payloads))
+        messages = _chunk(
+            [{"id": i, "data": payload} for i, payload in zip(ids, payloads)],
+            MAX_NOTIFY_BYTES,
+        )
+        with self._notify_lock:
+            try:
+                if self._notify_connection is None or self._notify_connection.closed:
+                    self._notify_connection = self._connect()
+                with self._notify_connection.cursor() as cursor:
+                    for message in messages:
+                        cursor.execute(
+                            "SELECT pg_notify(%s, %s)", (self.channel, message)
+                        )
+            except Exception:
+                # The change is committed either way, subscribers will catch up
+                # from the next event or by reloading after a reset
+                logger.exception("Could not publish product changes")
+                self._notify_connection = None
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._listen, name="product-change-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 2)
+        with self._notify_lock:
+            if self._notify_connection is not None:
+                self._notify_connection.close()
+                self._notify_connection = None
+
+    def _listen(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                connection = self._connect()
+            except Exception:
+                logger.exception("Could not connect the product change listener")
+                self._stopping.wait(self.poll_interval)
+                continue
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                while not self._stopping.is_set():
+                    if select.select([connection], [], [], self.poll_interval)[0]:
+                        connection.poll()
+                        while connection.notifies:
+                            notify = connection.notifies.pop(0)
+                            events = json.loads(notify.payload)
+                            self.broadcaster.publish(
+                                [event["data"] for event in events],
+                                ids=[event["id"] for event in events],
+                            )
+            except Exception:
+                logger.exception("Product change listener lost its connection")
+            finally:
+                connection.close()
+
+
+def _chunk(payloads: Sequence[Dict[str, Any]], max_bytes: int) -> List[str]:
+    """Pack payloads into JSON arrays no longer than ``max_bytes`` each."""
+    messages, current, size = [], [], 2
+    for payload in payloads:
+        encoded = json.dumps(payload, separators=(",", ":"))
+        if current and size + len(encoded) + 1 > max_bytes:
+            messages.append("[" + ",".join(current) + "]")
+            current, size = [], 2
+        current.append(encoded)
+        size += len(encoded) + 1
+    if current:
+        messages.append("[" + ",".join(current) + "]")
+    return messages
+
+
+def create_change_bus(kind: str, dsn: str, broadcaster: Broadcaster):
+    """
+    Build the change bus selected in the settings.
+
+    Args:
+        kind: "local" or "postgres"
+        dsn: Connection string of the primary database, used by "postgres"
+        broadcaster: Broadcaster receiving the changes
+
+    Returns:
+        Change bus with ``publish``, ``start`` and ``stop``
+    """
+    if kind == "postgres":
+        return PostgresChangeBus(dsn, broadcaster)
+    if kind == "local":
+        return LocalChangeBus(broadcaster)
+    raise ValueError(f"Unknown product events bus {kind!r}")
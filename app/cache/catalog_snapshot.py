@@ -0,0 +1,413 @@
+import datetime
+import heapq
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.product import Product, ProductStockShard, ProductTombstone
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised without the speedups extra
+    np = None
+
+# Sort keys accepted by CatalogSnapshot.search, a leading "-" sorts descending
+SORT_FIELDS = ("price", "stock")
+
+
+def parse_sort(sort: Optional[str]) -> Tuple[Optional[str], bool]:
+    """
+    Split a sort parameter such as "-price" into field and direction.
+
+    Raises:
+        ValueError: If the field is not one of SORT_FIELDS
+    """
+    if not sort:
+        return None, False
+    field, descending = sort.lstrip("-"), sort.startswith("-")
+    if field not in SORT_FIELDS:
+        raise ValueError(f"Cannot sort by {field!r}")
+    return field, descending
+
+
+class CatalogSnapshot:
+    """
+    Read-only in-memory copy of the catalog, kept in compact columns.
+
+    Ids, prices and stock live in NumPy arrays (or ``array`` columns when NumPy
+    is not installed) indexed through an id -> row map, with names and
+    descriptions in plain lists next to them. Range filters, sorts and cart quotes
+    run over whole columns instead of rows.
+
+    The snapshot follows the database by re-reading rows whose ``updated_at``
+    moved past the last refresh, and dropping products whose tombstone appeared.
+    Sharded products report the sum of their shards, which is re-read when any of
+    the shards moved, as orders on them leave the product row alone. It may lag
+    behind by up to ``max_age`` seconds, so it is only used to answer reads;
+    orders still check stock in the database.
+    """
+
+    def __init__(self, max_age: float = 1.0, overlap: float = 5.0):
+        """
+        Args:
+            max_age: Seconds after which reads trigger a refresh
+            overlap: Seconds re-read before the newest seen ``updated_at``, which
+                covers transactions that committed after a later timestamp was
+                already seen
+        """
+        self.max_age = max_age
+        self.overlap = datetime.timedelta(seconds=overlap)
+        self.watermark: Optional[datetime.datetime] = None
+        self.loaded = False
+        self.refreshed_at = 0.0
+        self.stale = True
+        self._index: Dict[int, int] = {}
+        self._names: List[str] = []
+        self._descriptions: List[Optional[str]] = []
+        self._size = 0
+        if np is not None:
+            self._ids = np.empty(0, dtype=np.int64)
+            self._prices = np.empty(0, dtype=np.float64)
+            self._stocks = np.empty(0, dtype=np.int64)
+        else:
+            self._ids, self._prices, self._stocks = array("q"), array("d"), array("q")
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the numeric columns."""
+        if np is not None:
+            return self._ids.nbytes + self._prices.nbytes + self._stocks.nbytes
+        return sum(c.itemsize * len(c) for c in (self._ids, self._prices, self._stocks))
+
+    def mark_stale(self, *args) -> None:
+        """Make the next read refresh, e.g. after this worker committed a change."""
+        self.stale = True
+
+    def ensure_fresh(self, db: Session) -> None:
+        """
+        Refresh the snapshot if it is stale or older than ``max_age``.
+
+        The first load blocks; later refreshes are done by one caller while the
+        others keep reading the current snapshot.
+
+        Args:
+            db: Database session to read changes with
+        """
+        if not self.stale and time.monotonic() - self.refreshed_at < self.max_age:
+            return
+        if not self._refresh_lock.acquire(blocking=not self.loaded):
+            return
+        try:
+            self.refresh(db)
+        finally:
+            self._refresh_lock.release()
+
+    def refresh(self, db: Session) -> int:
+        """
+        Apply products changed or deleted since the last refresh, or load all.
+
+        Args:
+            db: Database session to read changes with
+
+        Returns:
+            Number of rows read
+        """
+        self.stale = False
+        started = time.monotonic()
+        query = db.query(
+            Product.id,
+            Product.name,
+            Product.description,
+            Product.price,
+            Product.stock,
+            Product.stock_shards,
+            Product.updated_at,
+        )
+        since = None if self.watermark is None else self.watermark - self.overlap
+        if since is not None:
+            query = query.filter(Product.updated_at >= since)
+        rows = query.order_by(Product.id).all()
+        totals = self._shard_totals(
+            db, since, [row.id for row in rows if row.stock_shards]
+        )
+        tombstones = []
+        if since is not None:
+            tombstones = (
+                db.query(ProductTombstone.product_id, ProductTombstone.created_at)
+                .filter(ProductTombstone.created_at >= since)
+                .all()
+            )
+
+        written = [row.updated_at for row in rows] + [t[2] for t in totals]
+        written += [tombstone.created_at for tombstone in tombstones]
+        with self._lock:
+            # A product re-read after its tombstone was written exists again
+            present = {row.id for row in rows}
+            self._remove({t.product_id for t in tombstones} - present)
+            self._apply(rows, {pid: total for pid, total, _ in totals})
+            newest = max((at for at in written if at), default=None)
+            if newest is not None and (
+                self.watermark is None or newest > self.watermark
+            ):
+                self.watermark = newest
+        self.loaded = True
+        self.refreshed_at = started
+        return len(rows)
+
+    @staticmethod
+    def _shard_totals(
+        db: Session, since: Optional[datetime.datetime], product_ids: List[int]
+    ) -> List[Tuple[int, int, Optional[datetime.datetime]]]:
+        """
+        Sum the shards of sharded products that were re-read or whose shards moved.
+
+        Returns:
+            (product_id, total stock, newest shard ``updated_at``) tuples
+        """
+        query = db.query(
+            ProductStockShard.product_id,
+            func.sum(ProductStockShard.stock),
+            func.max(ProductStockShard.updated_at),
+        )
+        if since is not None:
+            moved = select(ProductStockShard.product_id).where(
+                ProductStockShard.updated_at >= since
+            )
+            query = query.filter(
+                or_(
+                    ProductStockShard.product_id.in_(moved),
+                    ProductStockShard.product_id.in_(product_ids),
+                )
+            )
+        rows = query.group_by(ProductStockShard.product_id).all()
+        return [(pid, int(total or 0), written_at) for pid, total, written_at in rows]
+
+    def _apply(self, rows: Sequence[Any], shard_totals: Dict[int, int]) -> None:
+        """
+        Update known rows in place and append new ones.
+
+        Args:
+            rows: Product rows read from the database
+            shard_totals: Current stock of sharded products keyed by ID, which may
+                include products whose row did not change
+        """
+
+        def stock(row) -> int:
+            return shard_totals.get(row.id, 0) if row.stock_shards else row.stock
+
+        new_rows = []
+        for row in rows:
+            position = self._index.get(row.id)
+            if position is None:
+                new_rows.append(row)
+                continue
+            self._prices[position] = row.price
+            self._stocks[position] = stock(row)
+            self._names[position] = row.name
+            self._descriptions[position] = row.description
+        for product_id, total in shard_totals.items():
+            position = self._index.get(product_id)
+            if position is not None:
+                self._stocks[position] = total
+        if not new_rows:
+            return
+
+        start = self._size
+        self._size += len(new_rows)
+        if np is not None:
+            self._reserve(self._size)
+            self._ids[start : self._size] = [row.id for row in new_rows]
+            self._prices[start : self._size] = [row.price for row in new_rows]
+            self._stocks[start : self._size] = [stock(row) for row in new_rows]
+        else:
+            self._ids.extend(row.id for row in new_rows)
+            self._prices.extend(row.price for row in new_rows)
+            self._stocks.extend(stock(row) for row in new_rows)
+        for position, row in enumerate(new_rows, start):
+            self._index[row.id] = position
+            self._names.append(row.name)
+            self._descriptions.append(row.description)
+
+    def _remove(self, product_ids: Set[int]) -> None:
+        """Drop products by moving the last row into each freed position."""
+        for product_id in product_ids:
+            position = self._index.pop(product_id, None)
+            if position is None:
+                continue
+            last = self._size - 1
+            if position != last:
+                moved = int(self._ids[last])
+                for column in (self._ids, self._prices, self._stocks):
+                    column[position] = column[last]
+                self._names[position] = self._names[last]
+                self._descriptions[position] = self._descriptions[last]
+                self._index[moved] = position
+            self._names.pop()
+            self._descriptions.pop()
+            if np is None:
+                for column in (self._ids, self._prices, self._stocks):
+                    column.pop()
+            self._size = last
+
+    def _reserve(self, size: int) -> None:
+        """Grow the NumPy columns geometrically so appends stay amortised O(1)."""
+        capacity = len(self._ids)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 1024)
+        for name in ("_ids", "_prices", "_stocks"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[: len(column)] = column
+            setattr(self, name, grown)
+
+    def _row(self, position: int) -> Dict[str, Any]:
+        return {
+            "id": int(self._ids[position]),
+            "name": self._names[position],
+            "description": self._descriptions[position],
+            "price": float(self._prices[position]),
+            "stock": int(self._stocks[position]),
+        }
+
+    def search(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_stock: Optional[int] = None,
+        sort: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Filter products by price and stock ranges and return a sorted page.
+
+        Ties, and results without a sort key, are ordered by id, so pages match
+        the equivalent SQL query.
+
+        Args:
+            min_price: Lowest price to include
+            max_price: Highest price to include
+            min_stock: Lowest stock to include, 1 for products in stock
+            sort: "price", "stock", "-price" or "-stock"
+            skip: Number of matches to skip
+            limit: Maximum number of matches to return
+
+        Returns:
+            Matching products as dicts with id, name, description, price and stock
+
+        Raises:
+            ValueError: If the sort field is not supported
+        """
+        field, descending = parse_sort(sort)
+        if limit <= 0:
+            return []
+        with self._lock:
+            if np is not None:
+                positions = self._search_numpy(
+                    min_price, max_price, min_stock, field, descending, skip + limit
+                )
+            else:
+                positions = self._search_python(
+                    min_price, max_price, min_stock, field, descending, skip + limit
+                )
+            return [self._row(p) for p in positions[skip : skip + limit]]
+
+    def _search_numpy(self, min_price, max_price, min_stock, field, descending, k):
+        ids = self._ids[: self._size]
+        prices = self._prices[: self._size]
+        mask = np.ones(self._size, dtype=bool)
+        if min_price is not None:
+            mask &= prices >= min_price
+        if max_price is not None:
+            mask &= prices <= max_price
+        if min_stock is not None:
+            mask &= self._stocks[: self._size] >= min_stock
+        positions = np.flatnonzero(mask)
+
+        if field is None:
+            keys = ids[positions]
+        else:
+            column = prices if field == "price" else self._stocks[: self._size]
+            keys = column[positions]
+            if descending:
+                keys = -keys
+        if k < len(positions):
+            # Keep everything up to the k-th key, ties included, before sorting
+            kth = np.partition(keys, k - 1)[k - 1]
+            selected = keys <= kth
+            positions, keys = positions[selected], keys[selected]
+        order = np.lexsort((ids[positions], keys))
+        return positions[order][:k].tolist()
+
+    def _search_python(self, min_price, max_price, min_stock, field, descending, k):
+        positions = [
+            p
+            for p in range(self._size)
+            if (min_price is None or self._prices[p] >= min_price)
+            and (max_price is None or self._prices[p] <= max_price)
+            and (min_stock is None or self._stocks[p] >= min_stock)
+        ]
+        if field is None:
+            key = self._ids.__getitem__
+        else:
+            column = self._prices if field == "price" else self._stocks
+            sign = -1 if descending else 1
+            key = lambda p: (sign * column[p], self._ids[p])  # noqa: E731
+        return heapq.nsmallest(k, positions, key=key)
+
+    def quote(self, items: Sequence[Tuple[int, int]]) -> Dict[str, Any]:
+        """
+        Price a cart from the snapshot.
+
+        The quote is indicative only: prices and stock may have changed since the
+        last refresh and placing the order re-checks both in the database.
+
+        Args:
+            items: (product_id, quantity) pairs
+
+        Returns:
+            Dict with per-line prices and stock availability, the cart total and
+            the ids of products not in the catalog
+        """
+        with self._lock:
+            found = [(pid, qty, self._index.get(pid)) for pid, qty in items]
+            missing = [pid for pid, _, position in found if position is None]
+            found = [line for line in found if line[2] is not None]
+            positions = [position for _, _, position in found]
+            if np is not None:
+                quantities = np.array([qty for _, qty, _ in found], dtype=np.int64)
+                prices = self._prices[positions]
+                totals = (prices * quantities).round(2).tolist()
+                available = (self._stocks[positions] >= quantities).tolist()
+                prices = prices.tolist()
+            else:
+                prices = [self._prices[p] for p in positions]
+                totals = [
+                    round(price * qty, 2) for price, (_, qty, _) in zip(prices, found)
+                ]
+                available = [self._stocks[p] >= qty for _, qty, p in found]
+
+        lines = [
+            {
+                "product_id": pid,
+                "quantity": qty,
+                "unit_price": price,
+                "line_total": total,
+                "available": ok,
+            }
+            for (pid, qty, _), price, total, ok in zip(found, prices, totals, available)
+        ]
+        return {
+            "items": lines,
+            "total": round(sum(totals), 2),
+            "missing": missing,
+        }
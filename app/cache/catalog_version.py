@@ -0,0 +1,50 @@
+import threading
+import time
+from typing import Callable, Optional
+
+
+class CatalogVersion:
+    """
+    Process-wide copy of the newest catalog change version.
+
+    Cached product pages are keyed by this version. It is read from the database
+    at most every ``max_age`` seconds, so cache hits need no query while writes by
+    other workers and tools still retire pages within ``max_age``. Commits made by
+    this worker mark it stale at once.
+    """
+
+    def __init__(self, max_age: float = 1.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._value: Optional[int] = None
+        self._read_at = 0.0
+        # Bumped by mark_stale, so a read racing a commit is not kept
+        self._generation = 0
+
+    def mark_stale(self, *args) -> None:
+        """Make the next lookup read the database, e.g. after a local commit."""
+        with self._lock:
+            self._value = None
+            self._generation += 1
+
+    def get(self, load: Callable[[], int]) -> int:
+        """
+        Return the catalog version, reading it with ``load`` once it is too old.
+
+        Args:
+            load: Reads the current version from the database
+
+        Returns:
+            The newest known catalog change version
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._value is not None and now - self._read_at < self.max_age:
+                return self._value
+            generation = self._generation
+
+        value = load()
+        with self._lock:
+            if generation == self._generation:
+                self._value, self._read_at = value, now
+        return value
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+
+from app.cache.singleflight import SingleFlight
+
+
+def make_cache_key(path: str, params: Mapping[str, object]) -> str:
+    """
+    Build a cache key from a route path and its validated query parameters.
+
+    Parameters are sorted so that equivalent requests share an entry regardless of
+    the order or spelling of their query string.
+
+    Args:
+        path: Route path, e.g. "/api/v1/products/"
+        params: Query parameters after validation and defaults
+
+    Returns:
+        Cache key string
+    """
+    return f"{path}?{urlencode(sorted(params.items()))}"
+
+
+class ResponseCache:
+    """
+    Thread-safe cache of serialised response bodies with TTL and LRU bounds.
+
+    Misses for the same key are coalesced so that only one caller renders the body
+    while the others wait for it.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, Tuple[float, bytes]] = OrderedDict()
+        self._flight = SingleFlight()
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Return the cache counters."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hit_ratio,
+        }
+
+    def record(self, hit: bool) -> None:
+        """Count a lookup, for callers that combine ``get`` and ``set`` themselves."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Return the cached body for ``key``, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, body = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def set(self, key: Hashable, body: bytes, generation: Optional[int] = None) -> None:
+        """
+        Store a body, evicting the least recently used entries beyond the bound.
+
+        If ``generation`` is given and the cache was invalidated since it was read,
+        the body is considered stale and is not stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, render: Callable[[], bytes]) -> bytes:
+        """
+        Return the cached body for ``key``, rendering and storing it on a miss.
+
+        Args:
+            key: Cache key, see :func:`make_cache_key`
+            render: Produces the serialised body, called once per miss burst
+
+        Returns:
+            Serialised response body
+        """
+        if not self.enabled:
+            return render()
+
+        body = self.get(key)
+        self.record(hit=body is not None)
+        if body is not None:
+            return body
+        return self._flight.do(key, lambda: self._load(key, render))
+
+    def _load(self, key: Hashable, render: Callable[[], bytes]) -> bytes:
+        """Render a missing entry unless a previous flight already filled it."""
+        body = self.get(key)
+        if body is not None:
+            return body
+
+        generation = self._generation
+        body = render()
+        self.set(key, body, generation=generation)
+        return body
+
+    def clear(self, *args) -> None:
+        """
+        Drop every entry.
+
+        Accepts and ignores positional arguments so it can be registered directly
+        as a commit callback.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def discard(self, keys: Iterable[Hashable]) -> None:
+        """
+        Drop the given entries, absent keys are ignored.
+
+        Unlike :meth:`clear` this does not stop bodies rendered before the call from
+        being stored, so callers relying on it need a short TTL or immutable data.
+        """
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
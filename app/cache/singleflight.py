@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """An in-flight call whose outcome is shared by every caller of the same key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into a single execution.
+
+    The first caller of a key runs the function, callers arriving while it runs wait
+    for it and receive the same result or exception. Once the call completes the key
+    is forgotten, so later callers trigger a fresh execution and never see a stale
+    result.
+
+    Waiters give up after ``timeout`` seconds and run their own function instead, so
+    a stuck leader cannot hold everyone else hostage.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run ``fn`` once for all concurrent callers of ``key``.
+
+        Args:
+            key: Identifies calls that can share a result
+            fn: Function producing the result
+
+        Returns:
+            The result of the shared call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            if not call.done.wait(self.timeout):
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await ``fn()`` once for all concurrent callers of ``key`` on this event loop.
+
+        Args:
+            key: Identifies calls that can share a result
+            fn: Coroutine function producing the result
+
+        Returns:
+            The result of the shared call
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+
+        future = self._async_calls.get(flight_key)
+        if future is not None:
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                return await fn()
+            except asyncio.CancelledError:
+                # The leader was cancelled, only propagate our own cancellation
+                if not future.cancelled():
+                    raise
+                return await fn()
+
+        future = self._async_calls[flight_key] = loop.create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._async_calls[flight_key]
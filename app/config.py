@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -16,6 +19,122 @@ class _Settings(BaseSettings):
     POSTGRES_HOST: str
     POSTGRES_PORT: int = 5432
 
+    # Database driver, psycopg2 or psycopg (version 3). With psycopg statements run
+    # DB_PREPARE_THRESHOLD times are prepared on the server; 5 is psycopg's own
+    # default, set it to None behind a transaction-pooling PgBouncer
+    DB_DRIVER: Literal["psycopg2", "psycopg"] = "psycopg2"
+    DB_PREPARE_THRESHOLD: int | None = 5
+
+    # Connection pool settings, the production launcher derives the pool size per
+    # worker from DB_MAX_CONNECTIONS when DB_POOL_SIZE is not set explicitly
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_MAX_CONNECTIONS: int = 100
+    DB_RESERVED_CONNECTIONS: int = 10
+
+    # Read replica settings, reads fall back to the primary when no replica is set
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_BALANCING: str = "round_robin"  # or "least_connections"
+    DB_REPLICA_RETRY_SECONDS: int = 30
+    DB_READ_YOUR_WRITES_SECONDS: int = 5
+
+    # Migrations give up on a lock they cannot get within this time instead of
+    # queueing, and every query on the table with them, behind long transactions
+    MIGRATION_LOCK_TIMEOUT_MS: int = 5000
+
+    # Product listing response cache, a TTL of 0 disables it
+    PRODUCT_CACHE_TTL_SECONDS: int = 30
+    PRODUCT_CACHE_MAX_ENTRIES: int = 1024
+    # Longest time pages are served after another worker or tool changed the
+    # catalog, this worker's own changes take effect at once
+    PRODUCT_CACHE_VERSION_MAX_AGE_SECONDS: float = 1.0
+
+    # Order lookup cache. Completed orders never change and stay cached until
+    # evicted, pending ones only briefly; status changes drop them at once
+    ORDER_CACHE_MAX_ENTRIES: int = 50000
+    ORDER_PENDING_CACHE_TTL_SECONDS: float = 2
+
+    # Most product IDs one batch lookup may ask for
+    PRODUCT_BATCH_MAX_IDS: int = 1000
+
+    # Bulk stock and price adjustments, each chunk is one UPDATE and transaction
+    STOCK_ADJUSTMENT_MAX_ITEMS: int = 50000
+    STOCK_ADJUSTMENT_CHUNK_SIZE: int = 1000
+    # Deadline of an adjustment request, long enough for STOCK_ADJUSTMENT_MAX_ITEMS
+    # so a batch is not cancelled after some of its chunks were committed
+    STOCK_ADJUSTMENT_TIMEOUT_SECONDS: float = 120
+
+    # Longest time a product lookup waits on a concurrent identical lookup
+    PRODUCT_COALESCE_MAX_WAIT_SECONDS: float = 2.0
+
+    # Columnar in-memory catalog for product search and cart quotes, refreshed
+    # from rows whose updated_at changed once it is older than the max age
+    CATALOG_SNAPSHOT_ENABLED: bool = False
+    CATALOG_SNAPSHOT_MAX_AGE_SECONDS: float = 1.0
+    CATALOG_SNAPSHOT_OVERLAP_SECONDS: float = 5.0
+
+    # Age a change must reach before the change feed returns it, longer than any
+    # write transaction (request transactions end within REQUEST_TIMEOUT_SECONDS)
+    PRODUCT_CHANGES_SETTLE_SECONDS: float = 10
+
+    # Product change stream, "postgres" fans changes out to every worker through
+    # LISTEN/NOTIFY while "local" only reaches the worker that made the change.
+    # app.server picks "postgres" for several workers and refuses "local" there
+    PRODUCT_EVENTS_BUS: str = "local"
+    PRODUCT_EVENTS_HISTORY: int = 1000
+    PRODUCT_EVENTS_MAX_PENDING: int = 100
+    PRODUCT_EVENTS_MAX_SUBSCRIBERS: int = 1000
+    PRODUCT_EVENTS_HEARTBEAT_SECONDS: float = 15
+
+    # Admission control, token buckets per client (API key or address) and load
+    # shedding once too many requests are in flight or pool waits grow too long
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_ORDERS_PER_SECOND: float = 5
+    RATE_LIMIT_ORDERS_BURST: int = 20
+    RATE_LIMIT_CATALOG_PER_SECOND: float = 50
+    RATE_LIMIT_CATALOG_BURST: int = 100
+    RATE_LIMIT_REDIS_URL: str | None = None
+    # API keys with a budget of their own, other clients are limited by address
+    RATE_LIMIT_API_KEYS: list[str] = []
+    ADMISSION_MAX_IN_FLIGHT: int = 200
+    ADMISSION_MAX_POOL_WAIT_MS: float = 500
+
+    # Request deadlines in seconds, ROUTE_TIMEOUTS maps "METHOD /path" prefixes to
+    # their own budget, e.g. {"POST /api/v1/orders": 15}, and takes precedence over
+    # STOCK_ADJUSTMENT_TIMEOUT_SECONDS
+    REQUEST_TIMEOUT_SECONDS: float = 10
+    ROUTE_TIMEOUTS: dict[str, float] = {}
+
+    # Response compression, bodies below the minimum size are sent uncompressed
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # Admin endpoints and request profiling are only installed when a token is set
+    ADMIN_TOKEN: str | None = None
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5
+    PROFILING_MAX_SECONDS: float = 60
+
+    # Tracing, installed unless the exporter is "none". New traces are sampled at
+    # TRACING_SAMPLE_RATE, traces continued from a traceparent header follow the
+    # caller's decision. "file" writes OTLP JSON lines to TRACING_FILE ("-" for
+    # stdout), "otlp" posts them to an OTLP/HTTP endpoint
+    TRACING_EXPORTER: Literal["none", "file", "otlp"] = "none"
+    TRACING_SAMPLE_RATE: float = 0.01
+    TRACING_FILE: str = "-"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_OTLP_HEADERS: dict[str, str] = {}
+    TRACING_SERVICE_NAME: str = "ecommerce-api"
+
+    # Production server settings, WEB_CONCURRENCY defaults to the CPU count
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: int | None = None
+    WORKER_MAX_REQUESTS: int = 10000
+    WORKER_MAX_REQUESTS_JITTER: int = 1000
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30
+
     # Environment
     ENVIRONMENT: str = "dev"
 
@@ -31,7 +150,8 @@ class _Settings(BaseSettings):
     @property
     def db_url(self) -> str:
         return (
-            f"postgresql+psycopg2://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@"
+            f"postgresql+{self.DB_DRIVER}://"
+            f"{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@"
             f"{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
@@ -41,5 +161,17 @@ class _Settings(BaseSettings):
         frozen = True
 
 
-# Create a global settings object
-settings = _Settings()
+@lru_cache
+def get_settings() -> _Settings:
+    """
+    Build the settings object on first use and return the same instance afterwards.
+    """
+    return _Settings()
+
+
+def __getattr__(name: str):
+    # Keep ``from app.config import settings`` working without reading the
+    # environment at import time
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,14 +1,25 @@
 from typing import List
 
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
-
-from app.crud.product import get_product, update_product_stock
-from app.exceptions.http_exceptions import InsufficientStockException, InvalidOrderDataException
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.orm import Session, joinedload
+
+from app.crud.product import get_products_by_ids, take_stock
+from app.crud.stock_shard import take_sharded_stock
+from app.db.database import query_cancelled
+from app.exceptions.http_exceptions import (
+    InsufficientStockException,
+    InvalidOrderDataException,
+    OrderNotFoundException,
+    OrderStatusConflictException,
+    ProductNotFoundException,
+)
 from app.models.order import Order, OrderItem, OrderStatus
 from app.schemas.order import OrderCreate
+from app.tracing.tracer import traced
 
 
+@traced()
 def get_orders(db: Session, skip: int = 0, limit: int = 100) -> List[Order]:
     """
     Retrieve a list of orders with optional pagination.
@@ -24,10 +35,92 @@ def get_orders(db: Session, skip: int = 0, limit: int = 100) -> List[Order]:
     return db.query(Order).offset(skip).limit(limit).all()
 
 
+@traced()
+def get_order(db: Session, order_id: int) -> Order:
+    """
+    Retrieve an order with its items, loaded in the same query.
+
+    Args:
+        db: Database session
+        order_id: ID of the order
+
+    Returns:
+        The Order object
+
+    Raises:
+        OrderNotFoundException: If the order doesn't exist
+    """
+    order = db.scalars(
+        select(Order).options(joinedload(Order.items)).where(Order.id == order_id)
+    ).first()
+    if order is None:
+        raise OrderNotFoundException(order_id)
+    return order
+
+
+@traced()
+def get_order_by_reference(db: Session, reference: str) -> Order:
+    """
+    Retrieve an order with its items by its customer-facing reference.
+
+    Args:
+        db: Database session
+        reference: Order reference, e.g. "ORD-7KQ2M9XD4F"
+
+    Returns:
+        The Order object
+
+    Raises:
+        OrderNotFoundException: If no order has the reference
+    """
+    order = db.scalars(
+        select(Order)
+        .options(joinedload(Order.items))
+        .where(Order.reference == reference)
+    ).first()
+    if order is None:
+        raise OrderNotFoundException(reference)
+    return order
+
+
+@traced()
+def update_order_status(db: Session, order_id: int, status: OrderStatus) -> Order:
+    """
+    Change the status of an order.
+
+    Args:
+        db: Database session
+        order_id: ID of the order
+        status: New status
+
+    Returns:
+        The updated Order object
+
+    Raises:
+        OrderNotFoundException: If the order doesn't exist
+        OrderStatusConflictException: If the order is already completed
+    """
+    order = db.get(Order, order_id, with_for_update=True)
+    if order is None:
+        raise OrderNotFoundException(order_id)
+    if order.status == OrderStatus.COMPLETED.value:
+        db.rollback()
+        raise OrderStatusConflictException(order_id)
+
+    order.status = status.value
+    db.commit()
+    return get_order(db, order_id)
+
+
+@traced()
 def create_order(db: Session, order: OrderCreate) -> Order:
     """
     Create a new order after validating product availability.
 
+    The number of statements does not grow with the number of items: the products
+    are read in one query, unsharded stock is taken in one conditional UPDATE and
+    the items are inserted in one batch.
+
     Args:
         db: Database session
         order: Validated order data
@@ -39,14 +132,17 @@ def create_order(db: Session, order: OrderCreate) -> Order:
         ProductNotFoundException: If any product in the order doesn't exist
         InsufficientStockException: If any product doesn't have enough stock
         InvalidOrderDataException: If order data is invalid
+        DBAPIError: If a statement was cancelled, e.g. by the request deadline
     """
+    quantities = {item.product_id: item.quantity for item in order.items}
+    products = {product.id: product for product in get_products_by_ids(db, quantities)}
+
     # Validate products and stock availability
-    product_data = []
     total_price = 0.0
-
-    # Check each product in the order
     for item in order.items:
-        product = get_product(db, item.product_id)
+        product = products.get(item.product_id)
+        if product is None:
+            raise ProductNotFoundException(product_id=item.product_id)
 
         # Check if there's enough stock
         if product.stock < item.quantity:
@@ -56,37 +152,58 @@ def create_order(db: Session, order: OrderCreate) -> Order:
                 available_quantity=product.stock,
             )
 
-        # Calculate price for this line item
-        item_price = product.price * item.quantity
-        total_price += item_price
-
-        # Store product data for later
-        product_data.append((product, item.quantity, product.price))
+        total_price += product.price * item.quantity
 
     try:
-        # Create order
+        for product_id, quantity in quantities.items():
+            if products[product_id].stock_shards:
+                take_sharded_stock(db, products[product_id], quantity)
+
+        unsharded = {
+            product_id: quantity
+            for product_id, quantity in quantities.items()
+            if not products[product_id].stock_shards
+        }
+        remaining = take_stock(db, unsharded)
+        for product_id, quantity in unsharded.items():
+            # Another order took the stock since it was checked above
+            if product_id not in remaining:
+                raise InsufficientStockException(
+                    product_id=product_id,
+                    requested_quantity=quantity,
+                    available_quantity=products[product_id].stock,
+                )
+
         db_order = Order(total_price=total_price, status=OrderStatus.PENDING.value)
         db.add(db_order)
-        db.flush()  # Get the order ID before committing
-
-        # Create order items
-        for product, quantity, price in product_data:
-            order_item = OrderItem(
-                order_id=db_order.id,
-                product_id=product.id,
-                quantity=quantity,
-                unit_price=price,
-            )
-            db.add(order_item)
-
-            # Update product stock
-            update_product_stock(db, product.id, -quantity)
+        db.flush()  # Get the order ID for the items
+
+        # Nothing is read back, so the items go out as one executemany batch
+        db.execute(
+            insert(OrderItem.__table__).inline(),
+            [
+                {
+                    "order_id": db_order.id,
+                    "product_id": item.product_id,
+                    "quantity": item.quantity,
+                    "unit_price": products[item.product_id].price,
+                }
+                for item in order.items
+            ],
+        )
 
         # Commit the transaction
         db.commit()
         db.refresh(db_order)
         return db_order
 
+    except InsufficientStockException:
+        db.rollback()
+        raise
     except SQLAlchemyError as e:
         db.rollback()
+        # A statement cancelled by the request deadline is not bad order data,
+        # the deadline handler answers it with 504
+        if isinstance(e, DBAPIError) and query_cancelled(e):
+            raise
         raise InvalidOrderDataException(str(e))
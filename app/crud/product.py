@@ -1,12 +1,37 @@
-from typing import List
+import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case, func, or_, select, union_all, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.exceptions.http_exceptions import ProductNotFoundException
-from app.models.product import Product
-from app.schemas.product import ProductCreate, ProductUpdate
+from app.cache.catalog_snapshot import parse_sort
+from app.cache.singleflight import SingleFlight
+from app.config import settings
+from app.crud.stock_shard import (
+    add_sharded_stock,
+    apply_sharded_stock,
+    current_stock,
+    set_stock_shards,
+    sharded_stock_totals,
+    spread_stock,
+    take_sharded_stock,
+)
+from app.db.base import utcnow
+from app.db.events import record_changes
+from app.exceptions.http_exceptions import (
+    InsufficientStockException,
+    ProductInUseException,
+    ProductNotFoundException,
+)
+from app.models.order import OrderItem
+from app.models.product import Product, ProductStockShard, ProductTombstone
+from app.schemas.product import ProductCreate, ProductUpdate, StockAdjustment
+from app.tracing.tracer import traced
 
 
+@traced()
 def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[Product]:
     """
     Retrieve a list of products with optional pagination.
@@ -19,9 +44,97 @@ def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[Product]:
     Returns:
         List of Product objects
     """
-    return db.query(Product).offset(skip).limit(limit).all()
+    products = db.query(Product).offset(skip).limit(limit).all()
+    apply_sharded_stock(db, products)
+    return products
 
 
+@traced()
+def search_products(
+    db: Session,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_stock: Optional[int] = None,
+    sort: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[Product]:
+    """
+    Filter products by price and stock ranges in the database.
+
+    Args:
+        db: Database session
+        min_price: Lowest price to include
+        max_price: Highest price to include
+        min_stock: Lowest stock to include, 1 for products in stock
+        sort: "price", "stock", "-price" or "-stock", ties are ordered by ID
+        skip: Number of records to skip
+        limit: Maximum number of records to return
+
+    Returns:
+        List of matching Product objects
+
+    Raises:
+        ValueError: If the sort field is not supported
+    """
+    field, descending = parse_sort(sort)
+    query = db.query(Product)
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if min_stock is not None:
+        query = query.filter(current_stock() >= min_stock)
+    if field is not None:
+        column = current_stock() if field == "stock" else Product.price
+        query = query.order_by(column.desc() if descending else column)
+    products = query.order_by(Product.id).offset(skip).limit(limit).all()
+    apply_sharded_stock(db, products)
+    return products
+
+
+@traced()
+def quote_cart(db: Session, items: Sequence[Tuple[int, int]]) -> Dict[str, Any]:
+    """
+    Price a cart from the database without reserving stock.
+
+    Args:
+        db: Database session
+        items: (product_id, quantity) pairs
+
+    Returns:
+        Dict with per-line prices and stock availability, the cart total and the
+        IDs of products that do not exist
+    """
+    rows = {
+        row.id: row
+        for row in db.query(
+            Product.id, Product.price, Product.stock, Product.stock_shards
+        ).filter(Product.id.in_({product_id for product_id, _ in items}))
+    }
+    stock = {row.id: row.stock for row in rows.values()}
+    stock.update(
+        sharded_stock_totals(db, (row.id for row in rows.values() if row.stock_shards))
+    )
+    lines = [
+        {
+            "product_id": product_id,
+            "quantity": quantity,
+            "unit_price": rows[product_id].price,
+            "line_total": round(rows[product_id].price * quantity, 2),
+            "available": stock[product_id] >= quantity,
+        }
+        for product_id, quantity in items
+        if product_id in rows
+    ]
+    return {
+        "items": lines,
+        "total": round(sum(line["line_total"] for line in lines), 2),
+        "missing": [product_id for product_id, _ in items if product_id not in rows],
+    }
+
+
+@traced()
 def get_product(db: Session, product_id: int) -> Product:
     """
     Retrieve a single product by ID.
@@ -39,9 +152,120 @@ def get_product(db: Session, product_id: int) -> Product:
     product = db.query(Product).filter(Product.id == product_id).first()
     if product is None:
         raise ProductNotFoundException(product_id=product_id)
+    apply_sharded_stock(db, [product])
     return product
 
 
+@traced()
+def get_products_by_ids(db: Session, product_ids: Iterable[int]) -> List[Product]:
+    """
+    Retrieve several products by ID in one query.
+
+    Args:
+        db: Database session
+        product_ids: IDs of the products to retrieve
+
+    Returns:
+        The products found, in no particular order; unknown IDs are skipped
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return []
+    products = db.query(Product).filter(Product.id.in_(product_ids)).all()
+    apply_sharded_stock(db, products)
+    return products
+
+
+@traced()
+def get_products_batch(
+    db: Session, product_ids: Sequence[int]
+) -> Tuple[List[Product], List[int]]:
+    """
+    Retrieve products by ID in one query, in the order they were asked for.
+
+    Args:
+        db: Database session
+        product_ids: IDs of the products to retrieve, duplicates are ignored
+
+    Returns:
+        Tuple of the found products in request order and the IDs that do not exist
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    found = {product.id: product for product in get_products_by_ids(db, product_ids)}
+    products = [found[pid] for pid in product_ids if pid in found]
+    missing = [pid for pid in product_ids if pid not in found]
+    return products, missing
+
+
+# Shares in-flight read-only product lookups between concurrent requests
+_product_lookups = SingleFlight(timeout=settings.PRODUCT_COALESCE_MAX_WAIT_SECONDS)
+
+
+def _lookup_key(db: Session, product_id: int) -> Tuple[Any, ...]:
+    """
+    Key under which lookups are shared, per database the session reads from.
+
+    A session pinned to the primary must not be handed a row read from a replica.
+    """
+    return (db.get_bind().url, "product", product_id)
+
+
+def _load_detached_product(db: Session, product_id: int) -> Product:
+    """Load a product and detach it so it can be handed to other sessions' callers."""
+    product = get_product(db, product_id)
+    db.expunge(product)
+    return product
+
+
+@traced()
+def read_product(db: Session, product_id: int) -> Product:
+    """
+    Retrieve a single product for read-only use.
+
+    Concurrent lookups of the same ID on the same database share a single query,
+    so replica and primary reads are never mixed. The returned object is
+    detached from the session and must not be modified; use get_product for writes.
+
+    Args:
+        db: Database session
+        product_id: ID of the product to retrieve
+
+    Returns:
+        Detached Product object
+
+    Raises:
+        ProductNotFoundException: If product with given ID doesn't exist
+    """
+    return _product_lookups.do(
+        _lookup_key(db, product_id), lambda: _load_detached_product(db, product_id)
+    )
+
+
+@traced()
+async def read_product_async(db: Session, product_id: int) -> Product:
+    """
+    Async variant of read_product for use from the event loop.
+
+    The query runs in the threadpool and is shared with concurrent async lookups of
+    the same ID.
+
+    Args:
+        db: Database session
+        product_id: ID of the product to retrieve
+
+    Returns:
+        Detached Product object
+
+    Raises:
+        ProductNotFoundException: If product with given ID doesn't exist
+    """
+    return await _product_lookups.do_async(
+        _lookup_key(db, product_id),
+        lambda: run_in_threadpool(_load_detached_product, db, product_id),
+    )
+
+
+@traced()
 def create_product(db: Session, product: ProductCreate) -> Product:
     """
     Create a new product.
@@ -60,6 +284,7 @@ def create_product(db: Session, product: ProductCreate) -> Product:
     return db_product
 
 
+@traced()
 def update_product(db: Session, product_id: int, product: ProductUpdate) -> Product:
     """
     Update an existing product.
@@ -79,14 +304,339 @@ def update_product(db: Session, product_id: int, product: ProductUpdate) -> Prod
 
     # Only update fields that are provided
     update_data = product.dict(exclude_unset=True)
+    if db_product.stock_shards and "stock" in update_data:
+        # Sharded stock lives in the shard rows, spread the new total over them
+        set_stock_shards(
+            db, product_id, db_product.stock_shards, total=update_data.pop("stock")
+        )
     for key, value in update_data.items():
         setattr(db_product, key, value)
 
     db.commit()
     db.refresh(db_product)
+    apply_sharded_stock(db, [db_product])
     return db_product
 
 
+@traced()
+def delete_product(db: Session, product_id: int) -> ProductTombstone:
+    """
+    Delete a product and leave a tombstone for incremental sync clients.
+
+    Args:
+        db: Database session
+        product_id: ID of the product to delete
+
+    Returns:
+        The tombstone recording the deletion
+
+    Raises:
+        ProductNotFoundException: If product with given ID doesn't exist
+        ProductInUseException: If existing orders refer to the product
+    """
+    db_product = get_product(db, product_id)
+    if db.query(OrderItem.id).filter(OrderItem.product_id == product_id).first():
+        raise ProductInUseException(product_id=product_id)
+
+    db.query(ProductStockShard).filter(
+        ProductStockShard.product_id == product_id
+    ).delete(synchronize_session=False)
+    db.delete(db_product)
+    tombstone = ProductTombstone(product_id=product_id)
+    db.add(tombstone)
+    db.commit()
+    db.refresh(tombstone)
+    return tombstone
+
+
+@traced()
+def get_catalog_version(db: Session) -> int:
+    """
+    Highest change version of any product, stock shard or tombstone.
+
+    Every catalog write draws a new version, so the result changes with writes
+    made by any process. Each part is answered from its version index.
+
+    Args:
+        db: Database session
+
+    Returns:
+        The newest change version, 0 for an empty catalog
+    """
+    versions = union_all(
+        select(func.max(Product.version).label("version")),
+        select(func.max(ProductStockShard.version)),
+        select(func.max(ProductTombstone.version)),
+    ).subquery()
+    return db.scalar(select(func.coalesce(func.max(versions.c.version), 0)))
+
+
+@traced()
+def get_product_changes(
+    db: Session, since: int = 0, limit: int = 1000, settle_seconds: float = 0
+) -> Tuple[List[Product], List[ProductTombstone], int, bool]:
+    """
+    Retrieve products changed and deleted after a given change version.
+
+    Versions are drawn when a row is written but become visible when its
+    transaction commits, so a lower version can appear after a higher one. Changes
+    younger than ``settle_seconds`` are therefore held back together with
+    everything after them; with it longer than any write transaction, a client
+    that resumes from the returned version misses nothing.
+
+    Orders on sharded products only write their shards, which draw versions of
+    their own; such a product is returned as changed at its newest shard version.
+
+    Args:
+        db: Database session
+        since: Version returned by the previous call, 0 for a full sync
+        limit: Maximum number of changes and deletions to return
+        settle_seconds: Age a change must reach before it is returned
+
+    Returns:
+        Changed products and tombstones in version order, the version to resume
+        from and whether more changes are ready
+    """
+    products = (
+        db.query(Product)
+        .filter(Product.version > since)
+        .order_by(Product.version)
+        .limit(limit + 1)
+        .all()
+    )
+    tombstones = (
+        db.query(ProductTombstone)
+        .filter(ProductTombstone.version > since)
+        .order_by(ProductTombstone.version)
+        .limit(limit + 1)
+        .all()
+    )
+    newest_shard = func.max(ProductStockShard.version)
+    shard_changes = (
+        db.query(
+            ProductStockShard.product_id,
+            newest_shard,
+            func.max(ProductStockShard.updated_at),
+        )
+        .filter(ProductStockShard.version > since)
+        .group_by(ProductStockShard.product_id)
+        .order_by(newest_shard)
+        .limit(limit + 1)
+        .all()
+    )
+    merged = sorted(
+        [(p.version, p.updated_at, p) for p in products]
+        + [(t.version, t.created_at, t) for t in tombstones]
+        + [(version, written_at, pid) for pid, version, written_at in shard_changes],
+        key=lambda change: change[0],
+    )
+
+    cutoff = utcnow().replace(tzinfo=None) - datetime.timedelta(seconds=settle_seconds)
+    ready = []
+    for version, written_at, change in merged[:limit]:
+        if settle_seconds and (written_at is None or written_at > cutoff):
+            break
+        ready.append((version, change))
+    has_more = len(ready) == limit and len(merged) > limit
+
+    # A product can show up through its own row and its shards, report it once
+    # at its newest version
+    versions = {}
+    for version, change in ready:
+        if not isinstance(change, ProductTombstone):
+            versions[change if isinstance(change, int) else change.id] = version
+    loaded = {c.id: c for _, c in ready if isinstance(c, Product)}
+    loaded.update(
+        (product.id, product)
+        for product in db.query(Product).filter(
+            Product.id.in_(set(versions) - set(loaded))
+        )
+    )
+    changed = []
+    for product_id, version in sorted(versions.items(), key=lambda item: item[1]):
+        # Deleted since its shards changed, its tombstone reports that
+        if product_id in loaded:
+            product = loaded[product_id]
+            set_committed_value(product, "version", max(version, product.version))
+            changed.append(product)
+    apply_sharded_stock(db, changed)
+    deleted = [c for _, c in ready if isinstance(c, ProductTombstone)]
+    next_since = ready[-1][0] if ready else since
+    return changed, deleted, next_since, has_more
+
+
+@traced()
+def take_stock(db: Session, quantities: Mapping[int, int]) -> Dict[int, int]:
+    """
+    Remove stock from several unsharded products in one conditional UPDATE.
+
+    A product is only changed when it still holds the quantity, so concurrent
+    orders cannot take its stock below zero. Nothing is committed.
+
+    Args:
+        db: Database session
+        quantities: Stock to remove keyed by product ID
+
+    Returns:
+        Remaining stock keyed by product ID; products that were missing, sharded
+        or short of stock are left out and unchanged
+    """
+    if not quantities:
+        return {}
+    taken = case(dict(quantities), value=Product.id)
+    rows = db.execute(
+        update(Product)
+        .where(
+            Product.id.in_(quantities),
+            Product.stock_shards == 0,
+            Product.stock >= taken,
+        )
+        .values(stock=Product.stock - taken)
+        .returning(Product.id, Product.stock, Product.version)
+        .execution_options(synchronize_session=False)
+    ).all()
+    record_changes(
+        db,
+        "products",
+        {
+            row.id: {"id": row.id, "stock": row.stock, "version": row.version}
+            for row in rows
+        },
+    )
+    return {row.id: row.stock for row in rows}
+
+
+@traced()
+def adjust_products(
+    db: Session, adjustments: Sequence[StockAdjustment], chunk_size: int = 1000
+) -> List[Dict[str, Any]]:
+    """
+    Apply stock and price adjustments with one set-based UPDATE per chunk.
+
+    Each chunk is committed as its own transaction. One UPDATE writes the stock
+    deltas, absolute stock and prices of the chunk's unsharded products, and its
+    WHERE clause skips products whose stock would go below zero. Only the products
+    it skipped are read back, to tell missing products from short ones. Sharded
+    products are adjusted through their shards instead. An adjustment is applied
+    completely or not at all.
+
+    Args:
+        db: Database session
+        adjustments: Adjustments, at most one per product
+        chunk_size: Adjustments per UPDATE and transaction
+
+    Returns:
+        One outcome per adjustment in the same order, with its product_id, status
+        ("applied", "not_found" or "insufficient_stock"), stock and price
+    """
+    results = []
+    for start in range(0, len(adjustments), chunk_size):
+        results.extend(_adjust_chunk(db, adjustments[start : start + chunk_size]))
+    return results
+
+
+def _adjust_chunk(
+    db: Session, chunk: Sequence[StockAdjustment]
+) -> List[Dict[str, Any]]:
+    """Apply and commit one chunk of adjustments, see adjust_products."""
+    by_id = {adjustment.product_id: adjustment for adjustment in chunk}
+    absolute = {a.product_id: a.stock for a in chunk if a.stock is not None}
+    stock_changes = {
+        a.product_id: a.stock_delta for a in chunk if a.stock_delta is not None
+    }
+    stock_changes.update(absolute)
+    prices = {a.product_id: a.price for a in chunk if a.price is not None}
+
+    # New stock is stock * kept + added, with kept 0 only for absolute stock, so
+    # the CASE expressions hold plain values rather than one expression per row
+    new_stock = Product.stock
+    values = {}
+    if stock_changes:
+        if absolute:
+            new_stock = Product.stock * case(
+                dict.fromkeys(absolute, 0), value=Product.id, else_=1
+            )
+        new_stock = new_stock + case(stock_changes, value=Product.id, else_=0)
+        values["stock"] = new_stock
+    if prices:
+        values["price"] = case(prices, value=Product.id, else_=Product.price)
+
+    rows = db.execute(
+        update(Product)
+        .where(
+            Product.id.in_(by_id),
+            new_stock >= 0,
+            # Sharded stock lives in the shard rows, only their prices change here
+            or_(Product.stock_shards == 0, Product.id.not_in(stock_changes)),
+        )
+        .values(**values)
+        .returning(
+            Product.id,
+            Product.stock,
+            Product.price,
+            Product.version,
+            Product.stock_shards,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    outcomes: Dict[int, Dict[str, Any]] = {}
+    changes = {}
+    totals = sharded_stock_totals(db, (row.id for row in rows if row.stock_shards))
+    for row in rows:
+        change = {"id": row.id, "price": row.price, "version": row.version}
+        if row.stock_shards:
+            stock = totals.get(row.id, 0)
+        else:
+            stock = change["stock"] = row.stock
+        outcomes[row.id] = {"status": "applied", "stock": stock, "price": row.price}
+        changes[row.id] = change
+    record_changes(db, "products", changes)
+
+    skipped = [product_id for product_id in by_id if product_id not in outcomes]
+    for product in get_products_by_ids(db, skipped):
+        if product.stock_shards:
+            outcomes[product.id] = _adjust_sharded(db, product, by_id[product.id])
+        else:
+            outcomes[product.id] = {
+                "status": "insufficient_stock",
+                "stock": product.stock,
+                "price": product.price,
+            }
+    db.commit()
+
+    missing = {"status": "not_found", "stock": None, "price": None}
+    return [
+        {"product_id": a.product_id, **outcomes.get(a.product_id, missing)}
+        for a in chunk
+    ]
+
+
+def _adjust_sharded(
+    db: Session, product: Product, adjustment: StockAdjustment
+) -> Dict[str, Any]:
+    """Adjust a sharded product through its shards, nothing is committed."""
+    try:
+        if adjustment.stock is not None:
+            spread_stock(db, product, product.stock_shards, adjustment.stock)
+        elif adjustment.stock_delta and adjustment.stock_delta < 0:
+            stock = take_sharded_stock(db, product, -adjustment.stock_delta)
+            set_committed_value(product, "stock", stock)
+        elif adjustment.stock_delta:
+            stock = add_sharded_stock(db, product, adjustment.stock_delta)
+            set_committed_value(product, "stock", stock)
+    except InsufficientStockException as e:
+        return {
+            "status": "insufficient_stock",
+            "stock": e.available_quantity,
+            "price": product.price,
+        }
+    if adjustment.price is not None:
+        product.price = adjustment.price
+    return {"status": "applied", "stock": product.stock, "price": product.price}
+
+
+@traced()
 def update_product_stock(db: Session, product_id: int, quantity_change: int) -> Product:
     """
     Update the stock of a product by a given amount (positive or negative).
@@ -101,10 +651,22 @@ def update_product_stock(db: Session, product_id: int, quantity_change: int) ->
 
     Raises:
         ProductNotFoundException: If product with given ID doesn't exist
+        InsufficientStockException: If a sharded product has too little stock
         ValueError: If stock would go negative
     """
     db_product = get_product(db, product_id)
 
+    if db_product.stock_shards:
+        # Sharded stock is only changed through its shard rows, never the product row
+        if quantity_change < 0:
+            stock = take_sharded_stock(db, db_product, -quantity_change)
+        else:
+            stock = add_sharded_stock(db, db_product, quantity_change)
+        db.commit()
+        db.refresh(db_product)
+        set_committed_value(db_product, "stock", stock)
+        return db_product
+
     new_stock = db_product.stock + quantity_change
 
     if new_stock < 0:
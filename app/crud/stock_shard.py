@@ -0,0 +1,292 @@
+import random
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db.events import record_changes
+from app.exceptions.http_exceptions import (
+    InsufficientStockException,
+    ProductNotFoundException,
+)
+from app.models.product import Product, ProductStockShard
+from app.tracing.tracer import traced
+
+
+def split_stock(total: int, shards: int) -> List[int]:
+    """
+    Spread stock as evenly as possible over a number of shards.
+
+    Args:
+        total: Stock to spread
+        shards: Number of shards
+
+    Returns:
+        Stock of each shard, the first ``total % shards`` get one more
+    """
+    base, extra = divmod(total, shards)
+    return [base + (1 if shard < extra else 0) for shard in range(shards)]
+
+
+def _lock_shards(db: Session, product_id: int) -> List[ProductStockShard]:
+    """Lock a product's shards, always in shard order so lockers cannot deadlock."""
+    return (
+        db.query(ProductStockShard)
+        .filter(ProductStockShard.product_id == product_id)
+        .order_by(ProductStockShard.shard)
+        .with_for_update()
+        .all()
+    )
+
+
+@traced()
+def sharded_stock_totals(db: Session, product_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Sum the shards of sharded products.
+
+    Args:
+        db: Database session
+        product_ids: IDs of sharded products
+
+    Returns:
+        Total stock keyed by product ID
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+    rows = (
+        db.query(ProductStockShard.product_id, func.sum(ProductStockShard.stock))
+        .filter(ProductStockShard.product_id.in_(product_ids))
+        .group_by(ProductStockShard.product_id)
+    )
+    return {product_id: int(total or 0) for product_id, total in rows}
+
+
+def current_stock() -> ColumnElement:
+    """
+    SQL expression for a product's stock, summing the shards of sharded products.
+
+    ``Product.stock`` of a sharded product only holds the total as of the last
+    rebalance, so filters and sorts on stock use this instead.
+    """
+    shard_total = (
+        select(func.coalesce(func.sum(ProductStockShard.stock), 0))
+        .where(ProductStockShard.product_id == Product.id)
+        .scalar_subquery()
+    )
+    return case((Product.stock_shards > 0, shard_total), else_=Product.stock)
+
+
+@traced()
+def apply_sharded_stock(db: Session, products: Iterable[Product]) -> None:
+    """
+    Report the stock of sharded products as the current sum of their shards.
+
+    The loaded objects are updated without marking them as modified, so nothing
+    is written back.
+
+    Args:
+        db: Database session
+        products: Loaded products, unsharded ones are left alone
+    """
+    sharded = [product for product in products if product.stock_shards]
+    totals = sharded_stock_totals(db, (product.id for product in sharded))
+    for product in sharded:
+        set_committed_value(product, "stock", totals.get(product.id, 0))
+
+
+def _record_stock_change(db: Session, product_id: int) -> int:
+    """Publish the product's new total to the commit hooks, return the total."""
+    total = sharded_stock_totals(db, [product_id]).get(product_id, 0)
+    record_changes(db, "products", {product_id: {"id": product_id, "stock": total}})
+    return total
+
+
+@traced()
+def take_sharded_stock(db: Session, product: Product, quantity: int) -> int:
+    """
+    Remove stock from a sharded product without locking its product row.
+
+    A random shard is tried first and the others in turn when it cannot cover the
+    quantity on its own. Only if no single shard can, all shards are locked and
+    drained in order.
+
+    Args:
+        db: Database session
+        product: Sharded product
+        quantity: Stock to remove
+
+    Returns:
+        The product's remaining stock, summed over the shards
+
+    Raises:
+        InsufficientStockException: If all shards together hold less than quantity
+    """
+    start = random.randrange(product.stock_shards)
+    for offset in range(product.stock_shards):
+        result = db.execute(
+            update(ProductStockShard)
+            .where(
+                ProductStockShard.product_id == product.id,
+                ProductStockShard.shard == (start + offset) % product.stock_shards,
+                ProductStockShard.stock >= quantity,
+            )
+            .values(stock=ProductStockShard.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return _record_stock_change(db, product.id)
+
+    shards = _lock_shards(db, product.id)
+    available = sum(shard.stock for shard in shards)
+    if available < quantity:
+        raise InsufficientStockException(
+            product_id=product.id,
+            requested_quantity=quantity,
+            available_quantity=available,
+        )
+    remaining = quantity
+    for shard in shards:
+        taken = min(shard.stock, remaining)
+        shard.stock -= taken
+        remaining -= taken
+    db.flush()
+    return _record_stock_change(db, product.id)
+
+
+@traced()
+def add_sharded_stock(db: Session, product: Product, quantity: int) -> int:
+    """
+    Add stock to a random shard of a sharded product.
+
+    Args:
+        db: Database session
+        product: Sharded product
+        quantity: Stock to add
+
+    Returns:
+        The product's stock, summed over the shards
+    """
+    db.execute(
+        update(ProductStockShard)
+        .where(
+            ProductStockShard.product_id == product.id,
+            ProductStockShard.shard == random.randrange(product.stock_shards),
+        )
+        .values(stock=ProductStockShard.stock + quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return _record_stock_change(db, product.id)
+
+
+@traced()
+def spread_stock(
+    db: Session, product: Product, shards: int, total: Optional[int] = None
+) -> None:
+    """
+    Spread a product's stock over a number of shards, adding or removing shard rows.
+
+    The shards are locked here; callers changing the shard count should lock the
+    product row as well. Nothing is committed.
+
+    Args:
+        db: Database session
+        product: Product to reshard
+        shards: New number of shards, 0 to keep the stock on the product row
+        total: New total stock, defaults to the current one
+    """
+    existing = _lock_shards(db, product.id)
+    if total is None:
+        total = (
+            sum(s.stock for s in existing) if product.stock_shards else product.stock
+        )
+
+    by_index = {shard.shard: shard for shard in existing}
+    for index, stock in enumerate(split_stock(total, shards) if shards else []):
+        if index in by_index:
+            by_index.pop(index).stock = stock
+        else:
+            db.add(ProductStockShard(product_id=product.id, shard=index, stock=stock))
+    for leftover in by_index.values():
+        db.delete(leftover)
+
+    product.stock = total
+    product.stock_shards = shards
+
+
+@traced()
+def set_stock_shards(
+    db: Session, product_id: int, shards: int, total: Optional[int] = None
+) -> Product:
+    """
+    Shard, reshard or unshard a product's stock, keeping the total.
+
+    With ``shards`` above zero the current total is spread evenly over that many
+    shards; with zero the shards are folded back into the product row. This also
+    serves as a rebalance when the shard count does not change.
+
+    Args:
+        db: Database session
+        product_id: ID of the product
+        shards: New number of shards, 0 to stop sharding
+        total: New total stock, defaults to the current one
+
+    Returns:
+        The updated Product object
+
+    Raises:
+        ProductNotFoundException: If product with given ID doesn't exist
+        ValueError: If shards is negative
+    """
+    if shards < 0:
+        raise ValueError("Shard count cannot be negative")
+
+    product = db.execute(
+        select(Product)
+        .where(Product.id == product_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+    if product is None:
+        raise ProductNotFoundException(product_id=product_id)
+    spread_stock(db, product, shards, total)
+    db.commit()
+    db.refresh(product)
+    return product
+
+
+@traced()
+def rebalance_stock_shards(db: Session, product_id: int) -> Product:
+    """
+    Even out a sharded product's shards and store the total on the product row.
+
+    Orders drain random shards, so shards drift apart over time and orders start
+    falling back to the slower all-shard path; rebalancing periodically avoids
+    that.
+
+    Args:
+        db: Database session
+        product_id: ID of a sharded product
+
+    Returns:
+        The updated Product object
+
+    Raises:
+        ProductNotFoundException: If product with given ID doesn't exist
+    """
+    product = db.get(Product, product_id)
+    if product is None:
+        raise ProductNotFoundException(product_id=product_id)
+    return set_stock_shards(db, product_id, product.stock_shards)
+
+
+@traced()
+def sharded_product_ids(db: Session) -> List[int]:
+    """IDs of all products whose stock is sharded."""
+    return list(
+        db.scalars(
+            select(Product.id).where(Product.stock_shards > 0).order_by(Product.id)
+        )
+    )
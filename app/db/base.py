@@ -5,6 +5,11 @@ from sqlalchemy import Column, DateTime, Integer
 from app.db.database import Base
 
 
+def utcnow() -> datetime.datetime:
+    """Current UTC time, evaluated for every row written."""
+    return datetime.datetime.now(datetime.UTC)
+
+
 class BaseModel(Base):
     """Base class for all SQLAlchemy models"""
 
@@ -12,9 +17,5 @@ class BaseModel(Base):
 
     id = Column(Integer, primary_key=True, index=True)
 
-    created_at = Column(DateTime, default=datetime.datetime.now(datetime.UTC))
-    updated_at = Column(
-        DateTime,
-        default=datetime.datetime.now(datetime.UTC),
-        onupdate=datetime.datetime.now(datetime.UTC),
-    )
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
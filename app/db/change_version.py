@@ -0,0 +1,44 @@
+from sqlalchemy import Sequence
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import BigInteger
+
+from app.db.database import Base
+
+# Shared by products, their stock shards and tombstones, so every catalog change
+# gets a distinct position in one order
+product_change_seq = Sequence("product_change_seq", metadata=Base.metadata)
+
+
+class next_change_version(FunctionElement):  # noqa: N801
+    """
+    SQL expression drawing the next catalog change version.
+
+    On PostgreSQL this is ``nextval('product_change_seq')``. Databases without
+    sequences take one more than the highest version in use, which is safe there
+    because SQLite runs one write transaction at a time. That highest version is
+    read once per statement, so an UPDATE adds the row's id instead of one and
+    every row it changes still gets a version of its own.
+    """
+
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(next_change_version)
+def _compile_max_plus_one(element, compiler, **kw) -> str:
+    newest = (
+        "(SELECT coalesce(max(version), 0) FROM ("
+        "SELECT max(version) AS version FROM products "
+        "UNION ALL SELECT max(version) FROM product_stock_shards "
+        "UNION ALL SELECT max(version) FROM product_tombstones))"
+    )
+    if compiler.isupdate:
+        row_id = compiler.process(compiler.statement.table.c.id, **kw)
+        return f"({newest} + {row_id})"
+    return f"({newest} + 1)"
+
+
+@compiles(next_change_version, "postgresql")
+def _compile_nextval(element, compiler, **kw) -> str:
+    return f"nextval('{product_change_seq.name}')"
@@ -1,23 +1,244 @@
-from typing import Generator
+import itertools
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Generator, List, Optional
 
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError, OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
-from app.config import settings
+from app.config import get_settings
+
+# Cookie used to pin a client's reads to the primary right after it wrote something
+READ_YOUR_WRITES_COOKIE = "db_primary_until"
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# SQLSTATE of a statement cancelled by statement_timeout or pg_cancel_backend
+QUERY_CANCELED = "57014"
+
+# Every engine created by this module, so they can be disposed on shutdown
+_engines: List[Engine] = []
+
+
+def driver_connect_args(url: str) -> Dict[str, Any]:
+    """
+    Connection arguments specific to the driver of a database URL.
+
+    psycopg (version 3) prepares statements on the server once they ran
+    ``DB_PREPARE_THRESHOLD`` times on a connection, so hot queries such as product
+    lookups by ID skip parsing and planning. The default of 5 is psycopg's own;
+    the setting exists to turn preparing off with None.
+    """
+    if make_url(url).get_driver_name() == "psycopg":
+        return {"prepare_threshold": get_settings().DB_PREPARE_THRESHOLD}
+    return {}
+
+
+@lru_cache
+def get_engine() -> Engine:
+    """
+    Create the SQLAlchemy engine for the primary database on first use.
+
+    Deferring this keeps the DB driver and dialect out of the import path of
+    short-lived processes that never touch the database.
+    """
+    settings = get_settings()
+    engine = create_engine(
+        settings.db_url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        connect_args=driver_connect_args(settings.db_url),
+    )
+    _engines.append(engine)
+    return engine
+
+
+def dispose_engines() -> None:
+    """
+    Close the pooled connections of every engine created so far.
+
+    Called on shutdown once in-flight requests have drained.
+    """
+    for created in _engines:
+        created.dispose()
+
+
+def query_cancelled(error: DBAPIError) -> bool:
+    """
+    Whether a database error comes from a cancelled statement.
+
+    PostgreSQL reports cancellation with the query_canceled SQLSTATE, SQLite
+    reports an interrupted statement.
+    """
+    original = error.orig
+    sqlstate = getattr(original, "sqlstate", None) or getattr(original, "pgcode", None)
+    return sqlstate == QUERY_CANCELED or str(original) == "interrupted"
+
+
+class _LazySessionmaker(sessionmaker):
+    """Sessionmaker that binds itself to the primary engine when first called."""
+
+    def __call__(self, **local_kw) -> Session:
+        if "bind" not in local_kw and self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
 
-# Create SQLAlchemy engine with the database URL from settings
-engine = create_engine(settings.db_url)
 
 # Create SessionLocal class with sessionmaker
 # This will be used to create database sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
 
 # Create a Base class for our SQLAlchemy models
 # All database models will inherit from this class
 Base = declarative_base()
 
 
+def __getattr__(name: str):
+    # ``engine`` used to be created at import time, keep it reachable
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class ReplicaPool:
+    """
+    Balances read-only sessions across a set of replica engines.
+
+    Replicas that fail are marked down and skipped until ``retry_seconds`` have
+    passed, after which they are probed with ``SELECT 1`` before being used again.
+    """
+
+    STRATEGIES = ("round_robin", "least_connections")
+
+    def __init__(
+        self,
+        engines: List[Engine],
+        strategy: str = "round_robin",
+        retry_seconds: float = 30,
+    ):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown replica balancing strategy: {strategy}")
+
+        self.engines = list(engines)
+        self.strategy = strategy
+        self.retry_seconds = retry_seconds
+
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._active = [0] * len(self.engines)
+        self._down_until: dict[int, float] = {}
+
+    def is_up(self, index: int) -> bool:
+        """Return True if the replica at ``index`` is currently considered healthy."""
+        return index not in self._down_until
+
+    def mark_down(self, index: int) -> None:
+        """Take a replica out of rotation until its retry window expires."""
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.retry_seconds
+
+    def mark_up(self, index: int) -> None:
+        """Put a replica back into rotation."""
+        with self._lock:
+            self._down_until.pop(index, None)
+
+    def check_health(self, index: int) -> bool:
+        """
+        Probe a replica and update its state.
+
+        Returns:
+            True if the replica answered, False otherwise
+        """
+        try:
+            with self.engines[index].connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except OperationalError:
+            self.mark_down(index)
+            return False
+        self.mark_up(index)
+        return True
+
+    def acquire(self) -> Optional[int]:
+        """
+        Pick a replica for a new read session.
+
+        Returns:
+            Index of the chosen replica, or None if every replica is down
+        """
+        now = time.monotonic()
+        with self._lock:
+            recovering = [i for i, t in self._down_until.items() if t <= now]
+            for index in recovering:
+                # Push the deadline out so only one caller probes at a time
+                self._down_until[index] = now + self.retry_seconds
+
+        for index in recovering:
+            self.check_health(index)
+
+        with self._lock:
+            candidates = [i for i in range(len(self.engines)) if self.is_up(i)]
+            if not candidates:
+                return None
+
+            if self.strategy == "least_connections":
+                index = min(candidates, key=lambda i: self._active[i])
+            else:
+                index = candidates[next(self._counter) % len(candidates)]
+
+            self._active[index] += 1
+            return index
+
+    def release(self, index: int) -> None:
+        """Return a replica previously handed out by :meth:`acquire`."""
+        with self._lock:
+            self._active[index] -= 1
+
+
+def create_replica_pool(urls: List[str]) -> Optional[ReplicaPool]:
+    """
+    Build a ReplicaPool from a list of database URLs.
+
+    Returns:
+        ReplicaPool, or None if no replica URLs are configured
+    """
+    if not urls:
+        return None
+
+    settings = get_settings()
+    engines = [
+        create_engine(
+            url,
+            pool_pre_ping=True,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            connect_args=driver_connect_args(url),
+        )
+        for url in urls
+    ]
+    _engines.extend(engines)
+    return ReplicaPool(
+        engines,
+        strategy=settings.DB_REPLICA_BALANCING,
+        retry_seconds=settings.DB_REPLICA_RETRY_SECONDS,
+    )
+
+
+@lru_cache
+def get_replicas() -> Optional[ReplicaPool]:
+    """
+    Return the configured replica pool, creating it on first use.
+
+    Returns:
+        ReplicaPool, or None if no replica URLs are configured
+    """
+    return create_replica_pool(get_settings().DB_REPLICA_URLS)
+
+
 # Dependency function for FastAPI to get a DB session
 def get_db() -> Generator:
     """
@@ -32,3 +253,49 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+def pinned_to_primary(request: Request) -> bool:
+    """Check whether the client wrote recently and must still read from the primary."""
+    value = request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    if not value:
+        return False
+    try:
+        return int(value) > time.time()
+    except ValueError:
+        return False
+
+
+def get_read_db(request: Request) -> Generator:
+    """
+    Dependency function that yields a SQLAlchemy session for read-only endpoints.
+
+    The session is bound to a healthy replica when replicas are configured. It falls
+    back to the primary when none are configured, all of them are down, or the client
+    wrote something recently.
+
+    Yields:
+        Generator: SQLAlchemy session that must only be used for reads
+    """
+    replicas = get_replicas()
+    index = None
+    if replicas is not None and not pinned_to_primary(request):
+        index = replicas.acquire()
+
+    if index is None:
+        db = SessionLocal()
+    else:
+        db = SessionLocal(bind=replicas.engines[index])
+
+    try:
+        yield db
+    except OperationalError as e:
+        # A statement cancelled by the request deadline says nothing about the
+        # replica's health, only failed connections take it out of rotation
+        if index is not None and not query_cancelled(e):
+            replicas.mark_down(index)
+        raise
+    finally:
+        db.close()
+        if index is not None:
+            replicas.release(index)
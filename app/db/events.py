@@ -0,0 +1,83 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# Session.info key holding the rows changed in the current transaction
+CHANGES_KEY = "committed_changes"
+
+# Changed rows of one table: primary key -> column values, or None once deleted
+Changes = Dict[int, Optional[Dict[str, Any]]]
+
+CommitCallback = Callable[[Changes], None]
+
+_callbacks: Dict[str, List[CommitCallback]] = defaultdict(list)
+
+
+def on_commit(table_name: str, callback: CommitCallback) -> None:
+    """
+    Register a callback fired after a transaction that changed rows of a table commits.
+
+    Args:
+        table_name: Name of the table to watch, e.g. "products"
+        callback: Called with the changed rows, keyed by primary key. Values are the
+            row's column values as written, or None for deleted rows
+    """
+    _callbacks[table_name].append(callback)
+
+
+def record_changes(
+    db: Session, table_name: str, rows: Mapping[int, Optional[Dict[str, Any]]]
+) -> None:
+    """
+    Mark rows as changed in the current transaction.
+
+    ORM changes are tracked automatically; this is for Core statements such as bulk
+    updates that bypass the unit of work.
+
+    Args:
+        db: Database session running the transaction
+        table_name: Name of the changed table
+        rows: Column values of the changed rows keyed by primary key, None for
+            deleted rows
+    """
+    db.info.setdefault(CHANGES_KEY, defaultdict(dict))[table_name].update(rows)
+
+
+def _column_values(instance) -> Dict[str, Any]:
+    """Current column values of an ORM instance, without triggering loads."""
+    state = inspect(instance)
+    return {
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_changes(db: Session, flush_context) -> None:
+    """Remember which watched rows a flush inserted, updated or deleted."""
+    for instance in (*db.new, *db.dirty, *db.deleted):
+        table_name = getattr(instance, "__tablename__", None)
+        if table_name not in _callbacks or instance.id is None:
+            continue
+        values = None if instance in db.deleted else _column_values(instance)
+        record_changes(db, table_name, {instance.id: values})
+
+
+@event.listens_for(Session, "after_commit")
+def _fire_commit_callbacks(db: Session) -> None:
+    """Notify listeners once the changes are durable."""
+    changes = db.info.pop(CHANGES_KEY, None)
+    if not changes:
+        return
+    for table_name, rows in changes.items():
+        for callback in _callbacks.get(table_name, ()):
+            callback(rows)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changes(db: Session, previous_transaction) -> None:
+    """Forget changes that were rolled back."""
+    db.info.pop(CHANGES_KEY, None)
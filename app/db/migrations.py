@@ -0,0 +1,211 @@
+"""
+Helpers for online schema changes in Alembic migrations.
+
+Plain ``op.create_index`` and large ``UPDATE`` statements lock PostgreSQL tables
+against writes for as long as they run, which stops order placement. Migrations
+touching busy tables (products, orders, order_items) follow these conventions:
+
+* ``alembic/env.py`` sets ``lock_timeout`` on the migration connection, so a DDL
+  statement that cannot get its lock quickly fails instead of queueing behind a
+  long transaction while every later query on the table queues behind it. A
+  failed migration is simply run again later.
+* Each revision runs in its own transaction; indexes are built with
+  :func:`create_index_concurrently`, which commits the revision's earlier
+  statements and builds the index outside any transaction.
+* New columns are added nullable, filled with :func:`backfill` in small
+  committed batches, and only then made NOT NULL with :func:`set_not_null`.
+
+On other databases, as used in tests, the helpers fall back to the plain
+operations.
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+from alembic import op
+
+logger = logging.getLogger(__name__)
+
+
+def _is_postgresql() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def configure_lock_timeout(connection: Connection, timeout_ms: int) -> None:
+    """
+    Make statements of a migration connection give up waiting for locks.
+
+    Args:
+        connection: Connection the migrations run on
+        timeout_ms: Longest wait for a lock, 0 to wait forever
+    """
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET lock_timeout = {int(timeout_ms)}")
+        # The SET starts a transaction, which must not swallow the first revision
+        connection.commit()
+
+
+def create_index_concurrently(
+    index_name: str, table_name: str, columns: Sequence[str], unique: bool = False
+) -> None:
+    """
+    Build an index without blocking writes to the table.
+
+    On PostgreSQL the index is built with ``CREATE INDEX CONCURRENTLY`` outside
+    the migration's transaction. An invalid index left behind by an earlier,
+    interrupted build is dropped first, so the migration can simply be rerun.
+
+    Args:
+        index_name: Name of the index
+        table_name: Name of the indexed table
+        columns: Indexed columns
+        unique: Whether to build a unique index
+    """
+    if not _is_postgresql():
+        op.create_index(index_name, table_name, list(columns), unique=unique)
+        return
+
+    context = op.get_context()
+    with context.autocommit_block():
+        # Offline (--sql) scripts cannot look at the catalog, IF NOT EXISTS still
+        # makes them safe to rerun after a build that left no index behind
+        valid = None
+        if not context.as_sql:
+            valid = op.get_bind().scalar(
+                sa.text(
+                    "SELECT i.indisvalid FROM pg_index i "
+                    "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+                ),
+                {"name": index_name},
+            )
+        if valid is False:
+            logger.warning(
+                "Dropping invalid index %s left by a failed build", index_name
+            )
+            op.drop_index(index_name, table_name, postgresql_concurrently=True)
+        op.create_index(
+            index_name,
+            table_name,
+            list(columns),
+            unique=unique,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """
+    Drop an index without blocking reads and writes of the table.
+
+    Args:
+        index_name: Name of the index
+        table_name: Name of the indexed table
+    """
+    if not _is_postgresql():
+        op.drop_index(index_name, table_name)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            index_name, table_name, postgresql_concurrently=True, if_exists=True
+        )
+
+
+def backfill(
+    table_name: str,
+    values: Dict[str, Any],
+    where: Optional[str] = None,
+    batch_size: int = 1000,
+    pause: float = 0.1,
+    key: str = "id",
+) -> int:
+    """
+    Update a table in small batches, each committed on its own.
+
+    Batches walk the integer key in ranges of ``batch_size``, so each one locks
+    at most that many rows, only for the duration of its own statement. The pause
+    between batches leaves room for the application's writes and for replicas to
+    catch up. An interrupted backfill can be rerun as long as ``where`` skips rows
+    it already filled.
+
+    Args:
+        table_name: Name of the table to update
+        values: Column names mapped to SQL expression strings, e.g.
+            {"reference": "'ORD-' || id"}
+        where: Extra SQL condition rows must match, e.g. "reference IS NULL"
+        batch_size: Key range covered by each batch
+        pause: Seconds to sleep between batches
+        key: Integer column the batches are ranged on
+
+    Returns:
+        Number of updated rows, 0 when writing an offline (--sql) script
+    """
+    assignments = ", ".join(f"{column} = {expr}" for column, expr in values.items())
+    if op.get_context().as_sql:
+        # Scripts cannot read the key range; whoever runs one can split it up
+        op.execute(
+            f"UPDATE {table_name} SET {assignments}"
+            + (f" WHERE {where}" if where else "")
+        )
+        return 0
+    condition = f"{key} >= :low AND {key} < :high"
+    if where:
+        condition += f" AND ({where})"
+    statement = sa.text(f"UPDATE {table_name} SET {assignments} WHERE {condition}")
+
+    updated = 0
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        low, high = bind.execute(
+            sa.text(f"SELECT min({key}), max({key}) FROM {table_name}")
+        ).one()
+        if low is None:
+            return 0
+        for start in range(low, high + 1, batch_size):
+            result = bind.execute(statement, {"low": start, "high": start + batch_size})
+            updated += result.rowcount
+            logger.info(
+                "Backfilled %s up to %s=%s (%s rows)",
+                table_name,
+                key,
+                start + batch_size - 1,
+                updated,
+            )
+            if pause:
+                time.sleep(pause)
+    return updated
+
+
+def set_not_null(table_name: str, column_name: str, existing_type: Any) -> None:
+    """
+    Make a backfilled column NOT NULL without blocking writes while rows are checked.
+
+    On PostgreSQL a ``CHECK (column IS NOT NULL) NOT VALID`` constraint is added and
+    validated first, which scans the table under a lock that lets writes through.
+    ``SET NOT NULL`` then uses the validated constraint instead of scanning again.
+
+    Args:
+        table_name: Name of the table
+        column_name: Name of the column
+        existing_type: Type of the column
+    """
+    if not _is_postgresql():
+        with op.batch_alter_table(table_name) as batch:
+            batch.alter_column(column_name, existing_type=existing_type, nullable=False)
+        return
+
+    constraint = f"{table_name}_{column_name}_not_null"
+    op.execute(
+        f"ALTER TABLE {table_name} ADD CONSTRAINT {constraint} "
+        f"CHECK ({column_name} IS NOT NULL) NOT VALID"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(f"ALTER TABLE {table_name} VALIDATE CONSTRAINT {constraint}")
+    op.alter_column(
+        table_name, column_name, existing_type=existing_type, nullable=False
+    )
+    op.drop_constraint(constraint, table_name, type_="check")
@@ -45,3 +45,108 @@ class InvalidOrderDataException(HTTPException):
 
     def __init__(self, detail: str):
         super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class OrderNotFoundException(HTTPException):
+    """
+    Exception raised when an order is looked up by an ID or reference that does
+    not exist.
+    """
+
+    def __init__(self, order: int | str):
+        self.order = order
+
+        kind = "ID" if isinstance(order, int) else "reference"
+        detail = f"Order with {kind} {order} not found"
+
+        super().__init__(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+
+class OrderStatusConflictException(HTTPException):
+    """
+    Exception raised when changing the status of an order that is already
+    completed. Completed orders never change.
+    """
+
+    def __init__(self, order_id: int):
+        self.order_id = order_id
+
+        detail = f"Order with ID {order_id} is completed and can no longer change"
+
+        super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+class TooManySubscribersException(HTTPException):
+    """
+    Exception raised when a worker already serves its maximum of event streams.
+    Clients should retry, ideally reaching another worker.
+    """
+
+    def __init__(self, retry_after: int = 5):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event stream subscribers, retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class ProductInUseException(HTTPException):
+    """
+    Exception raised when deleting a product that existing orders refer to.
+    """
+
+    def __init__(self, product_id: int):
+        self.product_id = product_id
+
+        detail = f"Product with ID {product_id} is part of existing orders"
+
+        super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+class InvalidProductIdsException(HTTPException):
+    """
+    Exception raised when a batch lookup asks for malformed or too many product IDs.
+    """
+
+    def __init__(self, detail: str):
+        super().__init__(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail
+        )
+
+
+class TooManyAdjustmentsException(HTTPException):
+    """
+    Exception raised when a bulk adjustment holds more items than one request may.
+    Clients should split the batch.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+
+        detail = f"At most {max_items} adjustments per request"
+
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail
+        )
+
+
+class AdminAccessDeniedException(HTTPException):
+    """
+    Exception raised when an admin endpoint is called without a valid admin token.
+    """
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required"
+        )
+
+
+class ProfilerStateException(HTTPException):
+    """
+    Exception raised when a profiler is asked to do something its state does not
+    allow, such as starting a second worker profile or diffing memory that is not
+    being traced.
+    """
+
+    def __init__(self, detail: str):
+        super().__init__(status_code=status.HTTP_409_CONFLICT, detail=detail)
@@ -1,40 +1,178 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
 
-from app.api.routes.orders import router as order_router
-from app.api.routes.products import router as product_router
-from app.config import settings
+from app.config import get_settings
 
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    description="REST API for Ecommerce Platform",
-    version="1.0.0",
-)
+if TYPE_CHECKING:
+    from fastapi import FastAPI
 
-# CORS middleware configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.BACKEND_CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-app.include_router(product_router, prefix=settings.API_V1_STR)
-app.include_router(order_router, prefix=settings.API_V1_STR)
+def create_app() -> "FastAPI":
+    """
+    Build the FastAPI application.
 
+    FastAPI and the routers, and through them the CRUD modules, models and schemas,
+    are imported here rather than at module level so that importing ``app.main``
+    stays cheap for CLI and migration tasks that never serve requests.
 
-@app.get("/")
-async def root():
-    return {"message": "Welcome to Ecommerce API"}
+    Returns:
+        Configured FastAPI application
+    """
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from sqlalchemy.exc import DBAPIError
 
+    from app.api.routes.orders import router as order_router
+    from app.api.routes.product_events import change_bus
+    from app.api.routes.product_events import router as product_events_router
+    from app.api.routes.products import router as product_router
+    from app.db.database import dispose_engines
+    from app.middleware.admission import (
+        AdmissionControlMiddleware,
+        InMemoryRateLimitBackend,
+        RedisRateLimitBackend,
+        default_rules,
+    )
+    from app.middleware.compression import CompressionMiddleware
+    from app.middleware.deadline import (
+        DeadlineMiddleware,
+        deadline_exceeded_handler,
+        route_timeouts,
+    )
+    from app.middleware.profiling import RequestProfilingMiddleware
+    from app.middleware.read_your_writes import ReadYourWritesMiddleware
 
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy", "version": "1.0.0"}
+    settings = get_settings()
+
+    tracer = None
+    if settings.TRACING_EXPORTER != "none":
+        from app.tracing.database import instrument_sql
+        from app.tracing.exporters import BatchSpanProcessor, create_span_exporter
+        from app.tracing.tracer import Tracer
+
+        tracer = Tracer(
+            BatchSpanProcessor(
+                create_span_exporter(
+                    settings.TRACING_EXPORTER,
+                    settings.TRACING_SERVICE_NAME,
+                    path=settings.TRACING_FILE,
+                    endpoint=settings.TRACING_OTLP_ENDPOINT,
+                    headers=settings.TRACING_OTLP_HEADERS,
+                )
+            ),
+            sample_rate=settings.TRACING_SAMPLE_RATE,
+        )
+        instrument_sql()
+
+    @asynccontextmanager
+    async def lifespan(application: FastAPI):
+        change_bus.start()
+        yield
+        change_bus.stop()
+        # The server has drained in-flight requests by now
+        dispose_engines()
+        if tracer is not None:
+            tracer.shutdown()
+
+    application = FastAPI(
+        title=settings.PROJECT_NAME,
+        description="REST API for Ecommerce Platform",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+
+    application.add_middleware(
+        DeadlineMiddleware,
+        default_timeout=settings.REQUEST_TIMEOUT_SECONDS,
+        route_timeouts=route_timeouts(settings),
+    )
+    application.add_exception_handler(DBAPIError, deadline_exceeded_handler)
+    application.add_middleware(ReadYourWritesMiddleware)
+    application.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        levels={
+            "gzip": settings.COMPRESSION_GZIP_LEVEL,
+            "br": settings.COMPRESSION_BROTLI_QUALITY,
+            "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+        },
+    )
+
+    # Admission control, added before CORS so rejections still carry CORS headers
+    if settings.RATE_LIMIT_ENABLED:
+        application.add_middleware(
+            AdmissionControlMiddleware,
+            rules=default_rules(settings),
+            backend=(
+                RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+                if settings.RATE_LIMIT_REDIS_URL
+                else InMemoryRateLimitBackend()
+            ),
+            max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+            max_pool_wait=settings.ADMISSION_MAX_POOL_WAIT_MS / 1000,
+            api_keys=settings.RATE_LIMIT_API_KEYS,
+        )
+
+    # Profiling wraps the whole stack; without an admin token nothing is installed
+    application.state.admin_token = settings.ADMIN_TOKEN
+    if settings.ADMIN_TOKEN:
+        application.add_middleware(
+            RequestProfilingMiddleware,
+            token=settings.ADMIN_TOKEN,
+            interval=settings.PROFILING_SAMPLE_INTERVAL_MS / 1000,
+        )
+
+    # Tracing wraps everything but CORS, so the request span covers the whole stack
+    if tracer is not None:
+        from app.middleware.tracing import TracingMiddleware
+
+        application.add_middleware(TracingMiddleware, tracer=tracer)
+
+    # CORS middleware configuration
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.BACKEND_CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    application.include_router(product_router, prefix=settings.API_V1_STR)
+    application.include_router(order_router, prefix=settings.API_V1_STR)
+    application.include_router(product_events_router, prefix=settings.API_V1_STR)
+    if settings.ADMIN_TOKEN:
+        from app.api.routes.admin import router as admin_router
+
+        application.include_router(admin_router, prefix=settings.API_V1_STR)
+
+    @application.get("/")
+    async def root():
+        return {"message": "Welcome to Ecommerce API"}
+
+    @application.get("/health")
+    async def health_check():
+        return {"status": "healthy", "version": "1.0.0"}
+
+    return application
+
+
+_app = None
+
+
+def __getattr__(name: str):
+    # ``app.main:app`` is created on first access, so servers and tests importing
+    # it keep working while plain imports of this module stay lightweight
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run(
+        "app.main:create_app", factory=True, host="0.0.0.0", port=8000, reload=True
+    )
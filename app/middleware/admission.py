@@ -0,0 +1,299 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Session.info key holding the time a transaction started waiting for a connection
+_WAIT_STARTED_KEY = "pool_wait_started"
+
+
+class PoolWaitTracker:
+    """
+    Exponentially decaying average of the time sessions wait for a pool connection.
+
+    Each sample moves the average a fifth of the way, so a single slow checkout
+    does not shed traffic on its own while a run of them does. The average decays
+    with wall time as well as with new samples, so it recovers even when shedding
+    stops traffic from reaching the database.
+    """
+
+    def __init__(self, half_life: float = 2.0):
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._updated = time.monotonic()
+
+    def _decayed(self, now: float) -> float:
+        return self._value * 0.5 ** ((now - self._updated) / self.half_life)
+
+    def observe(self, seconds: float) -> None:
+        """Record one connection wait."""
+        with self._lock:
+            now = time.monotonic()
+            current = self._decayed(now)
+            self._value = current * 0.8 + seconds * 0.2
+            self._updated = now
+
+    def value(self) -> float:
+        """Current average wait in seconds."""
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+
+pool_wait = PoolWaitTracker()
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _start_pool_wait(db: Session, transaction) -> None:
+    """A root transaction is about to check out a connection."""
+    if transaction.parent is None:
+        db.info[_WAIT_STARTED_KEY] = time.monotonic()
+
+
+@event.listens_for(Session, "after_begin")
+def _end_pool_wait(db: Session, transaction, connection) -> None:
+    """The connection was checked out, record how long that took."""
+    started = db.info.pop(_WAIT_STARTED_KEY, None)
+    if started is not None:
+        pool_wait.observe(time.monotonic() - started)
+
+
+class InMemoryRateLimitBackend:
+    """
+    Token buckets kept in the worker process.
+
+    Each worker enforces its own share of the limit; use a shared backend when
+    clients must be limited across workers. Buckets that have refilled are swept
+    every ``sweep_interval`` seconds, a fresh bucket is full anyway.
+    """
+
+    def __init__(self, sweep_interval: float = 60.0):
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        # (tokens, updated, time the bucket is full again) by key
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._swept = time.monotonic()
+
+    def _sweep(self, now: float) -> None:
+        """Drop the buckets that are full again, must hold the lock."""
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items() if bucket[2] > now
+        }
+        self._swept = now
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """
+        Take a token from the bucket ``key``.
+
+        Args:
+            key: Bucket identifier
+            rate: Tokens added per second
+            burst: Bucket capacity
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._swept >= self.sweep_interval:
+                self._sweep(now)
+            tokens, updated, _ = self._buckets.get(key, (burst, now, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            retry = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            return retry
+
+
+class RedisRateLimitBackend:
+    """
+    Token buckets shared by all workers through Redis.
+
+    Requires the optional ``redis`` package.
+    """
+
+    SCRIPT = """
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    local retry = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        retry = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(retry)
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "RATE_LIMIT_REDIS_URL is set but the 'redis' package is not installed"
+            ) from e
+
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """See :meth:`InMemoryRateLimitBackend.take`."""
+        retry = await self._script(
+            keys=[self.prefix + key], args=[rate, burst, time.time()]
+        )
+        return float(retry)
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """A token bucket budget applied to requests matching a method and path prefix."""
+
+    name: str
+    methods: FrozenSet[str]
+    path_prefix: str
+    rate: float
+    burst: int
+
+    def matches(self, method: str, path: str) -> bool:
+        return method in self.methods and path.startswith(self.path_prefix)
+
+
+class AdmissionControlMiddleware:
+    """
+    Rejects requests early instead of letting them queue for database connections.
+
+    Requests matching a rule are shed with 503 while more than ``max_in_flight``
+    of them are being served or the average pool wait exceeds ``max_pool_wait``,
+    and limited with 429 once the client has used up its token bucket. Both
+    responses carry a ``Retry-After`` header. Clients get a bucket per API key only
+    for keys listed in ``api_keys``, other requests are limited by address so
+    made-up keys cannot buy fresh budgets.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rules: Sequence[RateLimitRule],
+        backend=None,
+        max_in_flight: int = 200,
+        max_pool_wait: float = 0.5,
+        wait_tracker: Optional[PoolWaitTracker] = None,
+        api_keys: Iterable[str] = (),
+    ):
+        self.app = app
+        self.rules = list(rules)
+        self.backend = backend or InMemoryRateLimitBackend()
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait = max_pool_wait
+        self.wait_tracker = wait_tracker or pool_wait
+        self.api_keys = frozenset(api_keys)
+        self.in_flight = 0
+
+        self.shed = 0
+        self.limited = 0
+
+    def _match(self, scope: Scope) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if rule.matches(scope["method"], scope["path"]):
+                return rule
+        return None
+
+    def _client_key(self, scope: Scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"x-api-key":
+                key = value.decode("latin-1")
+                if key in self.api_keys:
+                    return "key:" + key
+                break
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    async def _reject(
+        self, scope: Scope, receive: Receive, send: Send, status: int, retry: float
+    ) -> None:
+        detail = "Rate limit exceeded" if status == 429 else "Server is overloaded"
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status,
+            headers={"Retry-After": str(max(1, math.ceil(retry)))},
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self._match(scope)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        pool_wait_seconds = self.wait_tracker.value()
+        if (
+            self.in_flight >= self.max_in_flight
+            or pool_wait_seconds > self.max_pool_wait
+        ):
+            self.shed += 1
+            await self._reject(scope, receive, send, 503, pool_wait_seconds)
+            return
+
+        retry = await self.backend.take(
+            f"{rule.name}:{self._client_key(scope)}", rule.rate, rule.burst
+        )
+        if retry > 0:
+            self.limited += 1
+            await self._reject(scope, receive, send, 429, retry)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+
+def default_rules(settings) -> Sequence[RateLimitRule]:
+    """
+    Budgets for order placement and catalog reads built from the settings.
+    """
+    return [
+        RateLimitRule(
+            name="orders",
+            methods=frozenset({"POST"}),
+            path_prefix=f"{settings.API_V1_STR}/orders",
+            rate=settings.RATE_LIMIT_ORDERS_PER_SECOND,
+            burst=settings.RATE_LIMIT_ORDERS_BURST,
+        ),
+        RateLimitRule(
+            name="catalog",
+            methods=frozenset({"GET", "HEAD"}),
+            path_prefix=f"{settings.API_V1_STR}/products",
+            rate=settings.RATE_LIMIT_CATALOG_PER_SECOND,
+            burst=settings.RATE_LIMIT_CATALOG_BURST,
+        ),
+        # Batch reads may be POSTed for long ID lists, they share the catalog bucket
+        RateLimitRule(
+            name="catalog",
+            methods=frozenset({"POST"}),
+            path_prefix=f"{settings.API_V1_STR}/products/batch",
+            rate=settings.RATE_LIMIT_CATALOG_PER_SECOND,
+            burst=settings.RATE_LIMIT_CATALOG_BURST,
+        ),
+    ]
@@ -0,0 +1,191 @@
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/msgpack", "+json")
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encoders() -> Dict[str, Callable]:
+    """Content codings this server can produce, most preferred first."""
+    encoders: Dict[str, Callable] = {}
+    if zstandard is not None:
+        encoders["zstd"] = _ZstdEncoder
+    if brotli is not None:
+        encoders["br"] = _BrotliEncoder
+    encoders["gzip"] = _GzipEncoder
+    return encoders
+
+
+def choose_encoding(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    """
+    Pick a content coding from an Accept-Encoding header.
+
+    The client's quality values decide first, the order of ``supported`` breaks ties.
+
+    Returns:
+        Chosen coding, or None to send the body uncompressed
+    """
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for coding in supported:
+        quality = qualities.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with zstd, brotli or gzip as negotiated by Accept-Encoding.
+
+    Complete bodies smaller than ``minimum_size`` are sent as is. Streamed bodies
+    are compressed chunk by chunk and flushed after each chunk, so the client can
+    decode every event as soon as it arrives.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        levels: Optional[Dict[str, int]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": 6, "br": 4, "zstd": 3, **(levels or {})}
+        self.encoders = available_encoders()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        coding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), list(self.encoders)
+        )
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, encoder, passthrough
+
+            if message["type"] == "http.response.start":
+                # Hold the headers back until we know whether to compress
+                start = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encoder is None:
+                headers = MutableHeaders(raw=start["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or not any(t in content_type for t in COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                encoder = self.encoders[coding](self.levels[coding])
+                headers["Content-Encoding"] = coding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = encoder.compress(body) + encoder.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+
+            if more_body:
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": encoder.compress(body),
+                        "more_body": True,
+                    }
+                )
+            else:
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": encoder.compress(body) + encoder.finish(),
+                    }
+                )
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,230 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Header clients can use to ask for a shorter deadline, in seconds
+TIMEOUT_HEADER = "x-request-timeout"
+
+# Session.info key holding the DBAPI connection registered with the deadline
+_REGISTERED_KEY = "deadline_connection"
+
+
+class RequestDeadline:
+    """
+    Time budget of one request, shared with the database sessions it opens.
+
+    Sessions register their DBAPI connection while a transaction is open, so the
+    queries running on them can be cancelled when the deadline passes or the client
+    goes away.
+    """
+
+    def __init__(self, timeout: float):
+        self.expires_at = time.monotonic() + timeout
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._connections: set = set()
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.cancelled or self.remaining() == 0
+
+    def register(self, dbapi_connection) -> None:
+        with self._lock:
+            self._connections.add(dbapi_connection)
+
+    def unregister(self, dbapi_connection) -> None:
+        with self._lock:
+            self._connections.discard(dbapi_connection)
+
+    def cancel(self) -> None:
+        """Cancel the queries running on every registered connection."""
+        with self._lock:
+            self.cancelled = True
+            connections = list(self._connections)
+        for connection in connections:
+            # psycopg and psycopg2 expose cancel(), sqlite3 exposes interrupt()
+            cancel = getattr(connection, "cancel", None) or getattr(
+                connection, "interrupt", None
+            )
+            if cancel is not None:
+                cancel()
+
+
+current_deadline: contextvars.ContextVar[Optional[RequestDeadline]] = (
+    contextvars.ContextVar("current_deadline", default=None)
+)
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_deadline(db: Session, transaction, connection) -> None:
+    """Bound the transaction's statements by the request deadline."""
+    deadline = current_deadline.get()
+    if deadline is None or transaction.parent is not None:
+        return
+
+    if connection.dialect.name == "postgresql":
+        timeout_ms = max(1, int(deadline.remaining() * 1000))
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+    dbapi_connection = connection.connection.dbapi_connection
+    deadline.register(dbapi_connection)
+    db.info[_REGISTERED_KEY] = (deadline, dbapi_connection)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _release_deadline(db: Session, transaction) -> None:
+    """Stop cancelling through a connection that is going back to the pool."""
+    if transaction.parent is not None:
+        return
+    registered = db.info.pop(_REGISTERED_KEY, None)
+    if registered is not None:
+        deadline, dbapi_connection = registered
+        deadline.unregister(dbapi_connection)
+
+
+class DeadlineMiddleware:
+    """
+    Gives every request a deadline and cancels its queries when it is missed.
+
+    The timeout comes from the longest matching prefix in ``route_timeouts``
+    ("METHOD /path"), else ``default_timeout``. Clients may shorten it with the
+    ``X-Request-Timeout`` header but never extend it. Queries are cancelled when the
+    deadline passes or as soon as the client disconnects, which returns their
+    connections to the pool.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        default_timeout: float = 10.0,
+        route_timeouts: Optional[Dict[str, float]] = None,
+    ):
+        self.app = app
+        self.default_timeout = default_timeout
+        # Longest prefixes first so the most specific route wins
+        self.route_timeouts = sorted(
+            (route_timeouts or {}).items(), key=lambda item: -len(item[0])
+        )
+
+    def timeout_for(self, scope: Scope) -> float:
+        """Budget for a request, taking the route and the client header into account."""
+        target = f"{scope['method']} {scope['path']}"
+        timeout = next(
+            (
+                value
+                for prefix, value in self.route_timeouts
+                if target.startswith(prefix)
+            ),
+            self.default_timeout,
+        )
+        requested = Headers(scope=scope).get(TIMEOUT_HEADER)
+        if requested:
+            try:
+                timeout = min(timeout, max(0.001, float(requested)))
+            except ValueError:
+                pass
+        return timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = RequestDeadline(self.timeout_for(scope))
+        token = current_deadline.set(deadline)
+        loop = asyncio.get_running_loop()
+        timer = loop.call_later(deadline.remaining(), deadline.cancel)
+
+        messages: asyncio.Queue = asyncio.Queue()
+        # Messages taken off the queue by a receive that was cancelled meanwhile
+        taken: Deque[Message] = deque()
+        disconnected = asyncio.Event()
+        response_done = False
+
+        async def pump() -> None:
+            # Own the real receive so a disconnect is noticed even while the app is
+            # busy in the threadpool and not reading from the client
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    if not response_done:
+                        deadline.cancel()
+                    return
+                await messages.put(message)
+
+        async def receive_wrapper() -> Message:
+            if taken:
+                return taken.popleft()
+            if not messages.empty():
+                return messages.get_nowait()
+            get = asyncio.ensure_future(messages.get())
+            gone = asyncio.ensure_future(disconnected.wait())
+            try:
+                # Callers such as Request.is_disconnected() cancel this right away
+                await asyncio.wait({get, gone}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                gone.cancel()
+                if get.done() and not get.cancelled():
+                    taken.append(get.result())
+                else:
+                    get.cancel()
+            if taken:
+                return taken.popleft()
+            return {"type": "http.disconnect"}
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_done
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                response_done = True
+            await send(message)
+
+        watcher = asyncio.ensure_future(pump())
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            timer.cancel()
+            watcher.cancel()
+            current_deadline.reset(token)
+
+
+def route_timeouts(settings) -> Dict[str, float]:
+    """
+    Per-route deadlines built from the settings.
+
+    Bulk adjustments commit chunk by chunk, so they get a budget of their own
+    instead of the default one; ROUTE_TIMEOUTS entries take precedence.
+    """
+    return {
+        f"POST {settings.API_V1_STR}/products/adjustments": (
+            settings.STOCK_ADJUSTMENT_TIMEOUT_SECONDS
+        ),
+        **settings.ROUTE_TIMEOUTS,
+    }
+
+
+async def deadline_exceeded_handler(request: Request, exc: DBAPIError):
+    """
+    Report queries cancelled by the request deadline as 504 instead of 500.
+    """
+    deadline = current_deadline.get()
+    if deadline is not None and deadline.expired:
+        return JSONResponse({"detail": "Request deadline exceeded"}, status_code=504)
+    raise exc
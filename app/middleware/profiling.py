@@ -0,0 +1,92 @@
+import secrets
+import threading
+import time
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.profiling.sampler import StackSampler
+
+# Headers asking for a profile of the request instead of its response
+PROFILE_HEADER = "x-profile"
+ADMIN_TOKEN_HEADER = "x-admin-token"
+
+# Threadpool threads running sync endpoints, and how they look while idle
+_WORKER_FRAME = "anyio._backends._asyncio:WorkerThread.run"
+_IDLE_WORKER_FRAME = _WORKER_FRAME + ";queue:Queue.get"
+
+
+def _serving_request(stack: str) -> bool:
+    """Whether a folded stack is a threadpool thread busy with a request."""
+    return _WORKER_FRAME in stack and _IDLE_WORKER_FRAME not in stack
+
+
+def valid_admin_token(given: Optional[str], expected: Optional[str]) -> bool:
+    """Compare tokens in constant time, nothing matches when no token is set."""
+    return bool(given and expected) and secrets.compare_digest(
+        given.encode(), expected.encode()
+    )
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles single requests carrying ``X-Profile: cpu`` and a valid admin token.
+
+    The request runs as usual while a :class:`StackSampler` samples the event loop
+    thread and the threadpool threads busy running sync endpoints and
+    dependencies. Its response is discarded and replaced by the folded stacks,
+    ready for flamegraph.pl or speedscope; the original status is kept in the
+    ``X-Profiled-Status`` header. Requests handled concurrently on the same worker
+    show up in the profile as well.
+
+    Without the header, or with a wrong token, the request passes through
+    untouched. The middleware is only installed when an admin token is configured.
+    """
+
+    def __init__(self, app: ASGIApp, token: str, interval: float = 0.005):
+        self.app = app
+        self.token = token
+        self.interval = interval
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if headers.get(PROFILE_HEADER) != "cpu" or not valid_admin_token(
+            headers.get(ADMIN_TOKEN_HEADER), self.token
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        loop_thread = threading.get_ident()
+        sampler = StackSampler(
+            self.interval,
+            lambda ident, stack: ident == loop_thread or _serving_request(stack),
+        )
+        profiled_status = None
+
+        async def discard(message: Message) -> None:
+            nonlocal profiled_status
+            if message["type"] == "http.response.start":
+                profiled_status = message["status"]
+
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            sampler.stop()
+        elapsed = time.perf_counter() - start
+
+        response = PlainTextResponse(
+            sampler.folded(),
+            headers={
+                "X-Profiled-Status": str(profiled_status),
+                "X-Profile-Samples": str(sampler.samples),
+                "X-Profile-Elapsed-Ms": f"{elapsed * 1000:.1f}",
+            },
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,43 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+from app.db import database
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins a client's reads to the primary for a short time after it wrote something.
+
+    Successful responses to non read-only requests carry a cookie with the time
+    until which ``get_read_db`` must keep using the primary, so the client sees its
+    own writes even while replicas lag behind. Does nothing without replicas.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] in database.SAFE_METHODS
+            or database.get_replicas() is None
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = get_settings().DB_READ_YOUR_WRITES_SECONDS
+                cookie = (
+                    f"{database.READ_YOUR_WRITES_COOKIE}={int(time.time()) + window}; "
+                    f"Max-Age={window}; Path=/; HttpOnly; SameSite=lax"
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.encode("latin-1")),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
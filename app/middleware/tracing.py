@@ -0,0 +1,87 @@
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.tracing.tracer import (
+    SpanKind,
+    StatusCode,
+    Tracer,
+    reset_current_span,
+    set_current_span,
+)
+
+TRACEPARENT_HEADER = "traceparent"
+
+
+def route_template(scope: Scope) -> Optional[str]:
+    """
+    Path template of the route that handled a request, e.g. ``/api/v1/orders/{id}``.
+
+    Depending on the FastAPI version ``scope["route"]`` is the route as included,
+    with the ``include_router`` prefix, or as declared on its router, without it.
+    A missing prefix is taken from the leading segments of the request path.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return None
+    segments = scope["path"].split("/")
+    prefix = len(segments) - len(path.split("/"))
+    if prefix <= 0:
+        return path
+    return "/".join(segments[: prefix + 1]) + path
+
+
+class TracingMiddleware:
+    """
+    Starts a server span for every HTTP request.
+
+    The trace continues an incoming W3C ``traceparent`` header, or starts anew with
+    the tracer's sampling decision. Route handlers, CRUD functions and SQL
+    statements run below the request span; it is named after the matched route
+    template, e.g. ``POST /api/v1/orders/``, once routing has happened.
+    """
+
+    def __init__(self, app: ASGIApp, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        span = self.tracer.start_trace(
+            f"{method} {scope['path']}",
+            Headers(scope=scope).get(TRACEPARENT_HEADER),
+            SpanKind.SERVER,
+        )
+        if not span.recording:
+            # Unsampled, only the trace context is kept for propagation
+            token = set_current_span(span)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                reset_current_span(token)
+            return
+
+        span.set_attribute("http.request.method", method)
+        span.set_attribute("url.path", scope["path"])
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = StatusCode.ERROR
+            await send(message)
+
+        with span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                template = route_template(scope)
+                if template is not None:
+                    span.name = f"{method} {template}"
+                    span.set_attribute("http.route", template)
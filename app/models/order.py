@@ -1,4 +1,5 @@
 import enum
+import secrets
 
 from sqlalchemy import Column, Float, ForeignKey, Integer, String
 from sqlalchemy.orm import relationship
@@ -15,13 +16,27 @@ class OrderStatus(str, enum.Enum):
     COMPLETED = "completed"
 
 
+# Crockford's base32 alphabet, without letters easily mistaken for digits
+REFERENCE_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def new_order_reference() -> str:
+    """Random customer-facing order reference, e.g. "ORD-7KQ2M9XD4F"."""
+    return "ORD-" + "".join(secrets.choice(REFERENCE_ALPHABET) for _ in range(10))
+
+
 class Order(BaseModel):
     """
     Order database model with fields for ID, status, and total price.
+
+    ``reference`` is what customers see and quote; unlike the ID it does not
+    reveal how many orders were placed. Orders placed before references existed
+    got "ORD-<id>".
     """
 
     __tablename__ = "orders"
 
+    reference = Column(String(16), unique=True, index=True, default=new_order_reference)
     status = Column(String, default=OrderStatus.PENDING.value)
     total_price = Column(Float, nullable=False)
 
@@ -39,8 +54,8 @@ class OrderItem(BaseModel):
 
     __tablename__ = "order_items"
 
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Float, nullable=False)
 
@@ -1,19 +1,81 @@
-from sqlalchemy import Column, Float, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    UniqueConstraint,
+)
 
 from app.db.base import BaseModel
+from app.db.change_version import next_change_version
 
 
 class Product(BaseModel):
     """
     Product database model with fields for ID, name, description, price, and stock.
+
+    Products with ``stock_shards`` above zero keep their stock in that many
+    ProductStockShard rows so concurrent orders do not all lock the same row;
+    ``stock`` then only holds the sum as of the last rebalance.
+
+    ``version`` is drawn from the catalog change sequence on every insert and
+    update, so rows changed after a known version can be found through its index.
     """
 
     __tablename__ = "products"
+    # Read the generated version back with the INSERT/UPDATE, commit hooks need it
+    __mapper_args__ = {"eager_defaults": True}
 
     name = Column(String, nullable=False, index=True)
     description = Column(String, nullable=True)
     price = Column(Float, nullable=False)
     stock = Column(Integer, nullable=False, default=0)
+    stock_shards = Column(Integer, nullable=False, default=0, server_default="0")
+    version = Column(
+        BigInteger,
+        nullable=False,
+        index=True,
+        default=next_change_version(),
+        onupdate=next_change_version(),
+    )
 
     def __str__(self):
         return f"{self.name} - {self.price} - {self.stock}"
+
+
+class ProductStockShard(BaseModel):
+    """
+    One of the sub-counters holding part of a sharded product's stock.
+
+    Writes to a shard leave the product row alone, so shards draw their own
+    ``version`` from the catalog change sequence for the change feed to find.
+    """
+
+    __tablename__ = "product_stock_shards"
+    __table_args__ = (UniqueConstraint("product_id", "shard"),)
+
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    shard = Column(Integer, nullable=False)
+    stock = Column(Integer, nullable=False, default=0)
+    version = Column(
+        BigInteger,
+        nullable=False,
+        index=True,
+        default=next_change_version(),
+        onupdate=next_change_version(),
+    )
+
+
+class ProductTombstone(BaseModel):
+    """
+    Record of a deleted product, so incremental sync clients learn about deletions.
+    """
+
+    __tablename__ = "product_tombstones"
+
+    product_id = Column(Integer, nullable=False)
+    version = Column(
+        BigInteger, nullable=False, index=True, default=next_change_version()
+    )
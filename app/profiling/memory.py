@@ -0,0 +1,77 @@
+import threading
+import tracemalloc
+from typing import Optional
+
+# Allocations made by the tracing machinery itself are not interesting
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryTracker:
+    """
+    Finds memory growth by comparing tracemalloc snapshots.
+
+    Tracing slows down every allocation, so it only runs between ``start`` and
+    ``stop``.
+    """
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return self._baseline is not None
+
+    def start(self, frames: int = 10) -> None:
+        """Start tracing allocations and take the baseline snapshot."""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._baseline = self._snapshot()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._baseline = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+    def diff(self, top: int = 25, group_by: str = "lineno", reset: bool = False) -> str:
+        """
+        Report where memory grew since the baseline.
+
+        Args:
+            top: Number of allocation sites to report
+            group_by: "lineno", "filename" or "traceback"
+            reset: Make the current snapshot the new baseline
+
+        Returns:
+            One line per allocation site, largest growth first
+
+        Raises:
+            RuntimeError: If tracing was not started
+        """
+        with self._lock:
+            if self._baseline is None:
+                raise RuntimeError("Memory tracing is not running")
+            snapshot = self._snapshot()
+            stats = snapshot.compare_to(self._baseline, group_by)
+            if reset:
+                self._baseline = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"traced: {current / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB"]
+        for stat in stats[:top]:
+            lines.append(str(stat))
+            if group_by == "traceback":
+                lines.extend(f"    {line}" for line in stat.traceback.format())
+        return "\n".join(lines) + "\n"
+
+
+memory_tracker = MemoryTracker()
@@ -0,0 +1,77 @@
+import sys
+import threading
+from collections import Counter
+from types import FrameType
+from typing import Callable, Optional
+
+# Decides from a thread's ident and folded stack whether a sample is kept
+SampleFilter = Callable[[int, str], bool]
+
+
+def frame_label(frame: FrameType) -> str:
+    """Name a frame as ``module:qualified_name``."""
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}"
+
+
+def fold_stack(frame: Optional[FrameType]) -> str:
+    """Join a thread's frames, outermost first, into a folded stack line."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """
+    Statistical profiler sampling the stacks of running threads.
+
+    A background thread wakes up every ``interval`` seconds and counts the folded
+    stack of each thread. Nothing is installed in the profiled threads, so they
+    run at full speed; the cost is the sampler thread itself and goes away once
+    it is stopped.
+
+    The result is in the folded (collapsed) stack format read by flamegraph.pl,
+    speedscope and most flame graph viewers.
+    """
+
+    def __init__(
+        self, interval: float = 0.005, sample_filter: Optional[SampleFilter] = None
+    ):
+        self.interval = interval
+        self.sample_filter = sample_filter
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> "StackSampler":
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = fold_stack(frame)
+                if self.sample_filter is None or self.sample_filter(ident, stack):
+                    self.counts[stack] += 1
+
+    def folded(self) -> str:
+        """Sampled stacks as ``frame;frame;... count`` lines, most frequent first."""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.counts.most_common()
+        )
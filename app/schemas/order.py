@@ -59,6 +59,7 @@ class OrderInDB(BaseModel):
     """
 
     id: int
+    reference: Optional[str] = None
     status: str
     total_price: float
     items: List[OrderItemInDB]
@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from app.schemas.order import OrderItemCreate
 
 
 class ProductBase(BaseModel):
@@ -67,6 +69,9 @@ class ProductInDB(ProductBase):
     id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: Optional[int] = Field(
+        None, description="Catalog change version of the last write"
+    )
 
     class Config:
         orm_mode = True
@@ -78,3 +83,176 @@ class Product(ProductInDB):
     """
 
     pass
+
+
+class ProductSummary(BaseModel):
+    """
+    Schema for product search results, without timestamps.
+    """
+
+    id: int
+    name: str
+    description: Optional[str] = None
+    price: float
+    stock: int
+
+    class Config:
+        from_attributes = True
+
+
+class CartQuoteRequest(BaseModel):
+    """
+    Schema for pricing a cart without placing an order.
+    """
+
+    items: List[OrderItemCreate] = Field(
+        ..., min_length=1, description="List of cart items"
+    )
+
+
+class CartQuoteLine(BaseModel):
+    """
+    Schema for one priced cart line.
+    """
+
+    product_id: int
+    quantity: int
+    unit_price: float
+    line_total: float
+    available: bool = Field(..., description="Whether the stock covers the quantity")
+
+
+class CartQuote(BaseModel):
+    """
+    Schema for an indicative cart price, orders re-check prices and stock.
+    """
+
+    items: List[CartQuoteLine]
+    total: float
+    missing: List[int] = Field(
+        default_factory=list, description="IDs of products that do not exist"
+    )
+
+
+class ProductBatchRequest(BaseModel):
+    """
+    Schema for looking up several products by ID.
+    """
+
+    ids: List[int] = Field(
+        ...,
+        min_length=1,
+        description="Product IDs, products are returned in this order",
+    )
+
+
+class ProductBatch(BaseModel):
+    """
+    Schema for the products of a batch lookup.
+    """
+
+    products: List[Product] = Field(..., description="Found products, in request order")
+    missing: List[int] = Field(
+        default_factory=list, description="Requested IDs of products that do not exist"
+    )
+
+
+class StockAdjustment(BaseModel):
+    """
+    Schema for adjusting one product's stock and/or price.
+    """
+
+    product_id: int = Field(..., gt=0, description="Product ID")
+    stock_delta: Optional[int] = Field(
+        None, description="Amount to add to the stock, negative to remove"
+    )
+    stock: Optional[int] = Field(None, ge=0, description="New absolute stock")
+    price: Optional[float] = Field(None, gt=0, description="New price")
+
+    @field_validator("price")
+    def price_must_be_positive(cls, v):  # noqa: N805
+        """Validate that price is positive and has at most 2 decimal places."""
+        if v is not None:
+            if v <= 0:
+                raise ValueError("Price must be positive")
+            # Check decimal places
+            str_v = str(v)
+            if "." in str_v and len(str_v.split(".")[1]) > 2:
+                raise ValueError("Price must have at most 2 decimal places")
+        return v
+
+    @model_validator(mode="after")
+    def one_change_at_least(self):
+        """Validate that something changes and the stock changes only one way."""
+        if self.stock is not None and self.stock_delta is not None:
+            raise ValueError("Give either stock or stock_delta, not both")
+        if self.stock is None and self.stock_delta is None and self.price is None:
+            raise ValueError("Give stock, stock_delta or price")
+        return self
+
+
+class StockAdjustmentBatch(BaseModel):
+    """
+    Schema for a batch of stock and price adjustments.
+    """
+
+    adjustments: List[StockAdjustment] = Field(
+        ..., min_length=1, description="Adjustments, at most one per product"
+    )
+
+    @field_validator("adjustments")
+    def products_must_be_unique(cls, v):  # noqa: N805
+        """Validate that each product appears only once in the batch."""
+        product_ids = [adjustment.product_id for adjustment in v]
+        if len(product_ids) != len(set(product_ids)):
+            raise ValueError("Duplicate products in batch. Combine their adjustments.")
+        return v
+
+
+class StockAdjustmentResult(BaseModel):
+    """
+    Schema for the outcome of one adjustment.
+    """
+
+    product_id: int
+    status: Literal["applied", "not_found", "insufficient_stock"]
+    stock: Optional[int] = Field(
+        None, description="New stock when applied, else the current stock"
+    )
+    price: Optional[float] = Field(
+        None, description="New price when applied, else the current price"
+    )
+
+
+class StockAdjustmentReport(BaseModel):
+    """
+    Schema for the outcomes of a batch of adjustments, in request order.
+    """
+
+    results: List[StockAdjustmentResult]
+    applied: int
+    failed: int
+
+
+class ProductTombstone(BaseModel):
+    """
+    Schema for a deleted product in the change feed.
+    """
+
+    product_id: int
+    version: int
+    deleted_at: datetime = Field(..., validation_alias="created_at")
+
+    class Config:
+        from_attributes = True
+
+
+class ProductChanges(BaseModel):
+    """
+    Schema for one page of the catalog change feed.
+    """
+
+    changes: List[Product] = Field(..., description="Created or updated products")
+    deleted: List[ProductTombstone] = Field(..., description="Deleted products")
+    next_since: int = Field(..., description="Value to pass as since on the next call")
+    has_more: bool = Field(..., description="Whether more changes are ready now")
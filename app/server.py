@@ -0,0 +1,161 @@
+"""
+Production server entry point.
+
+Starts several uvicorn worker processes sized from the CPU count, sizes each
+worker's database pool so that all workers together stay under the database
+connection limit, recycles workers after a number of requests and drains in-flight
+requests on shutdown.
+
+Usage:
+    python -m app.server
+"""
+
+import importlib.util
+import inspect
+import logging
+import os
+from typing import Optional, Tuple
+
+import uvicorn
+
+from app.broadcast.bus import PostgresChangeBus
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count() -> int:
+    """
+    Number of worker processes to start.
+
+    Returns:
+        WEB_CONCURRENCY if set, otherwise the number of CPUs available to us
+    """
+    configured = get_settings().WEB_CONCURRENCY
+    if configured:
+        return configured
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def pool_limits(
+    workers: int, max_connections: int, reserved: int, unpooled: int = 0
+) -> Tuple[int, int]:
+    """
+    Split the database connection budget between workers.
+
+    Each worker gets a pool of steady connections plus an equally sized overflow, so
+    ``workers * (pool_size + max_overflow + unpooled)`` never exceeds the budget.
+
+    Args:
+        workers: Number of worker processes
+        max_connections: Connection limit of the database server
+        reserved: Connections kept free for migrations, admin tools and replicas
+        unpooled: Connections each worker opens outside its pool, such as the
+            LISTEN and NOTIFY connections of the postgres change bus
+
+    Returns:
+        Tuple of (pool_size, max_overflow) for each worker
+
+    Raises:
+        ValueError: If the budget cannot give every worker a connection
+    """
+    budget = max_connections - reserved - unpooled * workers
+    per_worker = budget // workers
+    if per_worker < 1:
+        raise ValueError(
+            f"{workers} workers cannot share {budget} database connections "
+            f"(max={max_connections}, reserved={reserved}, "
+            f"{unpooled} outside the pool per worker)"
+        )
+    pool_size = (per_worker + 1) // 2
+    return pool_size, per_worker - pool_size
+
+
+def product_events_bus(configured: Optional[str], workers: int) -> str:
+    """
+    Choose the product change bus for the workers.
+
+    Args:
+        configured: PRODUCT_EVENTS_BUS when set explicitly, otherwise None
+        workers: Number of worker processes
+
+    Returns:
+        The configured bus, or "postgres" when unset and several workers run
+
+    Raises:
+        ValueError: If the local bus is set for several workers, whose clients
+            would then miss the changes committed by the other workers
+    """
+    if configured is None:
+        return "postgres" if workers > 1 else "local"
+    if configured == "local" and workers > 1:
+        raise ValueError(
+            f'PRODUCT_EVENTS_BUS="local" only reaches one worker\'s clients, use '
+            f'"postgres" with {workers} workers or set WEB_CONCURRENCY=1'
+        )
+    return configured
+
+
+def _pick(option: str, module: str) -> str:
+    """Use the optional accelerated implementation when it is installed."""
+    return module if importlib.util.find_spec(module) else option
+
+
+def main() -> None:
+    """Configure the worker environment and run uvicorn."""
+    logging.basicConfig(level=logging.INFO)
+    settings = get_settings()
+
+    workers = worker_count()
+    explicit_bus = "PRODUCT_EVENTS_BUS" in settings.model_fields_set
+    bus = product_events_bus(
+        settings.PRODUCT_EVENTS_BUS if explicit_bus else None, workers
+    )
+    pool_size, max_overflow = pool_limits(
+        workers,
+        settings.DB_MAX_CONNECTIONS,
+        settings.DB_RESERVED_CONNECTIONS,
+        unpooled=PostgresChangeBus.CONNECTIONS if bus == "postgres" else 0,
+    )
+
+    # Worker processes build their own settings, pass the derived pool and bus
+    # through the environment unless they were set explicitly
+    if "DB_POOL_SIZE" not in settings.model_fields_set:
+        os.environ["DB_POOL_SIZE"] = str(pool_size)
+        os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+    os.environ["PRODUCT_EVENTS_BUS"] = bus
+
+    options = {
+        "factory": True,
+        "host": settings.SERVER_HOST,
+        "port": settings.SERVER_PORT,
+        "workers": workers,
+        "loop": _pick("asyncio", "uvloop"),
+        "http": _pick("h11", "httptools"),
+        "limit_max_requests": settings.WORKER_MAX_REQUESTS or None,
+        "timeout_graceful_shutdown": settings.GRACEFUL_SHUTDOWN_SECONDS,
+        "proxy_headers": True,
+        "access_log": False,
+    }
+    # Older uvicorn releases restart every worker at the same request count
+    if "limit_max_requests_jitter" in inspect.signature(uvicorn.Config).parameters:
+        options["limit_max_requests_jitter"] = settings.WORKER_MAX_REQUESTS_JITTER
+
+    logger.info(
+        "Starting %d workers (loop=%s, http=%s, db pool=%s+%s per worker, "
+        "events bus=%s)",
+        workers,
+        options["loop"],
+        options["http"],
+        os.environ.get("DB_POOL_SIZE", settings.DB_POOL_SIZE),
+        os.environ.get("DB_MAX_OVERFLOW", settings.DB_MAX_OVERFLOW),
+        os.environ["PRODUCT_EVENTS_BUS"],
+    )
+    uvicorn.run("app.main:create_app", **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Manage sharded stock of high-contention products.
+
+Sharding a product spreads its stock over several counter rows so concurrent
+orders lock different rows. Shards drift apart as orders drain random ones;
+``rebalance`` evens them out again and is meant to run periodically, e.g. from
+cron.
+
+Usage:
+    python -m app.stock_shards shard 42 --shards 8
+    python -m app.stock_shards unshard 42
+    python -m app.stock_shards rebalance --all
+"""
+
+import argparse
+import logging
+import sys
+from typing import List, Optional
+
+from app.crud.stock_shard import (
+    rebalance_stock_shards,
+    set_stock_shards,
+    sharded_product_ids,
+)
+from app.db.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run a shard management command, returns the process exit code."""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    shard = commands.add_parser("shard", help="shard or reshard a product's stock")
+    shard.add_argument("product_id", type=int)
+    shard.add_argument("--shards", type=int, required=True)
+
+    unshard = commands.add_parser("unshard", help="fold shards back into the product")
+    unshard.add_argument("product_id", type=int)
+
+    rebalance = commands.add_parser("rebalance", help="even out shard stock")
+    rebalance.add_argument("product_ids", type=int, nargs="*")
+    rebalance.add_argument("--all", action="store_true", help="every sharded product")
+
+    args = parser.parse_args(argv)
+    if args.command == "shard" and args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.command == "rebalance" and not (args.product_ids or args.all):
+        parser.error("give product IDs or --all")
+
+    with SessionLocal() as db:
+        if args.command == "shard":
+            products = [set_stock_shards(db, args.product_id, args.shards)]
+        elif args.command == "unshard":
+            products = [set_stock_shards(db, args.product_id, 0)]
+        else:
+            product_ids = sharded_product_ids(db) if args.all else args.product_ids
+            products = [rebalance_stock_shards(db, pid) for pid in product_ids]
+
+        for product in products:
+            logger.info(
+                "Product %s: stock %s in %s shard(s)",
+                product.id,
+                product.stock,
+                product.stock_shards,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Spans for SQL statements and session commits.
+
+:func:`instrument_sql` listens on every engine and session. Each statement gets a
+client span below the current span; each ``Session.commit()`` gets a span that
+the flush it triggers nests in, so a slow commit shows whether the time went to
+the flushed statements or to the COMMIT itself.
+"""
+
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.tracing.tracer import SpanKind, current_span
+
+# Longest statement text kept on a span
+MAX_STATEMENT_LENGTH = 2000
+
+_COMMIT_SPAN = "_trace_commit_span"
+
+
+def _statement_span(conn, statement: str, executemany: bool):
+    parent = current_span()
+    if not parent.recording:
+        return None
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement else "SQL"
+    span = parent.child(
+        operation,
+        SpanKind.CLIENT,
+        {
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+        },
+    )
+    if executemany:
+        span.set_attribute("db.executemany", True)
+    return span
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    span = _statement_span(conn, statement, executemany)
+    if span is not None:
+        context._trace_span = span
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        span.end()
+
+
+def _handle_error(exception_context) -> None:
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.end()
+
+
+def _before_commit(db: Session) -> None:
+    parent = current_span()
+    if parent.recording:
+        span = parent.child("COMMIT", SpanKind.CLIENT)
+        # Current until the commit ends, so the flushed statements nest in it
+        db.info[_COMMIT_SPAN] = span.__enter__()
+
+
+def _end_commit_span(db: Session, error: Optional[str] = None) -> None:
+    span = db.info.pop(_COMMIT_SPAN, None)
+    if span is None:
+        return
+    if error is not None:
+        span.record_exception(RuntimeError(error))
+    try:
+        span.__exit__(None, None, None)
+    except ValueError:
+        # Committed from another context than it began in, the span still ended
+        pass
+
+
+def _after_commit(db: Session) -> None:
+    _end_commit_span(db)
+
+
+def _after_rollback(db: Session) -> None:
+    _end_commit_span(db, "commit rolled back")
+
+
+def instrument_sql() -> None:
+    """Trace SQL statements and commits of every engine and session, once."""
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    event.listen(Session, "before_commit", _before_commit)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
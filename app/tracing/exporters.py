@@ -0,0 +1,231 @@
+"""
+Export ended spans in the OTLP JSON encoding.
+
+:class:`OTLPHttpSpanExporter` posts batches to an OTLP/HTTP endpoint such as an
+OpenTelemetry Collector, Jaeger or Tempo. :class:`FileSpanExporter` writes the
+same export requests as JSON lines to a file or stdout, the OTLP file format, for
+local testing without a collector.
+"""
+
+import json
+import logging
+import sys
+import threading
+import urllib.request
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.tracing.tracer import Span, StatusCode
+
+logger = logging.getLogger(__name__)
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        # 64-bit integers are strings in OTLP JSON
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def _encode_span(span: Span) -> Dict[str, Any]:
+    encoded = {
+        "traceId": f"{span.trace_id:032x}",
+        "spanId": f"{span.span_id:016x}",
+        "name": span.name,
+        "kind": int(span.kind),
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [_attribute(k, v) for k, v in span.attributes.items()],
+        "status": {"code": int(span.status)},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = f"{span.parent_id:016x}"
+    if span.status == StatusCode.ERROR:
+        encoded["status"]["message"] = span.status_message
+    return encoded
+
+
+def otlp_request(spans: Sequence[Span], service_name: str) -> Dict[str, Any]:
+    """
+    Build an OTLP ``ExportTraceServiceRequest`` in its JSON encoding.
+
+    Args:
+        spans: Ended spans
+        service_name: Reported as the ``service.name`` resource attribute
+
+    Returns:
+        Export request as a JSON-serialisable dict
+    """
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [_attribute("service.name", service_name)]},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "app.tracing"},
+                        "spans": [_encode_span(span) for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class FileSpanExporter:
+    """
+    Writes each batch as one line of OTLP JSON to a file, or stdout for "-".
+    """
+
+    def __init__(self, path: str, service_name: str):
+        self.service_name = service_name
+        self._file = sys.stdout if path == "-" else open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[Span]) -> None:
+        line = json.dumps(otlp_request(spans, self.service_name), separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def shutdown(self) -> None:
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class OTLPHttpSpanExporter:
+    """
+    Posts batches as OTLP JSON to an OTLP/HTTP traces endpoint.
+
+    Failed exports are logged and their spans dropped; tracing must never take
+    requests down with it.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10.0,
+    ):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+
+    def export(self, spans: Sequence[Span]) -> None:
+        body = json.dumps(otlp_request(spans, self.service_name)).encode()
+        request = urllib.request.Request(
+            self.endpoint, data=body, headers=self.headers, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except Exception:
+            logger.exception("Could not export %s spans", len(spans))
+
+    def shutdown(self) -> None:
+        pass
+
+
+class BatchSpanProcessor:
+    """
+    Queues ended spans and exports them in batches from a background thread.
+
+    Requests only append to a queue; a batch is exported when ``max_batch_size``
+    spans are waiting or every ``interval`` seconds. When the exporter falls
+    behind, spans beyond ``max_queue_size`` are dropped and counted.
+
+    Args:
+        exporter: Exporter with ``export(spans)`` and ``shutdown()``
+        max_queue_size: Most spans waiting for export
+        max_batch_size: Most spans per export call
+        interval: Seconds between exports of partial batches
+    """
+
+    def __init__(
+        self,
+        exporter,
+        max_queue_size: int = 2048,
+        max_batch_size: int = 512,
+        interval: float = 5.0,
+    ):
+        self.exporter = exporter
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue: deque = deque()
+        self._export_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        if len(self._queue) >= self.max_queue_size:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+        if len(self._queue) >= self.max_batch_size:
+            self._wakeup.set()
+
+    def force_flush(self) -> None:
+        """Export every queued span before returning."""
+        with self._export_lock:
+            while self._queue:
+                batch: List[Span] = []
+                while self._queue and len(batch) < self.max_batch_size:
+                    batch.append(self._queue.popleft())
+                self.exporter.export(batch)
+
+    def shutdown(self) -> None:
+        """Stop the export thread, export what is left and close the exporter."""
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join()
+        self.force_flush()
+        self.exporter.shutdown()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.force_flush()
+            except Exception:
+                logger.exception("Span export failed")
+
+
+def create_span_exporter(
+    kind: str,
+    service_name: str,
+    path: str = "-",
+    endpoint: str = "",
+    headers: Optional[Dict[str, str]] = None,
+):
+    """
+    Build the span exporter selected in the settings.
+
+    Args:
+        kind: "file" or "otlp"
+        service_name: Reported as the ``service.name`` resource attribute
+        path: File written by "file", "-" for stdout
+        endpoint: OTLP/HTTP traces URL used by "otlp"
+        headers: Extra HTTP headers sent by "otlp", e.g. for authentication
+
+    Returns:
+        Span exporter with ``export`` and ``shutdown``
+    """
+    if kind == "file":
+        return FileSpanExporter(path, service_name)
+    if kind == "otlp":
+        return OTLPHttpSpanExporter(endpoint, service_name, headers)
+    raise ValueError(f"Unknown span exporter {kind!r}")
@@ -0,0 +1,17 @@
+from typing import Any, Callable
+
+from fastapi.routing import APIRoute
+
+from app.tracing.tracer import traced
+
+
+class TracedRoute(APIRoute):
+    """
+    Route whose handler runs in a span of its own within sampled requests.
+
+    The span covers the endpoint function only, so the time between the request
+    span's start and the handler's is request parsing, validation and dependencies.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, traced(f"route {endpoint.__name__}")(endpoint), **kwargs)
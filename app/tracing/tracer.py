@@ -0,0 +1,348 @@
+"""
+Spans, W3C trace context and head-based sampling.
+
+A request's root span is started by :class:`Tracer`, which decides once, at the
+head of the trace, whether it is sampled. Everything below it, route handlers,
+CRUD functions and SQL statements, opens child spans of the current span, kept in
+a context variable so it follows the request into threadpool threads.
+
+Unsampled requests carry a :class:`NonRecordingSpan`; its children are itself, so
+an instrumented call outside a sampled trace costs a context variable lookup and
+an attribute check.
+"""
+
+import enum
+import functools
+import inspect
+import random
+import re
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_TRACEPARENT = re.compile(
+    r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?$"
+)
+_SAMPLED_FLAG = 0x01
+
+
+class SpanKind(enum.IntEnum):
+    """Span kinds, numbered as in OTLP."""
+
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+class StatusCode(enum.IntEnum):
+    """Span status codes, numbered as in OTLP."""
+
+    UNSET = 0
+    OK = 1
+    ERROR = 2
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[int, int, bool]]:
+    """
+    Parse a W3C ``traceparent`` header.
+
+    Args:
+        header: Header value, e.g.
+            "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+    Returns:
+        Trace ID, parent span ID and sampled flag, or None for a missing or
+        invalid header
+    """
+    match = _TRACEPARENT.match(header.strip().lower()) if header else None
+    if match is None:
+        return None
+    version, trace_id, span_id, flags, rest = match.groups()
+    # Version ff is invalid, version 00 has no further fields
+    if version == "ff" or (version == "00" and rest):
+        return None
+    trace_id, span_id = int(trace_id, 16), int(span_id, 16)
+    if not trace_id or not span_id:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & _SAMPLED_FLAG)
+
+
+def format_traceparent(trace_id: int, span_id: int, sampled: bool) -> str:
+    """Format a W3C ``traceparent`` header."""
+    return f"00-{trace_id:032x}-{span_id:016x}-{_SAMPLED_FLAG if sampled else 0:02x}"
+
+
+def _new_id(bits: int) -> int:
+    # Zero is not a valid trace or span ID
+    return random.getrandbits(bits) or 1
+
+
+class NonRecordingSpan:
+    """
+    Span of an unsampled trace, or of no trace at all.
+
+    It records nothing and is its own child, but still carries the trace context
+    so it can be propagated with the unsampled flag.
+    """
+
+    __slots__ = ("trace_id", "span_id")
+
+    recording = False
+    sampled = False
+
+    def __init__(self, trace_id: int = 0, span_id: int = 0):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    def child(self, name: str, kind: SpanKind = SpanKind.INTERNAL, attributes=None):
+        return self
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "NonRecordingSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+INVALID_SPAN = NonRecordingSpan()
+
+_current_span: ContextVar = ContextVar("current_span", default=INVALID_SPAN)
+
+
+class Span:
+    """
+    A timed operation of a sampled trace.
+
+    Used as a context manager it becomes the current span for its block, records
+    an exception escaping the block and ends when the block is left. Ended spans
+    are handed to the tracer for export.
+    """
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "kind",
+        "attributes",
+        "start_ns",
+        "end_ns",
+        "status",
+        "status_message",
+        "_token",
+    )
+
+    recording = True
+    sampled = True
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: int,
+        parent_id: Optional[int] = None,
+        kind: SpanKind = SpanKind.INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes if attributes is not None else {}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = StatusCode.UNSET
+        self.status_message = ""
+        self._token: Optional[Token] = None
+
+    def child(
+        self,
+        name: str,
+        kind: SpanKind = SpanKind.INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> "Span":
+        """Start a span below this one, it is not made current."""
+        return Span(self.tracer, name, self.trace_id, self.span_id, kind, attributes)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        """Mark the span as failed by the given exception."""
+        self.status = StatusCode.ERROR
+        self.status_message = str(exc)
+        self.attributes["exception.type"] = type(exc).__qualname__
+
+    def end(self) -> None:
+        """End the span and queue it for export, later calls do nothing."""
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer.on_end(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.record_exception(exc)
+        self.end()
+        _current_span.reset(self._token)
+
+
+class Tracer:
+    """
+    Starts traces and hands ended spans to a span processor.
+
+    Sampling is decided once per trace when its root span starts: a trace
+    continued from an incoming ``traceparent`` follows the caller's decision,
+    other traces are sampled with probability ``sample_rate``.
+
+    Args:
+        processor: Receives ended spans, see :class:`BatchSpanProcessor`
+        sample_rate: Fraction of new traces to record, from 0 to 1
+        parent_based: Whether to follow the sampled flag of incoming trace context
+    """
+
+    def __init__(self, processor, sample_rate: float = 0.0, parent_based: bool = True):
+        self.processor = processor
+        self.sample_rate = sample_rate
+        self.parent_based = parent_based
+
+    def should_sample(self, parent_sampled: Optional[bool]) -> bool:
+        if parent_sampled is not None and self.parent_based:
+            return parent_sampled
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def start_trace(
+        self,
+        name: str,
+        traceparent: Optional[str] = None,
+        kind: SpanKind = SpanKind.SERVER,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Start the root span of this service's part of a trace.
+
+        Args:
+            name: Span name
+            traceparent: Incoming ``traceparent`` header, if any
+            kind: Span kind
+            attributes: Initial span attributes
+
+        Returns:
+            Recording :class:`Span` if the trace is sampled, otherwise a
+            :class:`NonRecordingSpan` with the trace context to propagate
+        """
+        parent = parse_traceparent(traceparent)
+        if parent is None:
+            trace_id, parent_id, parent_sampled = _new_id(128), None, None
+        else:
+            trace_id, parent_id, parent_sampled = parent
+        if self.should_sample(parent_sampled):
+            return Span(self, name, trace_id, parent_id, kind, attributes)
+        return NonRecordingSpan(trace_id, parent_id or _new_id(64))
+
+    def on_end(self, span: Span) -> None:
+        self.processor.on_end(span)
+
+    def force_flush(self) -> None:
+        self.processor.force_flush()
+
+    def shutdown(self) -> None:
+        self.processor.shutdown()
+
+
+def current_span():
+    """The current span, :data:`INVALID_SPAN` outside any trace."""
+    return _current_span.get()
+
+
+def set_current_span(span) -> Token:
+    """Make a span current without ending it later, for the root span's caller."""
+    return _current_span.set(span)
+
+
+def reset_current_span(token: Token) -> None:
+    """Restore the span that was current before :func:`set_current_span`."""
+    _current_span.reset(token)
+
+
+def current_traceparent() -> Optional[str]:
+    """``traceparent`` header for outgoing calls, None outside any trace."""
+    span = _current_span.get()
+    if not span.trace_id:
+        return None
+    return format_traceparent(span.trace_id, span.span_id, span.sampled)
+
+
+def start_span(
+    name: str,
+    kind: SpanKind = SpanKind.INTERNAL,
+    attributes: Optional[Dict[str, Any]] = None,
+):
+    """
+    Start a child of the current span, to be used as a context manager.
+
+    Args:
+        name: Span name
+        kind: Span kind
+        attributes: Initial span attributes
+
+    Returns:
+        New span, or the current non-recording span outside a sampled trace
+    """
+    return _current_span.get().child(name, kind, attributes)
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """
+    Decorate a function to run in a span of its own when its caller is sampled.
+
+    Args:
+        name: Span name, defaults to the function's module and qualified name
+
+    Returns:
+        Decorator for sync and async functions
+    """
+
+    def decorate(func: F) -> F:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                parent = _current_span.get()
+                if not parent.recording:
+                    return await func(*args, **kwargs)
+                with parent.child(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            parent = _current_span.get()
+            if not parent.recording:
+                return func(*args, **kwargs)
+            with parent.child(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
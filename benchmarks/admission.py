@@ -0,0 +1,125 @@
+"""
+Overload test for admission control.
+
+A stand-in endpoint holds one of ``--pool-size`` connection slots for
+``--service-ms`` milliseconds, which fixes the capacity of the service. An
+open-loop client then offers ``--overload`` times that capacity, with and without
+the admission middleware, and reports goodput (successful responses per second
+within the client timeout), shed and timed-out counts, and p50/p99 latency of the
+successful responses.
+
+Usage:
+    python -m benchmarks.admission --overload 3 --duration 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.middleware.admission import AdmissionControlMiddleware, RateLimitRule
+
+
+def build_app(pool_size: int, service_time: float, max_in_flight: int | None):
+    """Create an app whose single route is limited by a simulated connection pool."""
+    application = FastAPI()
+    pool = asyncio.Semaphore(pool_size)
+
+    @application.get("/api/v1/products/")
+    async def list_products():
+        async with pool:
+            await asyncio.sleep(service_time)
+        return []
+
+    if max_in_flight is not None:
+        # Budgets far above the offered load, only shedding is exercised here
+        unlimited = RateLimitRule(
+            "catalog", frozenset({"GET"}), "/api", rate=1e9, burst=10**9
+        )
+        application.add_middleware(
+            AdmissionControlMiddleware,
+            rules=[unlimited],
+            max_in_flight=max_in_flight,
+        )
+    return application
+
+
+async def offer_load(application, rate: float, duration: float, timeout: float):
+    """Send requests at a fixed rate regardless of responses and collect outcomes."""
+    transport = httpx.ASGITransport(app=application)
+    latencies, statuses = [], []
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def one() -> None:
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    client.get("/api/v1/products/"), timeout
+                )
+                statuses.append(response.status_code)
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+            except asyncio.TimeoutError:
+                statuses.append("timeout")
+
+        tasks = []
+        start = time.perf_counter()
+        sent = 0
+        while (elapsed := time.perf_counter() - start) < duration:
+            due = int(elapsed * rate)
+            for _ in range(due - sent):
+                tasks.append(asyncio.create_task(one()))
+            sent = due
+            await asyncio.sleep(0.001)
+        await asyncio.gather(*tasks)
+
+    return latencies, statuses
+
+
+def report(label: str, latencies, statuses, duration: float) -> None:
+    succeeded = len(latencies)
+    latencies = sorted(latencies) or [0.0]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    sys.stdout.write(
+        f"{label:<18} goodput={succeeded / duration:7.1f}/s "
+        f"sent={len(statuses):6d} 503={statuses.count(503):6d} "
+        f"timeouts={statuses.count('timeout'):6d} "
+        f"p50={statistics.median(latencies) * 1000:7.1f}ms p99={p99 * 1000:7.1f}ms\n"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--service-ms", type=float, default=20)
+    parser.add_argument("--overload", type=float, default=3)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    args = parser.parse_args()
+
+    service_time = args.service_ms / 1000
+    capacity = args.pool_size / service_time
+    rate = capacity * args.overload
+    sys.stdout.write(f"capacity={capacity:.0f}/s offered={rate:.0f}/s\n")
+
+    for label, max_in_flight in (
+        ("no admission", None),
+        ("admission", args.max_in_flight),
+    ):
+        application = build_app(args.pool_size, service_time, max_in_flight)
+        latencies, statuses = asyncio.run(
+            offer_load(application, rate, args.duration, args.timeout)
+        )
+        report(label, latencies, statuses, args.duration)
+
+
+if __name__ == "__main__":
+    main()
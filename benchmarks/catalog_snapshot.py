@@ -0,0 +1,123 @@
+"""
+Memory per million products and filter latency of the catalog snapshot vs SQL.
+
+A SQLite catalog (or the database given with ``--database-url``) is filled with
+``--products`` rows, loaded into a CatalogSnapshot, and the same searches and cart
+quotes are timed against the snapshot and the equivalent SQL queries. Memory is
+measured with tracemalloc around the initial load and scaled to one million
+products.
+
+Usage:
+    python -m benchmarks.catalog_snapshot --products 200000 --repeat 20
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.cache.catalog_snapshot import CatalogSnapshot, np
+from app.crud import product as crud_product
+from app.db.database import Base
+from app.models.product import Product
+
+SEARCHES = {
+    "price range": {"min_price": 100, "max_price": 110},
+    "in stock, cheapest": {"min_stock": 1, "sort": "price", "limit": 50},
+    "top stock": {"sort": "-stock", "limit": 20},
+    "deep page": {"min_price": 50, "sort": "-price", "skip": 5000, "limit": 100},
+}
+
+
+def fill(engine, count: int) -> None:
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        for start in range(0, count, 50_000):
+            connection.execute(
+                insert(Product),
+                [
+                    {
+                        "name": f"Product {i}",
+                        "description": f"Description of product {i}",
+                        "price": round(rng.uniform(1, 500), 2),
+                        "stock": rng.randrange(0, 200),
+                    }
+                    for i in range(start, min(count, start + 50_000))
+                ],
+            )
+
+
+def timed(fn, repeat: int) -> float:
+    """Median wall time of ``fn`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--cart-size", type=int, default=20)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        url = args.database_url or f"sqlite:///{Path(workdir) / 'bench.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        fill(engine, args.products)
+        session_factory = sessionmaker(bind=engine)
+
+        with session_factory() as db:
+            snapshot = CatalogSnapshot()
+            tracemalloc.start()
+            start = time.perf_counter()
+            snapshot.refresh(db)
+            load_seconds = time.perf_counter() - start
+            allocated, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            scale = 1_000_000 / args.products
+            sys.stdout.write(
+                f"backend: {'numpy' if np is not None else 'array'}, "
+                f"products: {len(snapshot)}, load: {load_seconds:.2f}s\n"
+                f"memory per million products: numeric columns "
+                f"{snapshot.nbytes() * scale / 2**20:.1f} MiB, total "
+                f"{allocated * scale / 2**20:.1f} MiB\n\n"
+            )
+
+            sys.stdout.write(f"{'query':<22} {'snapshot ms':>12} {'sql ms':>9}\n")
+            for label, params in SEARCHES.items():
+                snapshot_ms = timed(lambda: snapshot.search(**params), args.repeat)
+                sql_ms = timed(
+                    lambda: crud_product.search_products(db, **params), args.repeat
+                )
+                db.expunge_all()
+                sys.stdout.write(f"{label:<22} {snapshot_ms:>12.2f} {sql_ms:>9.2f}\n")
+
+            rng = random.Random(7)
+            cart = [
+                (rng.randrange(1, args.products + 1), rng.randrange(1, 5))
+                for _ in range(args.cart_size)
+            ]
+            snapshot_ms = timed(lambda: snapshot.quote(cart), args.repeat)
+            sql_ms = timed(lambda: crud_product.quote_cart(db, cart), args.repeat)
+            sys.stdout.write(
+                f"{f'quote {args.cart_size} items':<22} "
+                f"{snapshot_ms:>12.2f} {sql_ms:>9.2f}\n"
+            )
+
+
+if __name__ == "__main__":
+    main()
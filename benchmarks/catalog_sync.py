@@ -0,0 +1,140 @@
+"""
+Cost of keeping a catalog copy in sync: full re-download vs the change feed.
+
+A SQLite catalog (or ``--database-url``) of ``--products`` rows goes through one
+day of churn, ``--churn`` of the rows updated and a few deleted. The copy is then
+brought up to date either by paging through ``GET /products/`` again or by
+reading ``GET /products/changes`` from the version of the previous sync. Wall
+time and response bytes of both are reported.
+
+Usage:
+    python -m benchmarks.catalog_sync --products 1000000 --churn 0.01
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import bindparam, create_engine, func, insert, update
+from sqlalchemy.orm import sessionmaker
+
+from app.api.negotiation import JSON, render
+from app.api.routes.products import product_changes_adapter, product_list_adapter
+from app.crud import product as crud_product
+from app.db.database import Base
+from app.models.product import Product
+
+PAGE = 1000
+
+
+def fill(engine, count: int) -> None:
+    with engine.begin() as connection:
+        for start in range(0, count, 50_000):
+            connection.execute(
+                insert(Product),
+                [
+                    {
+                        "name": f"Product {i}",
+                        "description": f"Description of product {i}",
+                        "price": 9.99,
+                        "stock": 100,
+                    }
+                    for i in range(start, min(count, start + 50_000))
+                ],
+            )
+
+
+def churn(engine, session_factory, count: int, fraction: float) -> None:
+    """Update a fraction of the products and delete a few."""
+    rng = random.Random(1)
+    ids = rng.sample(range(1, count + 1), int(count * fraction))
+    with engine.begin() as connection:
+        connection.execute(
+            update(Product)
+            .where(Product.id == bindparam("product_id"))
+            .values(stock=bindparam("new_stock")),
+            [{"product_id": i, "new_stock": rng.randrange(100)} for i in ids[10:]],
+        )
+    with session_factory() as db:
+        for product_id in ids[:10]:
+            crud_product.delete_product(db, product_id)
+
+
+def full_download(db) -> tuple:
+    pages = total = 0
+    while True:
+        products = crud_product.get_products(db, skip=pages * PAGE, limit=PAGE)
+        body = render(
+            product_list_adapter,
+            product_list_adapter.validate_python(products, from_attributes=True),
+            JSON,
+        )
+        total += len(body)
+        pages += 1
+        db.expunge_all()
+        if len(products) < PAGE:
+            return pages, total
+
+
+def changes_since(db, since: int) -> tuple:
+    pages = total = 0
+    while True:
+        changed, deleted, since, has_more = crud_product.get_product_changes(
+            db, since=since, limit=PAGE
+        )
+        feed = {
+            "changes": changed,
+            "deleted": deleted,
+            "next_since": since,
+            "has_more": has_more,
+        }
+        body = render(
+            product_changes_adapter,
+            product_changes_adapter.validate_python(feed, from_attributes=True),
+            JSON,
+        )
+        total += len(body)
+        pages += 1
+        db.expunge_all()
+        if not has_more:
+            return pages, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--churn", type=float, default=0.01)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        url = args.database_url or f"sqlite:///{Path(workdir) / 'bench.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        fill(engine, args.products)
+
+        # The copy was last synced right after the catalog was loaded
+        with session_factory() as db:
+            since = db.query(func.max(Product.version)).scalar()
+        churn(engine, session_factory, args.products, args.churn)
+
+        sys.stdout.write(f"{'sync':<14} {'pages':>6} {'MiB':>9} {'seconds':>9}\n")
+        for label, sync in (
+            ("full download", full_download),
+            ("changes since", lambda db: changes_since(db, since)),
+        ):
+            with session_factory() as db:
+                start = time.perf_counter()
+                pages, size = sync(db)
+                elapsed = time.perf_counter() - start
+            sys.stdout.write(
+                f"{label:<14} {pages:>6} {size / 2**20:>9.2f} {elapsed:>9.2f}\n"
+            )
+
+
+if __name__ == "__main__":
+    main()
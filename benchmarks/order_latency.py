@@ -0,0 +1,154 @@
+"""
+Order placement latency and round trips per driver over a slow database link.
+
+A local TCP proxy between the app and PostgreSQL delays traffic by half of
+``--rtt-ms`` in each direction, like a database in another availability zone,
+and counts round trips: every time the client speaks again after the server
+answered. Orders of ``--items`` items are placed through ``create_order`` with
+psycopg2 and with psycopg 3, whose prepared statements save parsing and planning.
+Drivers that are not installed are skipped.
+
+Usage:
+    python -m benchmarks.order_latency --database-url postgresql://... --rtt-ms 2
+"""
+
+import argparse
+import importlib.util
+import queue
+import socket
+import statistics
+import sys
+import threading
+import time
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.order import create_order
+from app.db.database import Base, driver_connect_args
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.schemas.order import OrderCreate
+
+DRIVERS = {"psycopg2": "psycopg2", "psycopg": "psycopg"}
+
+
+class LatencyProxy:
+    """TCP proxy adding a fixed delay per direction and counting round trips."""
+
+    def __init__(self, upstream: tuple, delay: float):
+        self.upstream = upstream
+        self.delay = delay
+        self.round_trips = 0
+        self._lock = threading.Lock()
+        self._listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            client, _ = self._listener.accept()
+            server = socket.create_connection(self.upstream)
+            for sock in (client, server):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Direction of the last chunk on this connection, shared by both pumps
+            state = {"last": None}
+            self._pump(client, server, state, "client")
+            self._pump(server, client, state, "server")
+
+    def _pump(self, source, target, state: dict, side: str) -> None:
+        delayed: queue.Queue = queue.Queue()
+
+        def read() -> None:
+            while True:
+                data = source.recv(65536)
+                with self._lock:
+                    if side == "client" and state["last"] != "client":
+                        self.round_trips += 1
+                    state["last"] = side
+                delayed.put((time.perf_counter() + self.delay, data))
+                if not data:
+                    return
+
+        def write() -> None:
+            while True:
+                due, data = delayed.get()
+                time.sleep(max(0.0, due - time.perf_counter()))
+                if not data:
+                    target.shutdown(socket.SHUT_WR)
+                    return
+                target.sendall(data)
+
+        threading.Thread(target=read, daemon=True).start()
+        threading.Thread(target=write, daemon=True).start()
+
+
+def run(url, proxy: LatencyProxy, items: int, orders: int, warmup: int) -> tuple:
+    """Place orders through the proxy, return latencies and round trips per order."""
+    engine = create_engine(url, connect_args=driver_connect_args(str(url)))
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    Base.metadata.create_all(bind=engine)
+    with session_factory() as db:
+        db.execute(delete(OrderItem))
+        db.execute(delete(Order))
+        db.execute(delete(Product))
+        products = [
+            Product(name=f"Product {i}", price=9.99, stock=10**9) for i in range(items)
+        ]
+        db.add_all(products)
+        db.commit()
+        order = OrderCreate(
+            items=[{"product_id": product.id, "quantity": 1} for product in products]
+        )
+
+    latencies = []
+    with session_factory() as db:
+        for i in range(warmup + orders):
+            if i == warmup:
+                start_trips = proxy.round_trips
+            start = time.perf_counter()
+            create_order(db, order)
+            db.expunge_all()
+            if i >= warmup:
+                latencies.append(time.perf_counter() - start)
+        round_trips = (proxy.round_trips - start_trips) / orders
+    engine.dispose()
+    return latencies, round_trips
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", required=True, help="postgresql://...")
+    parser.add_argument("--rtt-ms", type=float, default=2.0)
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    url = make_url(args.database_url)
+    proxy = LatencyProxy((url.host, url.port or 5432), args.rtt_ms / 2000)
+    url = url.set(host="127.0.0.1", port=proxy.port)
+
+    sys.stdout.write(
+        f"rtt {args.rtt_ms} ms, {args.items} items per order\n"
+        f"{'driver':<10} {'trips/order':>12} {'p50 ms':>9} {'p95 ms':>9}\n"
+    )
+    for driver, module in DRIVERS.items():
+        if importlib.util.find_spec(module) is None:
+            sys.stdout.write(f"{driver:<10} not installed\n")
+            continue
+        latencies, round_trips = run(
+            url.set(drivername=f"postgresql+{driver}"),
+            proxy,
+            args.items,
+            args.orders,
+            args.warmup,
+        )
+        p50 = statistics.median(latencies) * 1000
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1000
+        sys.stdout.write(f"{driver:<10} {round_trips:>12.1f} {p50:>9.2f} {p95:>9.2f}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Latency and database load of order lookups with and without the order cache.
+
+A uvicorn worker serving the order routes from a SQLite database of ``--orders``
+orders, ``--completed`` of them completed and each with ``--items`` items, runs
+in a background thread. Clients look orders up by ID or reference, skewed towards
+a few popular orders like order-status pages being refreshed. The run is repeated
+with the cache disabled and enabled; latency percentiles and the statements sent
+to the database per lookup are reported.
+
+Usage:
+    python -m benchmarks.order_lookup --orders 20000 --requests 20000
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.orders import completed_order_cache, pending_order_cache
+from app.api.routes.orders import router as order_router
+from app.db.database import Base, get_db, get_read_db
+from app.models.order import Order, OrderItem, OrderStatus, new_order_reference
+from app.models.product import Product
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(application: FastAPI, port: int) -> uvicorn.Server:
+    config = uvicorn.Config(
+        application, host="127.0.0.1", port=port, log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def fill(engine, orders: int, items: int, completed: float) -> None:
+    rng = random.Random(1)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Product),
+            [{"name": f"Product {i}", "price": 9.99, "stock": 100} for i in range(100)],
+        )
+        connection.execute(
+            insert(Order),
+            [
+                {
+                    "reference": new_order_reference(),
+                    "status": (
+                        OrderStatus.COMPLETED.value
+                        if rng.random() < completed
+                        else OrderStatus.PENDING.value
+                    ),
+                    "total_price": 9.99 * items,
+                }
+                for _ in range(orders)
+            ],
+        )
+        connection.execute(
+            insert(OrderItem),
+            [
+                {
+                    "order_id": order_id,
+                    "product_id": rng.randrange(1, 101),
+                    "quantity": 1,
+                    "unit_price": 9.99,
+                }
+                for order_id in range(1, orders + 1)
+                for _ in range(items)
+            ],
+        )
+
+
+async def measure(base_url: str, paths: list) -> list:
+    timings = []
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for path in paths:
+            start = time.perf_counter()
+            (await client.get(path)).raise_for_status()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--completed", type=float, default=0.95)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(
+            f"sqlite:///{Path(workdir) / 'bench.db'}",
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(bind=engine)
+        fill(engine, args.orders, args.items, args.completed)
+        with engine.connect() as connection:
+            references = dict(
+                connection.execute(select(Order.id, Order.reference)).tuples().all()
+            )
+
+        # Popular orders are looked up far more often than the rest
+        rng = random.Random(2)
+        order_ids = rng.choices(
+            range(1, args.orders + 1),
+            weights=[1 / rank for rank in range(1, args.orders + 1)],
+            k=args.requests,
+        )
+        paths = [
+            (
+                f"/api/v1/orders/{order_id}"
+                if rng.random() < 0.5
+                else f"/api/v1/orders/by-reference/{references[order_id]}"
+            )
+            for order_id in order_ids
+        ]
+
+        statements = []
+        event.listen(
+            engine, "before_cursor_execute", lambda *args: statements.append(1)
+        )
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            with session_factory() as db:
+                yield db
+
+        application = FastAPI()
+        application.include_router(order_router, prefix="/api/v1")
+        application.dependency_overrides[get_db] = override_get_db
+        application.dependency_overrides[get_read_db] = override_get_db
+        port = free_port()
+        server = start_server(application, port)
+
+        results = {}
+        max_entries = completed_order_cache.max_entries
+        try:
+            for label, entries in (("cache off", 0), ("cache on", max_entries)):
+                for cache in (completed_order_cache, pending_order_cache):
+                    cache.clear()
+                    cache.max_entries = entries
+                statements.clear()
+                timings = asyncio.run(measure(f"http://127.0.0.1:{port}", paths))
+                results[label] = (timings, len(statements))
+        finally:
+            server.should_exit = True
+
+    sys.stdout.write(
+        f"{args.requests} lookups of {args.orders} orders, "
+        f"{args.completed:.0%} completed\n"
+    )
+    sys.stdout.write(
+        f"{'':<10} {'p50 ms':>8} {'p95 ms':>8} {'lookups/s':>10} {'SQL/lookup':>11}\n"
+    )
+    for label, (timings, count) in results.items():
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        sys.stdout.write(
+            f"{label:<10} {statistics.median(timings) * 1000:>8.3f} "
+            f"{p95 * 1000:>8.3f} {len(timings) / sum(timings):>10.0f} "
+            f"{count / len(timings):>11.3f}\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Latency of fetching a cart's products: one batch request against single lookups.
+
+A uvicorn worker serving the product routes from a SQLite catalog runs in a
+background thread. For ``--ids`` random products the client either sends one
+``GET /products/{id}`` per product, one after another or ``--parallel`` at a
+time like a browser fanning out, or a single ``GET /products/batch``, with the
+response cache cold (a product changed since the last request) and warm.
+
+Usage:
+    python -m benchmarks.product_batch --ids 50 --rounds 50
+"""
+
+import argparse
+import asyncio
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.products import product_list_cache
+from app.api.routes.products import router as product_router
+from app.db.database import Base, get_read_db
+from app.models.product import Product
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(application: FastAPI, port: int) -> uvicorn.Server:
+    config = uvicorn.Config(
+        application, host="127.0.0.1", port=port, log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def sequential(client: httpx.AsyncClient, ids: list) -> None:
+    for product_id in ids:
+        (await client.get(f"/api/v1/products/{product_id}")).raise_for_status()
+
+
+async def fan_out(client: httpx.AsyncClient, ids: list, parallel: int) -> None:
+    limit = asyncio.Semaphore(parallel)
+
+    async def fetch(product_id: int) -> None:
+        async with limit:
+            (await client.get(f"/api/v1/products/{product_id}")).raise_for_status()
+
+    await asyncio.gather(*(fetch(product_id) for product_id in ids))
+
+
+async def batch(client: httpx.AsyncClient, ids: list, warm: bool) -> None:
+    if not warm:
+        product_list_cache.clear()
+    response = await client.get(
+        "/api/v1/products/batch", params={"ids": ",".join(map(str, ids))}
+    )
+    response.raise_for_status()
+
+
+async def measure(base_url: str, args) -> dict:
+    rng = random.Random(1)
+    strategies = {
+        "single, sequential": lambda c, ids: sequential(c, ids),
+        f"single, {args.parallel} parallel": lambda c, ids: fan_out(
+            c, ids, args.parallel
+        ),
+        "batch, cold cache": lambda c, ids: batch(c, ids, warm=False),
+        "batch, warm cache": lambda c, ids: batch(c, ids, warm=True),
+    }
+    timings = {label: [] for label in strategies}
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(args.rounds):
+            ids = rng.sample(range(1, args.products + 1), args.ids)
+            for label, fetch in strategies.items():
+                start = time.perf_counter()
+                await fetch(client, ids)
+                timings[label].append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ids", type=int, default=50)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--parallel", type=int, default=6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(
+            f"sqlite:///{Path(workdir) / 'bench.db'}",
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            connection.execute(
+                insert(Product),
+                [
+                    {
+                        "name": f"Product {i}",
+                        "description": "x" * 80,
+                        "price": 9.99,
+                        "stock": 100,
+                    }
+                    for i in range(args.products)
+                ],
+            )
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_read_db():
+            with session_factory() as db:
+                yield db
+
+        application = FastAPI()
+        application.include_router(product_router, prefix="/api/v1")
+        application.dependency_overrides[get_read_db] = override_get_read_db
+
+        port = free_port()
+        server = start_server(application, port)
+        try:
+            timings = asyncio.run(measure(f"http://127.0.0.1:{port}", args))
+        finally:
+            server.should_exit = True
+
+    sys.stdout.write(f"{args.ids} products per round\n")
+    sys.stdout.write(f"{'strategy':<22} {'p50 ms':>8} {'p95 ms':>8}\n")
+    for label, values in timings.items():
+        p95 = statistics.quantiles(values, n=20)[-1]
+        sys.stdout.write(
+            f"{label:<22} {statistics.median(values) * 1000:>8.2f} {p95 * 1000:>8.2f}\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Concurrent event stream subscribers per worker and end-to-end event latency.
+
+A single uvicorn worker serving the app runs in a background thread. For each
+subscriber count, that many clients open the product event stream, then
+``--events`` product changes are published through the worker's broadcaster at
+``--rate`` per second. Latency is measured from publishing an event to a client
+parsing it; a subscriber count is sustained when every client received every
+event.
+
+Usage:
+    python -m benchmarks.product_events --subscribers 100 500 1000 --events 50
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from app.api.routes.product_events import broadcaster
+from app.main import create_app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> uvicorn.Server:
+    config = uvicorn.Config(
+        create_app(), host="127.0.0.1", port=port, log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def subscriber(client, url, ready, expected, latencies) -> int:
+    """Follow the stream until ``expected`` events arrived, return how many did."""
+    received = 0
+    async with client.stream("GET", url) as response:
+        ready.release()
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                data = json.loads(line[6:])
+                latencies.append(time.perf_counter() - data["sent"])
+                received += 1
+                if received == expected:
+                    break
+    return received
+
+
+async def run_round(url: str, subscribers: int, events: int, rate: float):
+    latencies = []
+    ready = asyncio.Semaphore(0)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(30.0)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        tasks = [
+            asyncio.create_task(subscriber(client, url, ready, events, latencies))
+            for _ in range(subscribers)
+        ]
+        for _ in range(subscribers):
+            await ready.acquire()
+        while broadcaster.subscriber_count < subscribers:
+            await asyncio.sleep(0.01)
+
+        start = time.perf_counter()
+        for i in range(events):
+            # Published from this thread, delivery happens on the server's loop
+            broadcaster.publish([{"id": i, "stock": i, "sent": time.perf_counter()}])
+            await asyncio.sleep(1 / rate)
+        results = await asyncio.wait_for(asyncio.gather(*tasks), timeout=60)
+        elapsed = time.perf_counter() - start
+    return results, latencies, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=20, help="events per second")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port)
+    url = f"http://127.0.0.1:{port}/api/v1/product-events/"
+
+    sys.stdout.write(
+        f"{'subscribers':>11} {'delivered':>10} {'events/s':>9} "
+        f"{'p50 ms':>8} {'p99 ms':>8}\n"
+    )
+    try:
+        for count in args.subscribers:
+            results, latencies, elapsed = asyncio.run(
+                run_round(url, count, args.events, args.rate)
+            )
+            delivered = sum(results) / (count * args.events)
+            quantiles = statistics.quantiles(latencies, n=100)
+            sys.stdout.write(
+                f"{count:>11} {delivered:>10.1%} {sum(results) / elapsed:>9.0f} "
+                f"{quantiles[49] * 1000:>8.2f} {quantiles[98] * 1000:>8.2f}\n"
+            )
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Read throughput benchmark for replica routing.
+
+Each database node is a SQLite file (or a real database when ``--url`` is given)
+whose connection pool is capped, so a node can only run a fixed number of queries
+at a time, like a saturated server. Reads are spread over the nodes through
+:class:`app.db.database.ReplicaPool` and the throughput is reported per replica count.
+
+Usage:
+    python -m benchmarks.read_replicas --replicas 1 2 4 --threads 16
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base, ReplicaPool
+from app.models.product import Product
+
+QUERY = text("SELECT SUM(price * stock) FROM products WHERE stock >= :min_stock")
+
+
+def seed_node(url: str, rows: int, pool_size: int):
+    """Create the schema on a node, fill it with products and return its engine."""
+    engine = create_engine(url, pool_size=pool_size, max_overflow=0)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    if session.query(Product).count() < rows:
+        session.bulk_save_objects(
+            Product(name=f"Product {i}", price=float(i % 500) + 0.99, stock=i % 50)
+            for i in range(rows)
+        )
+        session.commit()
+    session.close()
+    return engine
+
+
+def run(pool: ReplicaPool, threads: int, duration: float) -> float:
+    """Issue reads from ``threads`` workers for ``duration`` seconds, return reads/s."""
+    stop = time.monotonic() + duration
+    counts = [0] * threads
+
+    def worker(slot: int) -> None:
+        while time.monotonic() < stop:
+            index = pool.acquire()
+            try:
+                with pool.engines[index].connect() as connection:
+                    connection.execute(QUERY, {"min_stock": slot % 50}).scalar()
+            finally:
+                pool.release(index)
+            counts[slot] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / duration
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--url", nargs="*", default=[], help="real replica URLs")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--strategy", default="round_robin")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        urls = args.url or [
+            f"sqlite:///{Path(workdir) / f'node_{i}.db'}"
+            for i in range(max(args.replicas))
+        ]
+        engines = [seed_node(url, args.rows, args.pool_size) for url in urls]
+
+        baseline = None
+        for count in args.replicas:
+            pool = ReplicaPool(engines[:count], strategy=args.strategy)
+            throughput = run(pool, args.threads, args.duration)
+            baseline = baseline or throughput
+            sys.stdout.write(
+                f"replicas={count:<3} reads/s={throughput:10.1f} "
+                f"speedup={throughput / baseline:5.2f}x\n"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Load test for the product listing response cache.
+
+Many threads request the same few listing pages through the ASGI app while the
+database queries are counted. The run is repeated with the cache disabled and
+enabled, and queries per second, requests per second and hit ratio are reported.
+
+Usage:
+    python -m benchmarks.response_cache --threads 32 --duration 5
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.products import product_list_cache
+from app.db.database import Base, get_read_db
+from app.main import app
+from app.models.product import Product
+
+PAGES = ["/api/v1/products/?skip=0&limit=100", "/api/v1/products/?skip=100&limit=100"]
+
+
+def run(client: TestClient, threads: int, duration: float, queries: list) -> dict:
+    """Hammer the listing pages and return request and query rates."""
+    queries.clear()
+    stop = time.monotonic() + duration
+    requests = [0] * threads
+
+    def worker(slot: int) -> None:
+        while time.monotonic() < stop:
+            client.get(PAGES[requests[slot] % len(PAGES)])
+            requests[slot] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    return {
+        "requests/s": sum(requests) / duration,
+        "queries/s": len(queries) / duration,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--products", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(
+            f"sqlite:///{Path(workdir) / 'bench.db'}",
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with session_factory() as session:
+            session.add_all(
+                Product(name=f"Product {i}", description="x" * 80, price=9.99, stock=5)
+                for i in range(args.products)
+            )
+            session.commit()
+
+        queries: list = []
+        event.listen(
+            engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *rest: queries.append(statement),
+        )
+
+        def override_get_read_db():
+            with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_read_db] = override_get_read_db
+        ttl = product_list_cache.ttl
+        with TestClient(app) as client:
+            for label, cache_ttl in (("no cache", 0), ("cached", ttl)):
+                product_list_cache.ttl = cache_ttl
+                product_list_cache.clear()
+                product_list_cache.hits = product_list_cache.misses = 0
+                result = run(client, args.threads, args.duration, queries)
+                sys.stdout.write(
+                    f"{label:<9} requests/s={result['requests/s']:9.1f} "
+                    f"db queries/s={result['queries/s']:9.1f} "
+                    f"hit ratio={product_list_cache.hit_ratio:.3f}\n"
+                )
+
+
+if __name__ == "__main__":
+    main()
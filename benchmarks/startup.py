@@ -0,0 +1,90 @@
+"""
+Startup time benchmark and budget check.
+
+Measures, in fresh interpreter processes:
+
+* the ``-X importtime`` total of ``import app.main`` followed by ``create_app()``
+* the wall time from process start to the first served request
+
+Each measurement is the median of ``--runs`` processes. With ``--max-import-ms`` or
+``--max-first-request-ms`` the script exits with status 1 when a budget is exceeded,
+so it can run as a CI step.
+
+Usage:
+    python -m benchmarks.startup --max-import-ms 1500 --max-first-request-ms 3000
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_SNIPPET = "import app.main; app.main.create_app()"
+
+FIRST_REQUEST_SNIPPET = """
+from fastapi.testclient import TestClient
+import app.main
+with TestClient(app.main.app) as client:
+    assert client.get("/health").status_code == 200
+"""
+
+
+def import_time_ms() -> float:
+    """Sum the cumulative time of top-level imports reported by ``-X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SNIPPET],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented, their time is already in their parent's total
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+def first_request_ms() -> float:
+    """Wall time of a process that starts, builds the app and serves one request."""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", FIRST_REQUEST_SNIPPET], check=True
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-first-request-ms", type=float)
+    args = parser.parse_args()
+
+    results = {
+        "import": statistics.median(import_time_ms() for _ in range(args.runs)),
+        "first request": statistics.median(
+            first_request_ms() for _ in range(args.runs)
+        ),
+    }
+    budgets = {"import": args.max_import_ms, "first request": args.max_first_request_ms}
+
+    failed = False
+    for name, value in results.items():
+        budget = budgets[name]
+        status = ""
+        if budget is not None:
+            over = value > budget
+            failed |= over
+            status = f"(budget {budget:.0f} ms: {'FAIL' if over else 'ok'})"
+        sys.stdout.write(f"{name:<14} {value:8.1f} ms {status}\n")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
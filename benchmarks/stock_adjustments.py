@@ -0,0 +1,123 @@
+"""
+Stock adjustments per second: per-product updates against the bulk endpoint.
+
+A SQLite catalog (or ``--database-url``) of ``--products`` rows receives random
+stock deltas, a few of which would take the stock below zero. They are applied
+with ``update_product_stock`` one product at a time (read, write, commit and
+refresh each; capped at ``--per-item-limit`` adjustments), with
+``adjust_products`` directly, and through ``POST /products/adjustments``
+including request validation and response rendering.
+
+Usage:
+    python -m benchmarks.stock_adjustments --batches 1000 50000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.products import router as product_router
+from app.crud import product as crud_product
+from app.db.database import Base, get_db
+from app.models.product import Product
+from app.schemas.product import StockAdjustment
+
+
+def fill(engine, count: int) -> None:
+    with engine.begin() as connection:
+        for start in range(0, count, 50_000):
+            connection.execute(
+                insert(Product),
+                [
+                    {"name": f"Product {i}", "price": 9.99, "stock": 100}
+                    for i in range(start, min(count, start + 50_000))
+                ],
+            )
+
+
+def per_item(session_factory, adjustments: list) -> None:
+    with session_factory() as db:
+        for adjustment in adjustments:
+            try:
+                crud_product.update_product_stock(
+                    db, adjustment["product_id"], adjustment["stock_delta"]
+                )
+            except ValueError:
+                db.rollback()
+
+
+def bulk(session_factory, adjustments: list, chunk_size: int) -> None:
+    with session_factory() as db:
+        crud_product.adjust_products(
+            db, [StockAdjustment(**a) for a in adjustments], chunk_size=chunk_size
+        )
+
+
+def endpoint(client: TestClient, adjustments: list) -> None:
+    response = client.post(
+        "/api/v1/products/adjustments", json={"adjustments": adjustments}
+    )
+    response.raise_for_status()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batches", type=int, nargs="+", default=[1000, 50_000])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--per-item-limit", type=int, default=2000)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        url = args.database_url or f"sqlite:///{Path(workdir) / 'bench.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        fill(engine, args.products)
+
+        def override_get_db():
+            with session_factory() as db:
+                yield db
+
+        application = FastAPI()
+        application.include_router(product_router, prefix="/api/v1")
+        application.dependency_overrides[get_db] = override_get_db
+        client = TestClient(application)
+
+        rng = random.Random(1)
+        sys.stdout.write(f"{'batch':>7} {'method':<10} {'adjustments/s':>14}\n")
+        for size in args.batches:
+            adjustments = [
+                {"product_id": product_id, "stock_delta": rng.randint(-120, 50)}
+                for product_id in rng.sample(range(1, args.products + 1), size)
+            ]
+            for label, run, items in (
+                (
+                    "per item",
+                    lambda items: per_item(session_factory, items),
+                    adjustments[: args.per_item_limit],
+                ),
+                (
+                    "bulk",
+                    lambda items: bulk(session_factory, items, args.chunk_size),
+                    adjustments,
+                ),
+                ("endpoint", lambda items: endpoint(client, items), adjustments),
+            ):
+                start = time.perf_counter()
+                run(items)
+                rate = len(items) / (time.perf_counter() - start)
+                sys.stdout.write(f"{size:>7} {label:<10} {rate:>14,.0f}\n")
+
+
+if __name__ == "__main__":
+    main()
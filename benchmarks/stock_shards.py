@@ -0,0 +1,94 @@
+"""
+Orders per second on one hot product as its stock shard count grows.
+
+Each thread repeatedly takes one unit of the same product in its own
+transaction. Shard count 0 is the unsharded baseline, a single atomic
+``UPDATE products SET stock = stock - 1`` that serialises on the product row.
+Row-level contention only shows on PostgreSQL (``--database-url``); SQLite locks
+the whole database per write, so there every shard count performs alike.
+
+Usage:
+    python -m benchmarks.stock_shards --database-url postgresql://... --threads 32
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.stock_shard import set_stock_shards, take_sharded_stock
+from app.db.database import Base
+from app.models.product import Product
+
+
+def take_one(db, product: Product) -> None:
+    if product.stock_shards:
+        take_sharded_stock(db, product, 1)
+    else:
+        db.execute(
+            update(Product)
+            .where(Product.id == product.id, Product.stock >= 1)
+            .values(stock=Product.stock - 1)
+        )
+    db.commit()
+
+
+def run(session_factory, product_id: int, threads: int, duration: float) -> float:
+    """Take stock from all threads for ``duration`` seconds, return orders/s."""
+    stop = time.monotonic() + duration
+    counts = [0] * threads
+
+    def worker(slot: int) -> None:
+        with session_factory() as db:
+            product = db.get(Product, product_id)
+            db.expunge(product)
+            while time.monotonic() < stop:
+                take_one(db, product)
+                counts[slot] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / duration
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 1, 2, 4, 8, 16])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        url = args.database_url or f"sqlite:///{Path(workdir) / 'bench.db'}"
+        engine = create_engine(
+            url,
+            pool_size=args.threads,
+            connect_args={"timeout": 30} if url.startswith("sqlite") else {},
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        with session_factory() as db:
+            product = Product(name="Hot product", price=9.99, stock=10**9)
+            db.add(product)
+            db.commit()
+            product_id = product.id
+
+        sys.stdout.write(f"{'shards':>6} {'orders/s':>10}\n")
+        for shards in args.shards:
+            with session_factory() as db:
+                set_stock_shards(db, product_id, shards)
+            rate = run(session_factory, product_id, args.threads, args.duration)
+            sys.stdout.write(f"{shards:>6} {rate:>10.0f}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Overhead of request tracing at 0%, 1% and 100% sampling.
+
+Uvicorn workers serving the product and order routes from one SQLite catalog run
+in background threads, one without the tracing middleware and one with it at each
+``--rates`` sample rate. SQL instrumentation is installed for all of them; outside
+a sampled trace its listeners return at once. Spans are exported by the file
+exporter to ``--spans-file`` (default: discarded), so encoding them is part of
+the cost. Each round sends a product lookup and an order to every worker in turn,
+so drift as the database grows affects all of them alike. Latency percentiles are
+reported per configuration, along with the cost of an unsampled call through a
+``traced`` function.
+
+Usage:
+    python -m benchmarks.tracing_overhead --requests 2000 --rates 0 0.01 1
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from pathlib import Path
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.orders import router as order_router
+from app.api.routes.products import router as product_router
+from app.db.database import Base, get_db, get_read_db
+from app.middleware.tracing import TracingMiddleware
+from app.models.product import Product
+from app.tracing.database import instrument_sql
+from app.tracing.exporters import BatchSpanProcessor, FileSpanExporter
+from app.tracing.tracer import Tracer, traced
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(application: FastAPI, port: int) -> uvicorn.Server:
+    config = uvicorn.Config(
+        application, host="127.0.0.1", port=port, log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def measure(base_urls: dict, requests: int, products: int) -> dict:
+    rng = random.Random(1)
+    timings = {label: [] for label in base_urls}
+    clients = {
+        label: httpx.AsyncClient(base_url=url) for label, url in base_urls.items()
+    }
+    try:
+        for _ in range(requests // 2):
+            product_id = rng.randrange(1, products + 1)
+            labels = list(clients)
+            rng.shuffle(labels)
+            for label in labels:
+                client = clients[label]
+                start = time.perf_counter()
+                response = await client.get(f"/api/v1/products/{product_id}")
+                response.raise_for_status()
+                timings[label].append(time.perf_counter() - start)
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/v1/orders/",
+                    json={"items": [{"product_id": product_id, "quantity": 1}]},
+                )
+                response.raise_for_status()
+                timings[label].append(time.perf_counter() - start)
+    finally:
+        for client in clients.values():
+            await client.aclose()
+    return timings
+
+
+def unsampled_call_overhead() -> float:
+    """Extra nanoseconds of calling a traced function outside a sampled trace."""
+
+    def plain(x):
+        return x
+
+    wrapped = traced()(plain)
+    number = 1_000_000
+    bare = min(timeit.repeat(lambda: plain(1), number=number, repeat=5))
+    decorated = min(timeit.repeat(lambda: wrapped(1), number=number, repeat=5))
+    return (decorated - bare) / number * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.0, 0.01, 1.0])
+    parser.add_argument("--spans-file", default=os.devnull)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(
+            f"sqlite:///{Path(workdir) / 'bench.db'}",
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            connection.execute(
+                insert(Product),
+                [
+                    {"name": f"Product {i}", "price": 9.99, "stock": 1_000_000}
+                    for i in range(args.products)
+                ],
+            )
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            with session_factory() as db:
+                yield db
+
+        instrument_sql()
+        configurations = [("off", None)] + [
+            (f"{rate:.0%} sampled", rate) for rate in args.rates
+        ]
+        base_urls, servers, tracers = {}, [], []
+        for label, rate in configurations:
+            application = FastAPI()
+            if rate is not None:
+                tracer = Tracer(
+                    BatchSpanProcessor(FileSpanExporter(args.spans_file, "bench")),
+                    sample_rate=rate,
+                )
+                tracers.append(tracer)
+                application.add_middleware(TracingMiddleware, tracer=tracer)
+            application.include_router(product_router, prefix="/api/v1")
+            application.include_router(order_router, prefix="/api/v1")
+            application.dependency_overrides[get_db] = override_get_db
+            application.dependency_overrides[get_read_db] = override_get_db
+
+            port = free_port()
+            servers.append(start_server(application, port))
+            base_urls[label] = f"http://127.0.0.1:{port}"
+        try:
+            results = asyncio.run(measure(base_urls, args.requests, args.products))
+        finally:
+            for server in servers:
+                server.should_exit = True
+            for tracer in tracers:
+                tracer.shutdown()
+
+    baseline = statistics.median(results["off"])
+    sys.stdout.write(f"{args.requests} requests per configuration\n")
+    sys.stdout.write(f"{'tracing':<14} {'p50 ms':>8} {'p95 ms':>8} {'p50 +%':>8}\n")
+    for label, values in results.items():
+        p50 = statistics.median(values)
+        p95 = statistics.quantiles(values, n=20)[-1]
+        sys.stdout.write(
+            f"{label:<14} {p50 * 1000:>8.3f} {p95 * 1000:>8.3f} "
+            f"{(p50 / baseline - 1) * 100:>8.1f}\n"
+        )
+    sys.stdout.write(
+        f"unsampled traced() call: +{unsampled_call_overhead():.0f} ns per call\n"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Bytes on the wire and server CPU per request for a 1000-product page.
+
+Every response format is rendered from the same validated page and then encoded
+with each available content coding at its configured level. CPU time covers
+serialisation plus compression and is averaged over ``--iterations`` runs.
+
+Usage:
+    python -m benchmarks.wire_formats --products 1000 --iterations 50
+"""
+
+import argparse
+import datetime
+import sys
+import time
+
+from app.api.negotiation import available_formats, render
+from app.api.routes.products import product_list_adapter
+from app.config import get_settings
+from app.middleware.compression import available_encoders
+from app.schemas.product import Product as ProductSchema
+
+
+def make_page(count: int):
+    now = datetime.datetime.now(datetime.UTC)
+    return [
+        ProductSchema(
+            id=i,
+            name=f"Product {i}",
+            description=f"Description of product {i}, a fine item for everyday use",
+            price=round(5 + i % 300 + 0.99, 2),
+            stock=i % 40,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    levels = {
+        "identity": None,
+        "gzip": settings.COMPRESSION_GZIP_LEVEL,
+        "br": settings.COMPRESSION_BROTLI_QUALITY,
+        "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+    }
+    encoders = {"identity": None, **available_encoders()}
+    page = make_page(args.products)
+
+    sys.stdout.write(f"{'format':<42} {'coding':<9} {'bytes':>9} {'cpu ms':>8}\n")
+    for media_type in available_formats():
+        for coding, encoder_class in encoders.items():
+            start = time.process_time()
+            for _ in range(args.iterations):
+                body = render(product_list_adapter, page, media_type)
+                if encoder_class is not None:
+                    encoder = encoder_class(levels[coding])
+                    body = encoder.compress(body) + encoder.finish()
+            cpu_ms = (time.process_time() - start) * 1000 / args.iterations
+            sys.stdout.write(
+                f"{media_type:<42} {coding:<9} {len(body):>9} {cpu_ms:>8.2f}\n"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Throughput benchmark of the production launcher across worker counts.
+
+For each worker count the server is started with ``python -m app.server``, loaded
+from client threads for a fixed duration and stopped with SIGTERM, which also
+exercises the graceful drain. The default path needs no database; point ``--path``
+at ``/api/v1/products/`` to include it.
+
+Usage:
+    python -m benchmarks.workers --workers 1 2 4 --threads 32 --duration 10
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+
+def wait_until_ready(url: str, timeout: float = 30) -> None:
+    """Poll the health endpoint until the server answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start within {timeout}s")
+
+
+def load(url: str, threads: int, duration: float) -> tuple[float, int]:
+    """Request ``url`` from ``threads`` clients, return (requests/s, errors)."""
+    stop = time.monotonic() + duration
+    done = [0] * threads
+    errors = [0] * threads
+
+    def worker(slot: int) -> None:
+        while time.monotonic() < stop:
+            try:
+                urllib.request.urlopen(url, timeout=10).read()
+                done[slot] += 1
+            except OSError:
+                errors[slot] += 1
+
+    clients = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return sum(done) / duration, sum(errors)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--path", default="/health")
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}"
+    for workers in args.workers:
+        env = dict(os.environ, WEB_CONCURRENCY=str(workers), SERVER_PORT=str(args.port))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "app.server"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(f"{base}/health")
+            throughput, errors = load(f"{base}{args.path}", args.threads, args.duration)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+        sys.stdout.write(
+            f"workers={workers:<3} requests/s={throughput:9.1f} errors={errors}\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
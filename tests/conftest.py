@@ -1,12 +1,19 @@
+import os
 from typing import List
 
+# The app is built on import; shared token buckets and pool wait averages would
+# let one test's traffic limit the next, admission control has its own tests
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.db.database import Base, get_db
+from app.api.routes.orders import completed_order_cache, pending_order_cache
+from app.api.routes.products import catalog_version, product_list_cache
+from app.db.database import Base, get_db, get_read_db
 from app.main import app
 from app.models.product import Product
 
@@ -54,6 +61,13 @@ def client(test_db):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+
+    # Cached pages and orders may belong to a previous test's database
+    product_list_cache.clear()
+    catalog_version.mark_stale()
+    completed_order_cache.clear()
+    pending_order_cache.clear()
 
     with TestClient(app) as client:
         yield client
@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+
+from app.middleware.admission import (
+    AdmissionControlMiddleware,
+    InMemoryRateLimitBackend,
+    PoolWaitTracker,
+    RateLimitRule,
+)
+
+ORDERS = RateLimitRule("orders", frozenset({"POST"}), "/orders", rate=1, burst=2)
+CATALOG = RateLimitRule("catalog", frozenset({"GET"}), "/products", rate=1, burst=5)
+
+
+def make_client(**options) -> TestClient:
+    """Build a client for a tiny app guarded by the admission middleware."""
+    application = FastAPI()
+
+    @application.post("/orders")
+    def place_order():
+        return {"ok": True}
+
+    @application.get("/products")
+    def list_products():
+        return []
+
+    @application.get("/health")
+    def health():
+        return {"status": "healthy"}
+
+    application.add_middleware(
+        AdmissionControlMiddleware, rules=[ORDERS, CATALOG], **options
+    )
+    return TestClient(application)
+
+
+def test_token_bucket() -> None:
+    """Test that a bucket allows its burst and then asks the caller to wait."""
+    backend = InMemoryRateLimitBackend()
+    results = [asyncio.run(backend.take("k", rate=10, burst=3)) for _ in range(4)]
+    assert results[:3] == [0, 0, 0]
+    assert 0 < results[3] <= 0.1
+
+
+def test_separate_budgets_per_route() -> None:
+    """Test that orders and catalog reads are limited independently."""
+    client = make_client()
+    codes = [client.post("/orders").status_code for _ in range(3)]
+    assert codes == [200, 200, 429]
+
+    assert client.get("/products").status_code == status.HTTP_200_OK
+    assert client.get("/health").status_code == status.HTTP_200_OK
+
+
+def test_rate_limited_response() -> None:
+    """Test that a limited request gets 429 with Retry-After."""
+    client = make_client()
+    client.post("/orders")
+    client.post("/orders")
+    response = client.post("/orders")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_budgets_are_per_api_key() -> None:
+    """Test that each API key has its own bucket."""
+    client = make_client(api_keys={"a", "b"})
+    for _ in range(2):
+        client.post("/orders", headers={"X-API-Key": "a"})
+    assert client.post("/orders", headers={"X-API-Key": "a"}).status_code == 429
+    assert client.post("/orders", headers={"X-API-Key": "b"}).status_code == 200
+
+
+def test_unknown_api_keys_share_the_address_budget() -> None:
+    """Test that made-up API keys do not get buckets of their own."""
+    client = make_client(api_keys={"a"})
+    codes = [
+        client.post("/orders", headers={"X-API-Key": f"random-{i}"}).status_code
+        for i in range(3)
+    ]
+    assert codes == [200, 200, 429]
+    assert client.post("/orders", headers={"X-API-Key": "a"}).status_code == 200
+
+
+def test_refilled_buckets_are_swept() -> None:
+    """Test that buckets back at their burst no longer take up memory."""
+    backend = InMemoryRateLimitBackend(sweep_interval=0)
+    asyncio.run(backend.take("idle", rate=100, burst=2))
+    asyncio.run(backend.take("busy", rate=0.001, burst=1))
+    time.sleep(0.05)
+
+    asyncio.run(backend.take("new", rate=100, burst=2))
+    assert set(backend._buckets) == {"busy", "new"}
+
+
+def test_shed_on_pool_wait() -> None:
+    """Test that requests are shed with 503 while pool waits are too long."""
+    tracker = PoolWaitTracker()
+    for _ in range(5):
+        tracker.observe(2.0)
+    client = make_client(max_pool_wait=0.5, wait_tracker=tracker)
+
+    response = client.get("/products")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/health").status_code == status.HTTP_200_OK
+
+
+def test_shed_on_queue_depth() -> None:
+    """Test that requests are shed once too many are in flight."""
+    client = make_client(max_in_flight=0)
+    assert client.get("/products").status_code == 503
+
+
+def test_pool_wait_decays() -> None:
+    """Test that the pool wait average recovers without new samples."""
+    tracker = PoolWaitTracker(half_life=0.01)
+    tracker.observe(1.0)
+    time.sleep(0.05)
+    assert tracker.value() < 0.1
+
+
+def test_single_slow_checkout_is_not_shed() -> None:
+    """Test that one outlier among fast pool waits does not trigger shedding."""
+    tracker = PoolWaitTracker()
+    for _ in range(20):
+        tracker.observe(0.001)
+    tracker.observe(2.0)
+    client = make_client(max_pool_wait=0.5, wait_tracker=tracker)
+
+    assert client.get("/products").status_code == status.HTTP_200_OK
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import zlib
+from typing import Any, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.negotiation import COLUMNAR, JSON, MSGPACK, choose_format, msgpack
+from app.middleware.compression import (
+    CompressionMiddleware,
+    available_encoders,
+    choose_encoding,
+)
+
+requires_msgpack = pytest.mark.skipif(msgpack is None, reason="msgpack not installed")
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, JSON),
+        ("*/*", JSON),
+        pytest.param("application/msgpack", MSGPACK, marks=requires_msgpack),
+        pytest.param("application/x-msgpack", MSGPACK, marks=requires_msgpack),
+        (f"application/json;q=0.5, {COLUMNAR}", COLUMNAR),
+        ("text/html", JSON),
+    ],
+)
+def test_choose_format(accept: str, expected: str) -> None:
+    """Test Accept header negotiation."""
+    assert choose_format(accept) == expected
+
+
+def test_choose_encoding() -> None:
+    """Test that client qualities win and server preference breaks ties."""
+    supported = ["zstd", "br", "gzip"]
+    assert choose_encoding("gzip, br", supported) == "br"
+    assert choose_encoding("gzip;q=1, br;q=0.5", supported) == "gzip"
+    assert choose_encoding("identity", supported) is None
+    assert choose_encoding("*;q=0", supported) is None
+
+
+@requires_msgpack
+def test_products_as_msgpack(client: TestClient, sample_products: List[Any]) -> None:
+    """Test that product listings can be requested as MessagePack."""
+    response = client.get("/api/v1/products/", headers={"Accept": MSGPACK})
+    assert response.headers["content-type"] == MSGPACK
+    products = msgpack.unpackb(response.content)
+    assert [p["name"] for p in products] == [p.name for p in sample_products]
+
+
+def test_products_as_columnar(client: TestClient, sample_products: List[Any]) -> None:
+    """Test the columnar layout and that the cache keeps formats apart."""
+    plain = client.get("/api/v1/products/").json()
+    columnar = client.get("/api/v1/products/", headers={"Accept": COLUMNAR}).json()
+
+    assert columnar["columns"] == list(plain[0])
+    assert [dict(zip(columnar["columns"], row)) for row in columnar["rows"]] == plain
+
+
+@requires_msgpack
+def test_order_as_msgpack(client: TestClient, sample_products: List[Any]) -> None:
+    """Test that order placement honours the Accept header."""
+    order_data = {"items": [{"product_id": sample_products[0].id, "quantity": 1}]}
+    response = client.post(
+        "/api/v1/orders/", json=order_data, headers={"Accept": MSGPACK}
+    )
+    assert response.status_code == 201
+    assert msgpack.unpackb(response.content)["items"][0]["quantity"] == 1
+
+
+@pytest.mark.parametrize("coding", list(available_encoders()))
+def test_compression_above_threshold(client: TestClient, coding: str) -> None:
+    """Test that large responses are compressed with the negotiated coding."""
+    for i in range(20):
+        product = {"name": f"Product {i}", "description": "x" * 200, "price": 1.5}
+        client.post("/api/v1/products/", json={**product, "stock": 1})
+
+    response = client.get("/api/v1/products/", headers={"Accept-Encoding": coding})
+    assert response.headers["content-encoding"] == coding
+    assert len(response.json()) == 20
+
+
+def test_small_responses_are_not_compressed(client: TestClient) -> None:
+    """Test that bodies below the minimum size are sent as is."""
+    response = client.get("/api/v1/products/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_streamed_responses_are_compressed_incrementally() -> None:
+    """Test that each streamed chunk can be decoded as soon as it arrives."""
+
+    async def stream_app(scope, receive, send) -> None:
+        headers = [(b"content-type", b"application/json")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for i in range(3):
+            chunk = (json.dumps({"event": i}) + "\n").encode()
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages: List[dict] = []
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/stream",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    middleware = CompressionMiddleware(stream_app, minimum_size=10_000)
+    asyncio.run(middleware(scope, None, send))
+
+    assert (b"content-encoding", b"gzip") in messages[0]["headers"]
+    decoder = zlib.decompressobj(31)
+    decoded = [decoder.decompress(message["body"]) for message in messages[1:]]
+    assert decoded == [b'{"event": 0}\n', b'{"event": 1}\n', b'{"event": 2}\n', b""]
+    assert decoder.eof
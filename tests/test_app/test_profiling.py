@@ -0,0 +1,152 @@
+import subprocess
+import sys
+import time
+
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+
+from app.api.routes.admin import router as admin_router
+from app.main import create_app
+from app.middleware.profiling import RequestProfilingMiddleware
+from app.profiling.memory import memory_tracker
+
+TOKEN = "s3cret"
+
+_leak = []
+
+
+def busy_endpoint_work(seconds: float) -> int:
+    """Burn CPU so the sampler has something to see."""
+    total, end = 0, time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        total += sum(range(1000))
+    return total
+
+
+def build_app() -> FastAPI:
+    application = FastAPI()
+    application.state.admin_token = TOKEN
+    application.add_middleware(RequestProfilingMiddleware, token=TOKEN, interval=0.001)
+    application.include_router(admin_router)
+
+    @application.get("/busy")
+    def busy():
+        return {"total": busy_endpoint_work(0.2)}
+
+    @application.post("/leak")
+    def leak():
+        _leak.append(bytearray(2**20))
+        return {"leaked": len(_leak)}
+
+    return application
+
+
+def parse_folded(body: str) -> dict:
+    """Parse folded stack lines, failing on anything malformed."""
+    stacks = {}
+    for line in body.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0
+        stacks[stack] = int(count)
+    return stacks
+
+
+def test_profiled_request_returns_folded_stacks() -> None:
+    """Test that a profiled request returns flamegraph input covering the endpoint."""
+    client = TestClient(build_app())
+
+    response = client.get("/busy", headers={"X-Profile": "cpu", "X-Admin-Token": TOKEN})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.headers["x-profiled-status"] == "200"
+    assert int(response.headers["x-profile-samples"]) > 0
+    stacks = parse_folded(response.text)
+    assert any(stack.endswith("busy_endpoint_work") for stack in stacks)
+
+
+def test_profiling_needs_the_admin_token() -> None:
+    """Test that the profile header without the right token is ignored."""
+    client = TestClient(build_app())
+
+    for headers in ({"X-Profile": "cpu"}, {"X-Profile": "cpu", "X-Admin-Token": "x"}):
+        response = client.get("/busy", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert "total" in response.json()
+        assert "x-profiled-status" not in response.headers
+
+
+def test_admin_routes_need_the_admin_token() -> None:
+    """Test that admin endpoints reject missing and wrong tokens."""
+    client = TestClient(build_app())
+
+    assert client.post("/admin/profile/cpu").status_code == status.HTTP_403_FORBIDDEN
+    response = client.get(
+        "/admin/profile/memory/diff", headers={"X-Admin-Token": "wrong"}
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_worker_profile() -> None:
+    """Test that the time-boxed worker profile samples for the requested time."""
+    client = TestClient(build_app())
+
+    response = client.post(
+        "/admin/profile/cpu",
+        params={"seconds": 0.2, "interval_ms": 5},
+        headers={"X-Admin-Token": TOKEN},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert int(response.headers["x-profile-samples"]) > 10
+    assert parse_folded(response.text)
+
+    response = client.post(
+        "/admin/profile/cpu", params={"seconds": 3600}, headers={"X-Admin-Token": TOKEN}
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_memory_diff() -> None:
+    """Test that memory diffs point at the code that allocated since the baseline."""
+    client = TestClient(build_app())
+    headers = {"X-Admin-Token": TOKEN}
+
+    response = client.get("/admin/profile/memory/diff", headers=headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    try:
+        client.post("/admin/profile/memory/start", headers=headers)
+        for _ in range(3):
+            client.post("/leak")
+        response = client.get("/admin/profile/memory/diff", headers=headers)
+    finally:
+        client.post("/admin/profile/memory/stop", headers=headers)
+        _leak.clear()
+
+    assert response.status_code == status.HTTP_200_OK
+    top = response.text.splitlines()[1]
+    assert "test_profiling.py" in top
+    assert not memory_tracker.tracing
+
+
+def test_no_admin_surface_without_token() -> None:
+    """Test that without an admin token neither the routes nor the hook exist."""
+    application = create_app()
+    assert not any("/admin" in path for path in application.openapi()["paths"])
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import os\n"
+            "os.environ['ADMIN_TOKEN'] = 'x'\n"
+            "from app.main import create_app\n"
+            "paths = create_app().openapi()['paths']\n"
+            "assert '/api/v1/admin/profile/cpu' in paths, list(paths)",
+        ],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,47 @@
+import pytest
+
+from app.server import pool_limits, product_events_bus
+
+
+@pytest.mark.parametrize("workers", [1, 2, 3, 8, 16, 45])
+def test_pool_limits_stay_under_budget(workers: int) -> None:
+    """Test that all worker pools together never exceed the connection budget."""
+    pool_size, max_overflow = pool_limits(workers, max_connections=100, reserved=10)
+    assert pool_size >= 1
+    assert max_overflow >= 0
+    assert workers * (pool_size + max_overflow) <= 90
+
+
+def test_pool_limits_split() -> None:
+    """Test that the per-worker budget is split between steady and overflow."""
+    assert pool_limits(4, max_connections=100, reserved=20) == (10, 10)
+
+
+@pytest.mark.parametrize("workers", [1, 4, 16])
+def test_pool_limits_count_bus_connections(workers: int) -> None:
+    """Test that connections opened outside the pools come out of the budget."""
+    pool_size, max_overflow = pool_limits(
+        workers, max_connections=100, reserved=10, unpooled=2
+    )
+    assert workers * (pool_size + max_overflow + 2) <= 90
+    assert pool_limits(16, max_connections=100, reserved=10, unpooled=2) == (2, 1)
+
+
+def test_pool_limits_too_many_workers() -> None:
+    """Test that a budget smaller than the worker count is rejected."""
+    with pytest.raises(ValueError):
+        pool_limits(20, max_connections=20, reserved=10)
+
+
+def test_events_bus_follows_worker_count() -> None:
+    """Test that several workers share changes over postgres unless configured."""
+    assert product_events_bus(None, 1) == "local"
+    assert product_events_bus(None, 4) == "postgres"
+    assert product_events_bus("postgres", 1) == "postgres"
+
+
+def test_local_events_bus_with_several_workers() -> None:
+    """Test that the local bus is refused when other workers would miss changes."""
+    assert product_events_bus("local", 1) == "local"
+    with pytest.raises(ValueError, match="WEB_CONCURRENCY"):
+        product_events_bus("local", 2)
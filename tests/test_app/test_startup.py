@@ -0,0 +1,43 @@
+import subprocess
+import sys
+
+from fastapi import FastAPI
+
+from app.main import create_app
+
+
+def run_python(code: str) -> subprocess.CompletedProcess:
+    """Run a snippet in a fresh interpreter so module imports start from scratch."""
+    return subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=False
+    )
+
+
+def test_import_main_is_lightweight() -> None:
+    """Test that importing app.main loads neither the framework nor the database."""
+    result = run_python(
+        "import sys, app.main\n"
+        "heavy = [m for m in ('fastapi', 'sqlalchemy', 'app.api.routes.products')"
+        " if m in sys.modules]\n"
+        "assert not heavy, heavy"
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_engine_is_created_on_first_use() -> None:
+    """Test that building the app does not create the database engine."""
+    result = run_python(
+        "import app.main\n"
+        "from app.db.database import get_engine\n"
+        "app.main.create_app()\n"
+        "assert get_engine.cache_info().currsize == 0"
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_create_app() -> None:
+    """Test that the factory returns independent, fully routed applications."""
+    first, second = create_app(), create_app()
+    assert isinstance(first, FastAPI)
+    assert first is not second
+    assert "/api/v1/products/" in first.openapi()["paths"]
@@ -0,0 +1,169 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+
+from app.api.routes.orders import router as order_router
+from app.api.routes.products import router as product_router
+from app.db.database import get_db, get_read_db
+from app.middleware.tracing import TracingMiddleware
+from app.models.product import Product
+from app.tracing.database import instrument_sql
+from app.tracing.exporters import BatchSpanProcessor, FileSpanExporter
+from app.tracing.tracer import (
+    Tracer,
+    current_traceparent,
+    format_traceparent,
+    parse_traceparent,
+    start_span,
+)
+
+TRACE_ID = 0x4BF92F3577B34DA6A3CE929D0E0E4736
+PARENT_ID = 0x00F067AA0BA902B7
+
+
+def build_app(test_db, tracer: Tracer) -> FastAPI:
+    def override_get_db():
+        yield test_db
+
+    application = FastAPI()
+    application.add_middleware(TracingMiddleware, tracer=tracer)
+    application.include_router(product_router, prefix="/api/v1")
+    application.include_router(order_router, prefix="/api/v1")
+    application.dependency_overrides[get_db] = override_get_db
+    application.dependency_overrides[get_read_db] = override_get_db
+    return application
+
+
+def file_tracer(path: Path, sample_rate: float) -> Tracer:
+    processor = BatchSpanProcessor(FileSpanExporter(str(path), "test"), interval=60)
+    return Tracer(processor, sample_rate=sample_rate)
+
+
+def exported_spans(path: Path) -> List[Dict[str, Any]]:
+    spans = []
+    for line in path.read_text().splitlines():
+        for resource in json.loads(line)["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                spans.extend(scope["spans"])
+    return spans
+
+
+def test_traceparent_round_trip() -> None:
+    """Test parsing and formatting of W3C traceparent headers."""
+    header = format_traceparent(TRACE_ID, PARENT_ID, True)
+
+    assert header == "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    assert parse_traceparent(header) == (TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(header[:-2] + "00") == (TRACE_ID, PARENT_ID, False)
+    for invalid in (
+        None,
+        "garbage",
+        "ff" + header[2:],
+        "00-" + "0" * 32 + "-00f067aa0ba902b7-01",
+        header + "-extra",
+    ):
+        assert parse_traceparent(invalid) is None
+
+
+def test_head_sampling(tmp_path: Path) -> None:
+    """Test that new traces use the sample rate and continued ones the caller's flag."""
+    never = file_tracer(tmp_path / "never.jsonl", 0.0)
+    always = file_tracer(tmp_path / "always.jsonl", 1.0)
+
+    assert not never.start_trace("GET /").recording
+    assert always.start_trace("GET /").recording
+    sampled = format_traceparent(TRACE_ID, PARENT_ID, True)
+    unsampled = format_traceparent(TRACE_ID, PARENT_ID, False)
+    assert never.start_trace("GET /", sampled).recording
+    assert not always.start_trace("GET /", unsampled).recording
+
+    # Unsampled traces still propagate their context, without recording children
+    root = never.start_trace("GET /", unsampled)
+    assert start_span("child") is not root
+    assert root.child("child") is root
+    assert root.trace_id == TRACE_ID
+
+    never.shutdown()
+    always.shutdown()
+
+
+def test_sampled_order_is_traced(
+    tmp_path: Path, test_db, sample_products: List[Product]
+) -> None:
+    """Test that a sampled order has route, CRUD, SQL and commit spans in one tree."""
+    instrument_sql()
+    path = tmp_path / "spans.jsonl"
+    tracer = file_tracer(path, 0.0)
+    client = TestClient(build_app(test_db, tracer))
+
+    response = client.post(
+        "/api/v1/orders/",
+        json={"items": [{"product_id": sample_products[0].id, "quantity": 2}]},
+        headers={"traceparent": format_traceparent(TRACE_ID, PARENT_ID, True)},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    tracer.shutdown()
+
+    spans = exported_spans(path)
+    assert {span["traceId"] for span in spans} == {f"{TRACE_ID:032x}"}
+    by_name = {span["name"]: span for span in spans}
+    request = by_name["POST /api/v1/orders/"]
+    route = by_name["route create_order"]
+    crud = by_name["app.crud.order.create_order"]
+    commit = by_name["COMMIT"]
+    assert request["parentSpanId"] == f"{PARENT_ID:016x}"
+    assert request["kind"] == 2
+    assert route["parentSpanId"] == request["spanId"]
+    assert crud["parentSpanId"] == route["spanId"]
+    assert by_name["app.crud.product.take_stock"]["parentSpanId"] == crud["spanId"]
+    assert commit["parentSpanId"] == crud["spanId"]
+
+    statements = [span for span in spans if span["kind"] == 3 and span is not commit]
+    assert {span["name"] for span in statements} >= {"SELECT", "UPDATE", "INSERT"}
+    # Every statement runs in the handler, the order inserts in create_order
+    parents = {span["parentSpanId"] for span in statements}
+    assert request["spanId"] not in parents
+    assert crud["spanId"] in parents
+    attributes = {a["key"]: a["value"] for a in request["attributes"]}
+    assert attributes["http.route"] == {"stringValue": "/api/v1/orders/"}
+    assert attributes["http.response.status_code"] == {"intValue": "201"}
+
+
+def test_failed_lookup_marks_span(tmp_path: Path, test_db) -> None:
+    """Test that an exception leaving a CRUD function is recorded on its span."""
+    path = tmp_path / "spans.jsonl"
+    tracer = file_tracer(path, 1.0)
+    client = TestClient(build_app(test_db, tracer))
+
+    response = client.get("/api/v1/products/999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    tracer.shutdown()
+
+    crud = next(s for s in exported_spans(path) if s["name"].startswith("app.crud"))
+    assert crud["status"]["code"] == 2
+
+
+def test_unsampled_requests_export_nothing(tmp_path: Path, test_db) -> None:
+    """Test that unsampled requests record no spans but keep their trace context."""
+    instrument_sql()
+    path = tmp_path / "spans.jsonl"
+    tracer = file_tracer(path, 0.0)
+    application = build_app(test_db, tracer)
+    seen = []
+
+    @application.get("/context")
+    def context():
+        seen.append(current_traceparent())
+        return {}
+
+    client = TestClient(application)
+    client.get("/api/v1/products/")
+    unsampled = format_traceparent(TRACE_ID, PARENT_ID, False)
+    client.get("/context", headers={"traceparent": unsampled})
+    tracer.shutdown()
+
+    assert path.read_text() == ""
+    assert seen == [unsampled]
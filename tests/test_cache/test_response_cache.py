@@ -0,0 +1,191 @@
+import threading
+import time
+from typing import Any, List
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+
+from app.api.routes.products import catalog_version, product_list_cache
+from app.cache.catalog_version import CatalogVersion
+from app.cache.response_cache import ResponseCache, make_cache_key
+from app.crud.product import update_product_stock
+from app.db.database import READ_YOUR_WRITES_COOKIE
+from app.models.product import Product
+
+
+def count_queries(test_db) -> List[str]:
+    """Record every SELECT statement run on the test database."""
+    statements: List[str] = []
+
+    @event.listens_for(test_db.get_bind(), "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    return statements
+
+
+def test_cache_key_is_normalised() -> None:
+    """Test that parameter order does not change the key."""
+    assert make_cache_key("/p", {"skip": 0, "limit": 10}) == make_cache_key(
+        "/p", {"limit": 10, "skip": 0}
+    )
+
+
+def test_ttl_expiry() -> None:
+    """Test that entries expire after the TTL."""
+    cache = ResponseCache(ttl=0.05)
+    cache.set("key", b"body")
+    assert cache.get("key") == b"body"
+    time.sleep(0.06)
+    assert cache.get("key") is None
+
+
+def test_lru_eviction() -> None:
+    """Test that the least recently used entry is evicted first."""
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", b"a")
+    cache.set("b", b"b")
+    cache.get("a")
+    cache.set("c", b"c")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"a"
+    assert cache.evictions == 1
+
+
+def test_concurrent_misses_render_once() -> None:
+    """Test that a burst of misses for one key renders the body once."""
+    cache = ResponseCache()
+    renders = []
+
+    def render() -> bytes:
+        renders.append(1)
+        time.sleep(0.05)
+        return b"body"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_set("k", render)))
+        for _ in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(renders) == 1
+    assert results == [b"body"] * 20
+
+
+def test_invalidation_during_render_is_not_stored() -> None:
+    """Test that a body rendered before an invalidation is not cached."""
+    cache = ResponseCache()
+    cache.get_or_set("k", lambda: cache.clear() or b"stale")
+    assert cache.get("k") is None
+
+
+def test_counters_under_concurrency() -> None:
+    """Test that lookups from many threads are all counted."""
+    cache = ResponseCache()
+    cache.set("k", b"body")
+
+    def look_up() -> None:
+        for i in range(2000):
+            cache.record(hit=i % 2 == 0)
+            cache.get_or_set("k", lambda: b"body")
+
+    threads = [threading.Thread(target=look_up) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert (cache.hits, cache.misses) == (8 * 3000, 8 * 1000)
+
+
+def test_catalog_version_is_read_once_per_max_age() -> None:
+    """Test that the version is memoised until it ages out or a commit marks it."""
+    loads = []
+
+    def load() -> int:
+        loads.append(1)
+        return len(loads)
+
+    version = CatalogVersion(max_age=60)
+    assert [version.get(load) for _ in range(3)] == [1, 1, 1]
+    version.mark_stale()
+    assert version.get(load) == 2
+
+    # A read racing a commit is returned but not kept
+    version.mark_stale()
+    assert version.get(lambda: version.mark_stale() or 7) == 7
+    assert version.get(load) == 3
+
+
+def test_product_list_is_cached(
+    client: TestClient, test_db, sample_products: List[Any]
+) -> None:
+    """Test that repeated listings are answered without reaching the database."""
+    queries = count_queries(test_db)
+
+    first = client.get("/api/v1/products/?limit=100&skip=0")
+    rendered = list(queries)
+    second = client.get("/api/v1/products/")
+    assert first.status_code == status.HTTP_200_OK
+    assert first.content == second.content
+    assert len(rendered) == 2
+    assert queries[2:] == []
+    assert product_list_cache.hits == 1
+
+
+def test_writes_elsewhere_retire_pages(
+    client: TestClient, test_db, sample_products: List[Any], monkeypatch
+) -> None:
+    """Test that pages go stale with writes that fire no commit callback here."""
+    client.get("/api/v1/products/")
+    # Past PRODUCT_CACHE_VERSION_MAX_AGE_SECONDS the version is read again
+    monkeypatch.setattr(catalog_version, "max_age", 0)
+
+    # Like another worker or a CLI tool, outside this process's sessions
+    with test_db.get_bind().begin() as connection:
+        connection.execute(
+            update(Product).where(Product.id == sample_products[0].id).values(stock=3)
+        )
+    # The request shares the test's session, which would otherwise keep its copy
+    test_db.expire_all()
+
+    stocks = {p["id"]: p["stock"] for p in client.get("/api/v1/products/").json()}
+    assert stocks[sample_products[0].id] == 3
+
+
+def test_pinned_clients_bypass_cache(
+    client: TestClient, sample_products: List[Any]
+) -> None:
+    """Test that clients reading their own writes neither use nor fill the cache."""
+    client.cookies.set(READ_YOUR_WRITES_COOKIE, str(int(time.time()) + 60))
+    before = (product_list_cache.hits, product_list_cache.misses)
+
+    client.get("/api/v1/products/")
+    client.get("/api/v1/products/")
+
+    assert (product_list_cache.hits, product_list_cache.misses) == before
+    assert product_list_cache.stats()["entries"] == 0
+
+
+def test_product_write_invalidates_cache(
+    client: TestClient, test_db, sample_products: List[Any]
+) -> None:
+    """Test that creating a product or changing stock drops cached pages."""
+    assert len(client.get("/api/v1/products/").json()) == 3
+
+    product_data = {"name": "New Product", "price": 9.99, "stock": 1}
+    client.post("/api/v1/products/", json=product_data)
+    assert len(client.get("/api/v1/products/").json()) == 4
+
+    update_product_stock(test_db, sample_products[0].id, -1)
+    stocks = {p["id"]: p["stock"] for p in client.get("/api/v1/products/").json()}
+    assert (
+        stocks[sample_products[0].id]
+        == test_db.get(Product, sample_products[0].id).stock
+    )
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.cache.singleflight import SingleFlight
+from app.crud import product as crud_product
+from app.db.database import Base
+from app.exceptions.http_exceptions import ProductNotFoundException
+from app.models.product import Product
+
+BURST = 20
+
+
+def make_slow_session_factory(path: Path, stock: int = 100):
+    """
+    Session factory on a SQLite file where every query takes at least 50ms,
+    together with the list of executed statements.
+    """
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with factory() as db:
+        db.add(Product(name="Viral Product", price=9.99, stock=stock))
+        db.commit()
+
+    statements: List[str] = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def slow_query(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+        time.sleep(0.05)
+
+    return factory, statements
+
+
+@pytest.fixture
+def slow_session_factory(tmp_path: Path):
+    return make_slow_session_factory(tmp_path / "products.db")
+
+
+def run_burst(target, count: int = BURST) -> List[Any]:
+    """Start ``count`` threads at once and collect their results or exceptions."""
+    barrier = threading.Barrier(count)
+    results: List[Any] = []
+
+    def worker() -> None:
+        barrier.wait()
+        try:
+            results.append(target())
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_sync_lookups_share_one_query(slow_session_factory) -> None:
+    """Test that a burst of identical product lookups runs a single query."""
+    factory, statements = slow_session_factory
+
+    def lookup() -> Product:
+        with factory() as db:
+            return crud_product.read_product(db, 1)
+
+    results = run_burst(lookup)
+
+    assert len(statements) == 1
+    assert {product.name for product in results} == {"Viral Product"}
+
+
+def test_lookups_are_shared_per_database(tmp_path: Path) -> None:
+    """Test that primary and replica lookups of one product are not shared."""
+    primary, primary_statements = make_slow_session_factory(tmp_path / "p.db", 100)
+    replica, replica_statements = make_slow_session_factory(tmp_path / "r.db", 90)
+    counter = iter(range(BURST))
+
+    def lookup() -> tuple:
+        factory = primary if next(counter) % 2 else replica
+        with factory() as db:
+            return (db.get_bind(), crud_product.read_product(db, 1))
+
+    results = run_burst(lookup)
+
+    assert len(primary_statements) == len(replica_statements) == 1
+    assert {(bind, product.stock) for bind, product in results} == {
+        (primary.kw["bind"], 100),
+        (replica.kw["bind"], 90),
+    }
+
+
+def test_errors_reach_every_waiter(slow_session_factory) -> None:
+    """Test that a failed lookup raises the same error for every waiter."""
+    factory, statements = slow_session_factory
+
+    def lookup() -> Product:
+        with factory() as db:
+            return crud_product.read_product(db, 999)
+
+    results = run_burst(lookup)
+
+    assert len(statements) == 1
+    assert all(isinstance(result, ProductNotFoundException) for result in results)
+
+
+def test_no_reuse_after_completion(slow_session_factory) -> None:
+    """Test that sequential lookups each run their own query."""
+    factory, statements = slow_session_factory
+    with factory() as db:
+        crud_product.read_product(db, 1)
+        crud_product.read_product(db, 1)
+    assert len(statements) == 2
+
+
+def test_waiters_give_up_after_timeout() -> None:
+    """Test that waiters run their own call once the maximum wait has passed."""
+    flight = SingleFlight(timeout=0.01)
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("key", release.wait))
+    leader.start()
+    time.sleep(0.01)
+
+    assert flight.do("key", lambda: "own result") == "own result"
+    release.set()
+    leader.join()
+
+
+def test_async_lookups_share_one_query(slow_session_factory) -> None:
+    """Test that concurrent async lookups of one product run a single query."""
+    factory, statements = slow_session_factory
+
+    async def burst() -> List[Product]:
+        sessions = [factory() for _ in range(BURST)]
+        try:
+            return await asyncio.gather(
+                *(crud_product.read_product_async(db, 1) for db in sessions)
+            )
+        finally:
+            for db in sessions:
+                db.close()
+
+    results = asyncio.run(burst())
+
+    assert len(statements) == 1
+    assert {product.name for product in results} == {"Viral Product"}
+
+
+def test_get_product_endpoint(client: TestClient, sample_products: List[Any]) -> None:
+    """Test retrieving a single product and a missing one."""
+    response = client.get(f"/api/v1/products/{sample_products[0].id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["name"] == "Test Product 1"
+
+    response = client.get("/api/v1/products/999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
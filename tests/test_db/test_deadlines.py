@@ -0,0 +1,160 @@
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker
+
+from app.config import get_settings
+from app.middleware.deadline import (
+    DeadlineMiddleware,
+    deadline_exceeded_handler,
+    route_timeouts,
+)
+
+# Takes far longer than any test timeout unless it is interrupted
+SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c "
+    "WHERE x < 1000000000) SELECT count(*) FROM c"
+)
+
+
+@pytest.fixture
+def slow_app(tmp_path: Path):
+    """App with one slow endpoint on a single-connection pool."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'slow.db'}",
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0,
+    )
+    session_factory = sessionmaker(bind=engine)
+    application = FastAPI()
+
+    @application.get("/slow")
+    def slow():
+        with session_factory() as db:
+            return {"count": db.execute(SLOW_QUERY).scalar()}
+
+    application.add_exception_handler(DBAPIError, deadline_exceeded_handler)
+    application.add_middleware(
+        DeadlineMiddleware,
+        default_timeout=30,
+        route_timeouts={"GET /slow": 20, "GET /": 25},
+    )
+    return application, engine
+
+
+def test_timeout_for_route_and_header() -> None:
+    """Test that the most specific route wins and clients can only shorten it."""
+    middleware = DeadlineMiddleware(
+        None, default_timeout=10, route_timeouts={"GET /api": 5, "GET /api/v1/x": 2}
+    )
+
+    def scope(path: str, header: str = None) -> dict:
+        headers = [(b"x-request-timeout", header.encode())] if header else []
+        return {"type": "http", "method": "GET", "path": path, "headers": headers}
+
+    assert middleware.timeout_for(scope("/health")) == 10
+    assert middleware.timeout_for(scope("/api/v1/products")) == 5
+    assert middleware.timeout_for(scope("/api/v1/x/1")) == 2
+    assert middleware.timeout_for(scope("/api/v1/products", "1.5")) == 1.5
+    assert middleware.timeout_for(scope("/api/v1/products", "60")) == 5
+
+
+def test_adjustments_have_their_own_deadline() -> None:
+    """Test that bulk adjustments outlast the default unless configured otherwise."""
+    settings = get_settings().model_copy(
+        update={"REQUEST_TIMEOUT_SECONDS": 10, "STOCK_ADJUSTMENT_TIMEOUT_SECONDS": 120}
+    )
+    middleware = DeadlineMiddleware(
+        None, default_timeout=10, route_timeouts=route_timeouts(settings)
+    )
+
+    def scope(method: str, path: str) -> dict:
+        return {"type": "http", "method": method, "path": path, "headers": []}
+
+    assert middleware.timeout_for(scope("POST", "/api/v1/products/adjustments")) == 120
+    assert middleware.timeout_for(scope("POST", "/api/v1/orders/")) == 10
+
+    override = {"POST /api/v1/products/adjustments": 300}
+    settings = settings.model_copy(update={"ROUTE_TIMEOUTS": override})
+    assert route_timeouts(settings) == override
+
+
+def test_deadline_cancels_query(slow_app) -> None:
+    """Test that a missed deadline cancels the query and answers 504."""
+    application, engine = slow_app
+    start = time.monotonic()
+    with TestClient(application) as client:
+        response = client.get("/slow", headers={"X-Request-Timeout": "0.3"})
+
+    assert response.status_code == 504
+    assert time.monotonic() - start < 5
+    assert engine.pool.checkedout() == 0
+
+
+def test_client_disconnect_frees_connection(slow_app) -> None:
+    """Test that a client giving up returns the pool connection promptly."""
+    application, engine = slow_app
+    sent = []
+
+    async def receive() -> dict:
+        if not sent:
+            sent.append("request")
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(0.2)
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        pass
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/slow",
+        "raw_path": b"/slow",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+
+    async def run() -> float:
+        start = time.monotonic()
+        await application(scope, receive, send)
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+
+    assert elapsed < 5
+    assert engine.pool.checkedout() == 0
+
+
+def test_disconnect_polls_do_not_leak_tasks() -> None:
+    """Test that cancelled receives clean up after themselves and keep messages."""
+    application = FastAPI()
+
+    @application.post("/poll")
+    async def poll(request: Request):
+        body = await request.body()
+        before = len(asyncio.all_tasks())
+        for _ in range(100):
+            await request.is_disconnected()
+        await asyncio.sleep(0)
+        return {"body": body.decode(), "leaked": len(asyncio.all_tasks()) - before}
+
+    application.add_middleware(DeadlineMiddleware, default_timeout=30)
+    with TestClient(application) as client:
+        response = client.post("/poll", content=b"payload")
+
+    assert response.json()["body"] == "payload"
+    assert response.json()["leaked"] <= 0
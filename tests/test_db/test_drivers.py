@@ -0,0 +1,17 @@
+from app.config import _Settings
+from app.db.database import driver_connect_args
+
+
+def test_db_url_uses_selected_driver() -> None:
+    """Test that DB_DRIVER picks the dialect driver of the database URL."""
+    assert _Settings().db_url.startswith("postgresql+psycopg2://")
+    assert _Settings(DB_DRIVER="psycopg").db_url.startswith("postgresql+psycopg://")
+
+
+def test_prepare_threshold_only_for_psycopg() -> None:
+    """Test that only psycopg connections get the prepared statement threshold."""
+    assert driver_connect_args("postgresql+psycopg://u:p@db/shop") == {
+        "prepare_threshold": 5
+    }
+    assert driver_connect_args("postgresql+psycopg2://u:p@db/shop") == {}
+    assert driver_connect_args("sqlite://") == {}
@@ -0,0 +1,154 @@
+import threading
+from argparse import Namespace
+from pathlib import Path
+
+import sqlalchemy as sa
+
+from alembic.command import upgrade
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from app.db import migrations
+
+ALEMBIC_DIR = Path(__file__).resolve().parents[2] / "alembic"
+
+
+def alembic_config(url: str) -> Config:
+    """Alembic config for the given database, leaving logging untouched."""
+    config = Config(cmd_opts=Namespace(x=[f"db_url={url}"]))
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    return config
+
+
+def index_names(engine, table: str) -> set:
+    return {index["name"] for index in sa.inspect(engine).get_indexes(table)}
+
+
+def test_migration_with_concurrent_writer(tmp_path: Path) -> None:
+    """Test that indexes are added to a seeded database while orders keep coming in."""
+    url = f"sqlite:///{tmp_path / 'shop.db'}"
+    config = alembic_config(url)
+    upgrade(config, "9e1b7c3a5f20")
+
+    engine = sa.create_engine(url, connect_args={"timeout": 30})
+    with engine.begin() as connection:
+        connection.execute(
+            sa.text(
+                "INSERT INTO products (name, price, stock, stock_shards, version) "
+                "VALUES (:name, 9.99, 100, 0, :version)"
+            ),
+            [{"name": f"Product {i}", "version": i} for i in range(1, 101)],
+        )
+    assert "ix_order_items_order_id" not in index_names(engine, "order_items")
+
+    stop = threading.Event()
+    placed, errors = [], []
+
+    def place_orders() -> None:
+        while not stop.is_set():
+            try:
+                with engine.begin() as connection:
+                    order_id = connection.execute(
+                        sa.text(
+                            "INSERT INTO orders (status, total_price) "
+                            "VALUES ('pending', 9.99) RETURNING id"
+                        )
+                    ).scalar()
+                    connection.execute(
+                        sa.text(
+                            "INSERT INTO order_items "
+                            "(order_id, product_id, quantity, unit_price) "
+                            "VALUES (:order_id, :product_id, 1, 9.99)"
+                        ),
+                        {"order_id": order_id, "product_id": order_id % 100 + 1},
+                    )
+                placed.append(order_id)
+            except Exception as exc:
+                errors.append(exc)
+                return
+
+    writer = threading.Thread(target=place_orders)
+    writer.start()
+    try:
+        while len(placed) < 20 and writer.is_alive():
+            stop.wait(0.01)
+        before = len(placed)
+        upgrade(config, "head")
+        while len(placed) < before + 20 and writer.is_alive():
+            stop.wait(0.01)
+    finally:
+        stop.set()
+        writer.join()
+
+    assert errors == []
+    assert len(placed) >= before + 20
+    assert {"ix_order_items_order_id", "ix_order_items_product_id"} <= index_names(
+        engine, "order_items"
+    )
+    with engine.connect() as connection:
+        assert connection.execute(
+            sa.text("SELECT count(*) FROM order_items")
+        ).scalar() == len(placed)
+
+
+def test_backfill_in_batches(tmp_path: Path) -> None:
+    """Test that backfills commit each key range on its own and skip filled rows."""
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+    with engine.begin() as connection:
+        connection.execute(sa.text("CREATE TABLE t (id INTEGER PRIMARY KEY, ref TEXT)"))
+        connection.execute(
+            sa.text("INSERT INTO t (id, ref) VALUES (:id, :ref)"),
+            [{"id": i, "ref": "kept" if i == 3 else None} for i in range(1, 26)],
+        )
+
+    statements = []
+    sa.event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        with Operations.context(context), context.begin_transaction():
+            updated = migrations.backfill(
+                "t",
+                {"ref": "'ref-' || id"},
+                where="ref IS NULL",
+                batch_size=10,
+                pause=0,
+            )
+
+    assert updated == 24
+    assert sum(statement.startswith("UPDATE t") for statement in statements) == 3
+    with engine.connect() as connection:
+        refs = dict(connection.execute(sa.text("SELECT id, ref FROM t")).all())
+    assert refs[1] == "ref-1"
+    assert refs[3] == "kept"
+    assert refs[25] == "ref-25"
+
+
+def test_product_versions_backfilled(tmp_path: Path) -> None:
+    """Test that existing products get versions, NOT NULL and an index on upgrade."""
+    url = f"sqlite:///{tmp_path / 'shop.db'}"
+    config = alembic_config(url)
+    upgrade(config, "4c2f9a7d1e3b")
+    engine = sa.create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(
+            sa.text(
+                "INSERT INTO products (name, price, stock, stock_shards) "
+                "VALUES (:name, 9.99, 1, 0)"
+            ),
+            [{"name": f"Product {i}"} for i in range(3)],
+        )
+
+    upgrade(config, "9e1b7c3a5f20")
+
+    with engine.connect() as connection:
+        versions = connection.execute(
+            sa.text("SELECT id, version FROM products ORDER BY id")
+        ).all()
+    assert [version for _, version in versions] == [id_ for id_, _ in versions]
+    columns = {c["name"]: c for c in sa.inspect(engine).get_columns("products")}
+    assert columns["version"]["nullable"] is False
+    assert "ix_products_version" in index_names(engine, "products")
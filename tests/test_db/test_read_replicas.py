@@ -0,0 +1,162 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+from fastapi import Request, status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.products import product_list_cache
+from app.db import database
+from app.db.database import Base, ReplicaPool, get_db, get_read_db
+from app.main import app
+from app.middleware.deadline import RequestDeadline, current_deadline
+from app.models.product import Product
+
+
+def make_sqlite_db(path: Path, product_name: str) -> Engine:
+    """Create a SQLite file standing in for a database node, seeded with one product."""
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Product(name=product_name, price=1.0, stock=1))
+    session.commit()
+    session.close()
+    return engine
+
+
+@pytest.fixture
+def replica_engines(tmp_path: Path) -> List[Engine]:
+    """Three SQLite files acting as replicas."""
+    return [
+        make_sqlite_db(tmp_path / f"replica_{i}.db", f"replica-{i}") for i in range(3)
+    ]
+
+
+@pytest.fixture
+def replica_client(tmp_path: Path, replica_engines: List[Engine], monkeypatch):
+    """
+    Test client whose primary and replicas are separate SQLite files.
+    """
+    primary = make_sqlite_db(tmp_path / "primary.db", "primary")
+    monkeypatch.setattr(
+        database,
+        "SessionLocal",
+        sessionmaker(autocommit=False, autoflush=False, bind=primary),
+    )
+    pool = ReplicaPool(replica_engines)
+    monkeypatch.setattr(database, "get_replicas", lambda: pool)
+    # Every request must reach a database for the routing to be observable
+    monkeypatch.setattr(product_list_cache, "ttl", 0)
+
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_read_db, None)
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides = overrides
+
+
+def test_round_robin(replica_engines: List[Engine]) -> None:
+    """Test that round robin cycles through every replica."""
+    pool = ReplicaPool(replica_engines)
+    picked = []
+    for _ in range(6):
+        index = pool.acquire()
+        picked.append(index)
+        pool.release(index)
+    assert picked == [0, 1, 2, 0, 1, 2]
+
+
+def test_least_connections(replica_engines: List[Engine]) -> None:
+    """Test that least connections prefers the replica with fewest open sessions."""
+    pool = ReplicaPool(replica_engines, strategy="least_connections")
+    first = pool.acquire()
+    second = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() == first
+    assert second != first
+
+
+def test_unhealthy_replica_is_skipped(tmp_path: Path, replica_engines) -> None:
+    """Test that a replica failing its health check is marked down and skipped."""
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    pool = ReplicaPool([broken, *replica_engines], retry_seconds=0)
+
+    assert pool.check_health(0) is False
+    assert not pool.is_up(0)
+
+    picked = set()
+    for _ in range(6):
+        index = pool.acquire()
+        picked.add(index)
+        pool.release(index)
+    assert 0 not in picked
+
+
+def test_all_replicas_down(replica_engines: List[Engine]) -> None:
+    """Test that acquire returns None when no replica is available."""
+    pool = ReplicaPool(replica_engines, retry_seconds=60)
+    for index in range(len(replica_engines)):
+        pool.mark_down(index)
+    assert pool.acquire() is None
+
+
+def test_reads_are_served_by_replicas(replica_client: TestClient) -> None:
+    """Test that product listing reads go to the replicas in turn."""
+    names = [
+        replica_client.get("/api/v1/products/").json()[0]["name"] for _ in range(3)
+    ]
+    assert names == ["replica-0", "replica-1", "replica-2"]
+
+
+def test_read_your_writes(replica_client: TestClient) -> None:
+    """Test that a client reads from the primary right after a write."""
+    product_data: dict[str, Any] = {"name": "New", "price": 2.5, "stock": 3}
+    response = replica_client.post("/api/v1/products/", json=product_data)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert database.READ_YOUR_WRITES_COOKIE in response.cookies
+
+    names = [p["name"] for p in replica_client.get("/api/v1/products/").json()]
+    assert names == ["primary", "New"]
+
+
+def test_cancelled_read_keeps_replica_up(replica_engines, monkeypatch) -> None:
+    """Test that a deadline cancelling a replica read does not mark it down."""
+    pool = ReplicaPool(replica_engines, retry_seconds=60)
+    monkeypatch.setattr(database, "get_replicas", lambda: pool)
+    request = Request({"type": "http", "headers": []})
+    slow_query = text(
+        "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c "
+        "WHERE x < 1000000000) SELECT count(*) FROM c"
+    )
+
+    deadline = RequestDeadline(30)
+    token = current_deadline.set(deadline)
+    timer = threading.Timer(0.2, deadline.cancel)
+    try:
+        reads = get_read_db(request)
+        db = next(reads)
+        timer.start()
+        with pytest.raises(OperationalError) as cancelled:
+            db.execute(slow_query)
+        with pytest.raises(OperationalError):
+            reads.throw(cancelled.value)
+    finally:
+        timer.cancel()
+        current_deadline.reset(token)
+    assert pool.is_up(0)
+
+    reads = get_read_db(request)
+    next(reads)
+    lost = OperationalError("SELECT 1", {}, sqlite3.OperationalError("disk I/O error"))
+    with pytest.raises(OperationalError):
+        reads.throw(lost)
+    assert not pool.is_up(1)
@@ -0,0 +1,106 @@
+import sqlite3
+from typing import Any, List
+
+import pytest
+from sqlalchemy import event, update
+from sqlalchemy.exc import OperationalError
+
+from app.crud import order as crud_order
+from app.crud import product as crud_product
+from app.db import events
+from app.exceptions.http_exceptions import InsufficientStockException
+from app.middleware.deadline import current_deadline
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.schemas.order import OrderCreate
+
+
+def count_statements(test_db, order: OrderCreate) -> int:
+    """Place an order and count the statements sent to the database."""
+    statements = []
+    engine = test_db.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        crud_order.create_order(test_db, order)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(statements)
+
+
+def test_statements_do_not_grow_with_items(
+    test_db, sample_products: List[Product]
+) -> None:
+    """Test that an order costs the same number of statements for any item count."""
+    one = OrderCreate(items=[{"product_id": sample_products[0].id, "quantity": 1}])
+    two = OrderCreate(
+        items=[
+            {"product_id": sample_products[0].id, "quantity": 1},
+            {"product_id": sample_products[1].id, "quantity": 1},
+        ]
+    )
+
+    assert count_statements(test_db, one) == count_statements(test_db, two)
+
+
+def test_stock_taken_concurrently(test_db, sample_products: List[Product]) -> None:
+    """Test that stock taken after the check fails the whole order."""
+    product, other = sample_products[0], sample_products[1]
+    order = OrderCreate(
+        items=[
+            {"product_id": other.id, "quantity": 1},
+            {"product_id": product.id, "quantity": 5},
+        ]
+    )
+    products = crud_product.get_products_by_ids(test_db, [product.id, other.id])
+
+    def drained(db, product_ids):
+        # Another order empties the product right after it was read
+        test_db.execute(update(Product).where(Product.id == product.id).values(stock=2))
+        return products
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(crud_order, "get_products_by_ids", drained)
+        with pytest.raises(InsufficientStockException):
+            crud_order.create_order(test_db, order)
+
+    test_db.expire_all()
+    assert test_db.get(Product, other.id).stock == 5
+    assert test_db.query(Order).count() == test_db.query(OrderItem).count() == 0
+
+
+def test_take_stock_publishes_changes(
+    test_db, sample_products: List[Product], monkeypatch
+) -> None:
+    """Test that stock taken in bulk reaches the commit hooks with its version."""
+    published = []
+    monkeypatch.setitem(events._callbacks, "products", [published.append])
+    ids = [product.id for product in sample_products]
+
+    remaining = crud_product.take_stock(test_db, {ids[0]: 4, ids[1]: 9})
+    test_db.commit()
+
+    assert remaining == {ids[0]: 6}
+    assert published[-1][ids[0]]["stock"] == 6
+    assert published[-1][ids[0]]["version"] > sample_products[2].version
+
+
+def test_cancelled_order_times_out(
+    client: Any, sample_products: List[Product], monkeypatch
+) -> None:
+    """Test that an order cancelled by the request deadline answers 504, not 400."""
+
+    def interrupted(db, quantities):
+        # What a deadline passing in the middle of the stock UPDATE looks like
+        current_deadline.get().cancel()
+        raise OperationalError(
+            "UPDATE products", {}, sqlite3.OperationalError("interrupted")
+        )
+
+    monkeypatch.setattr(crud_order, "take_stock", interrupted)
+    response = client.post(
+        "/api/v1/orders/",
+        json={"items": [{"product_id": sample_products[0].id, "quantity": 1}]},
+    )
+
+    assert response.status_code == 504
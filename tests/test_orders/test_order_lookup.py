@@ -0,0 +1,161 @@
+import time
+from typing import Any, List
+
+from fastapi import status
+from sqlalchemy import event, update
+
+from app.api.routes.orders import completed_order_cache, pending_order_cache
+from app.crud import order as crud_order
+from app.models.order import Order, OrderStatus
+from app.models.product import Product
+
+
+def place_order(client: Any, products: List[Product]) -> dict:
+    response = client.post(
+        "/api/v1/orders/",
+        json={
+            "items": [
+                {"product_id": products[0].id, "quantity": 1},
+                {"product_id": products[1].id, "quantity": 2},
+            ]
+        },
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()
+
+
+class StatementCounter:
+    """Count the statements sent to the test database inside a with block."""
+
+    def __init__(self, test_db):
+        self.engine = test_db.get_bind()
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, *args) -> None:
+        self.statements.append(statement)
+
+    def __enter__(self) -> "StatementCounter":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def test_get_order_by_id_and_reference(
+    client: Any, sample_products: List[Product]
+) -> None:
+    """Test that orders can be looked up by ID and, case-insensitively, reference."""
+    placed = place_order(client, sample_products)
+    assert placed["reference"].startswith("ORD-")
+
+    by_id = client.get(f"/api/v1/orders/{placed['id']}")
+    by_reference = client.get(
+        f"/api/v1/orders/by-reference/{placed['reference'].lower()}"
+    )
+
+    assert by_id.status_code == by_reference.status_code == status.HTTP_200_OK
+    assert by_id.json() == by_reference.json() == placed
+    assert [item["quantity"] for item in by_id.json()["items"]] == [1, 2]
+
+    assert client.get("/api/v1/orders/999").status_code == status.HTTP_404_NOT_FOUND
+    response = client.get("/api/v1/orders/by-reference/ORD-MISSING")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_items_load_in_the_same_query(
+    client: Any, test_db, sample_products: List[Product]
+) -> None:
+    """Test that an order and its items are read with a single statement."""
+    placed = place_order(client, sample_products)
+    test_db.expunge_all()
+
+    with StatementCounter(test_db) as counter:
+        order = crud_order.get_order(test_db, placed["id"])
+        assert len(order.items) == 2
+
+    assert len(counter.statements) == 1
+
+
+def test_completed_orders_are_cached(
+    client: Any, test_db, sample_products: List[Product]
+) -> None:
+    """Test that completed orders are served from memory without database reads."""
+    placed = place_order(client, sample_products)
+    response = client.patch(
+        f"/api/v1/orders/{placed['id']}", json={"status": OrderStatus.COMPLETED.value}
+    )
+    assert response.json()["status"] == OrderStatus.COMPLETED.value
+
+    first = client.get(f"/api/v1/orders/{placed['id']}")
+    with StatementCounter(test_db) as counter:
+        second = client.get(f"/api/v1/orders/{placed['id']}")
+
+    assert counter.statements == []
+    assert second.content == first.content
+    assert completed_order_cache.stats()["entries"] == 1
+    assert pending_order_cache.stats()["entries"] == 0
+
+
+def test_pending_order_dropped_on_status_change(
+    client: Any, sample_products: List[Product]
+) -> None:
+    """Test that a cached pending order is replaced once its status changes."""
+    placed = place_order(client, sample_products)
+    url = f"/api/v1/orders/by-reference/{placed['reference']}"
+    assert client.get(url).json()["status"] == OrderStatus.PENDING.value
+    assert pending_order_cache.stats()["entries"] == 1
+
+    client.patch(
+        f"/api/v1/orders/{placed['id']}", json={"status": OrderStatus.COMPLETED.value}
+    )
+
+    assert client.get(url).json()["status"] == OrderStatus.COMPLETED.value
+    assert pending_order_cache.stats()["entries"] == 0
+
+
+def test_pending_orders_expire(
+    client: Any, test_db, sample_products: List[Product], monkeypatch
+) -> None:
+    """Test that pending orders changed elsewhere are only served until they expire."""
+    monkeypatch.setattr(pending_order_cache, "ttl", 0.2)
+    placed = place_order(client, sample_products)
+    url = f"/api/v1/orders/{placed['id']}"
+    client.get(url)
+
+    # Another worker's change fires no commit callback here
+    test_db.execute(update(Order).values(status=OrderStatus.COMPLETED.value))
+    test_db.commit()
+
+    assert client.get(url).json()["status"] == OrderStatus.PENDING.value
+    time.sleep(0.25)
+    assert client.get(url).json()["status"] == OrderStatus.COMPLETED.value
+
+
+def test_completed_orders_cannot_change(
+    client: Any, sample_products: List[Product]
+) -> None:
+    """Test that the status of a completed order is final."""
+    placed = place_order(client, sample_products)
+    url = f"/api/v1/orders/{placed['id']}"
+    client.patch(url, json={"status": OrderStatus.COMPLETED.value})
+
+    response = client.patch(url, json={"status": OrderStatus.PENDING.value})
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert client.patch("/api/v1/orders/999", json={}).status_code == 404
+
+
+def test_order_cache_counts_hits_and_misses(
+    client: Any, sample_products: List[Product]
+) -> None:
+    """Test that order lookups show up in the hit and miss counters."""
+    placed = place_order(client, sample_products)
+    before = pending_order_cache.stats()
+
+    for _ in range(3):
+        client.get(f"/api/v1/orders/{placed['id']}")
+
+    after = pending_order_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 2
@@ -0,0 +1,139 @@
+import pytest
+from fastapi import status
+
+from app.api.routes import products as product_routes
+from app.cache import catalog_snapshot as snapshot_module
+from app.cache.catalog_snapshot import CatalogSnapshot
+from app.crud import product as crud_product
+from app.models.product import Product
+
+SEARCHES = [
+    {},
+    {"min_price": 20, "max_price": 40},
+    {"min_stock": 1, "sort": "-price"},
+    {"sort": "stock", "limit": 3},
+    {"sort": "-stock", "skip": 2, "limit": 4},
+    {"max_price": 25, "sort": "price"},
+]
+
+
+@pytest.fixture
+def catalog(test_db):
+    """Products with repeated prices and stock levels, so sorts have ties."""
+    products = [
+        Product(name=f"Item {i}", price=10.0 + (i % 4) * 10, stock=i % 3)
+        for i in range(1, 13)
+    ]
+    test_db.add_all(products)
+    test_db.commit()
+    return products
+
+
+@pytest.fixture
+def snapshot(monkeypatch) -> CatalogSnapshot:
+    """Enable a fresh snapshot that refreshes on every read."""
+    fresh = CatalogSnapshot(max_age=0)
+    monkeypatch.setattr(product_routes, "catalog_snapshot", fresh)
+    return fresh
+
+
+@pytest.mark.parametrize("params", SEARCHES)
+def test_snapshot_search_matches_sql(
+    client, test_db, catalog, snapshot, params
+) -> None:
+    """Test that snapshot searches return the same page as the SQL query."""
+    response = client.get("/api/v1/products/search", params=params)
+
+    assert response.status_code == status.HTTP_200_OK
+    expected = crud_product.search_products(test_db, **params)
+    assert [p["id"] for p in response.json()] == [p.id for p in expected]
+
+
+@pytest.mark.parametrize("params", SEARCHES)
+def test_array_fallback_matches_numpy(test_db, catalog, monkeypatch, params) -> None:
+    """Test that the pure Python columns give the same results as NumPy."""
+    with_numpy = CatalogSnapshot()
+    with_numpy.refresh(test_db)
+    monkeypatch.setattr(snapshot_module, "np", None)
+    without_numpy = CatalogSnapshot()
+    without_numpy.refresh(test_db)
+
+    assert without_numpy.search(**params) == with_numpy.search(**params)
+    cart = [(1, 2), (5, 1), (999, 1)]
+    assert without_numpy.quote(cart) == with_numpy.quote(cart)
+
+
+def test_snapshot_follows_changes(client, test_db, catalog, snapshot) -> None:
+    """Test that refreshes pick up updated and newly created products."""
+    client.get("/api/v1/products/search")
+    crud_product.update_product_stock(test_db, catalog[0].id, 50)
+    test_db.add(Product(name="New", price=99.0, stock=7))
+    test_db.commit()
+
+    response = client.get(
+        "/api/v1/products/search", params={"sort": "-stock", "limit": 2}
+    )
+
+    assert [(p["name"], p["stock"]) for p in response.json()] == [
+        ("Item 1", 51),
+        ("New", 7),
+    ]
+    assert len(snapshot) == 13
+
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_quote_cart(client, catalog, monkeypatch, enabled) -> None:
+    """Test that carts are priced with availability and unknown products listed."""
+    snapshot = CatalogSnapshot() if enabled else None
+    monkeypatch.setattr(product_routes, "catalog_snapshot", snapshot)
+
+    response = client.post(
+        "/api/v1/products/quote",
+        json={
+            "items": [
+                {"product_id": 1, "quantity": 3},
+                {"product_id": 2, "quantity": 2},
+                {"product_id": 999, "quantity": 1},
+            ]
+        },
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    quote = response.json()
+    assert [
+        (line["product_id"], line["line_total"], line["available"])
+        for line in quote["items"]
+    ] == [(1, 60.0, False), (2, 60.0, True)]
+    assert quote["total"] == 120.0
+    assert quote["missing"] == [999]
+
+
+def test_search_rejects_unknown_sort(client) -> None:
+    """Test that only price and stock can be sorted on."""
+    response = client.get("/api/v1/products/search", params={"sort": "name"})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_snapshot_drops_deleted_products(
+    client, test_db, catalog, snapshot, monkeypatch, numpy
+) -> None:
+    """Test that refreshes drop products whose tombstone appeared."""
+    if not numpy:
+        monkeypatch.setattr(snapshot_module, "np", None)
+        monkeypatch.setattr(product_routes, "catalog_snapshot", CatalogSnapshot(0))
+    client.get("/api/v1/products/search")
+    for product in (catalog[0], catalog[5]):
+        response = client.delete(f"/api/v1/products/{product.id}")
+        assert response.status_code == status.HTTP_200_OK
+
+    response = client.get("/api/v1/products/search")
+    quote = client.post(
+        "/api/v1/products/quote",
+        json={"items": [{"product_id": catalog[0].id, "quantity": 1}]},
+    )
+
+    expected = [p.id for p in catalog if p.id not in (catalog[0].id, catalog[5].id)]
+    assert [p["id"] for p in response.json()] == expected
+    assert quote.json()["missing"] == [catalog[0].id]
@@ -0,0 +1,92 @@
+from typing import Any, List
+
+from fastapi import status
+from sqlalchemy import event
+
+from app.crud import product as crud_product
+from app.models.product import Product
+
+
+def count_queries(test_db, send) -> tuple:
+    """Send a request and count the statements it ran."""
+    statements = []
+    engine = test_db.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = send()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return response, len(statements)
+
+
+def test_batch_preserves_order(client: Any, sample_products: List[Product]) -> None:
+    """Test that products come back in request order with missing IDs reported."""
+    first, second, third = (product.id for product in sample_products)
+
+    response = client.get(
+        "/api/v1/products/batch", params={"ids": f"{third},999,{first},{third}"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    batch = response.json()
+    assert [p["id"] for p in batch["products"]] == [third, first]
+    assert batch["products"][0]["name"] == "Test Product 3"
+    assert batch["missing"] == [999]
+
+
+def test_batch_repeated_ids(client: Any, sample_products: List[Product]) -> None:
+    """Test that IDs may be repeated query values as well as comma separated."""
+    ids = [str(product.id) for product in sample_products]
+
+    response = client.get(
+        "/api/v1/products/batch", params=[("ids", ids[1]), ("ids", f"{ids[0]},")]
+    )
+
+    assert [p["id"] for p in response.json()["products"]] == [
+        int(ids[1]),
+        int(ids[0]),
+    ]
+
+
+def test_batch_post(client: Any, sample_products: List[Product]) -> None:
+    """Test that the POST variant takes the IDs from the body."""
+    ids = [product.id for product in reversed(sample_products)]
+
+    response = client.post("/api/v1/products/batch", json={"ids": ids})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [p["id"] for p in response.json()["products"]] == ids
+
+
+def test_batch_rejects_bad_ids(client: Any) -> None:
+    """Test that malformed, empty and oversized batches are rejected."""
+    for params in ({"ids": "1,x"}, {"ids": ","}, {}):
+        response = client.get("/api/v1/products/batch", params=params)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = client.post("/api/v1/products/batch", json={"ids": list(range(1, 1002))})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_batch_uses_one_query_and_the_cache(
+    client: Any, test_db, sample_products: List[Product]
+) -> None:
+    """Test that a batch costs one query, is cached and refreshed on changes.
+
+    The first request also reads the catalog version the entry is keyed by.
+    """
+    ids = ",".join(str(product.id) for product in sample_products)
+
+    def send():
+        return client.get("/api/v1/products/batch", params={"ids": ids})
+
+    response, queries = count_queries(test_db, send)
+    assert queries == 2
+    _, queries = count_queries(test_db, send)
+    assert queries == 0
+
+    crud_product.update_product_stock(test_db, sample_products[0].id, 7)
+
+    response = send()
+    assert response.json()["products"][0]["stock"] == 17
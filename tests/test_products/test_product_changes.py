@@ -0,0 +1,149 @@
+import datetime
+from typing import Any, List
+
+from fastapi import status
+from sqlalchemy import update
+
+from app.crud import product as crud_product
+from app.crud.stock_shard import set_stock_shards
+from app.models.product import Product, ProductTombstone
+from app.schemas.product import ProductUpdate
+
+
+def backdate(test_db, seconds: float = 3600) -> None:
+    """Age every product and tombstone past the change feed's settle time."""
+    past = datetime.datetime.now(datetime.UTC) - datetime.timedelta(seconds=seconds)
+    test_db.execute(update(Product).values(updated_at=past))
+    test_db.execute(update(ProductTombstone).values(created_at=past))
+    test_db.commit()
+
+
+def test_timestamps_are_set_per_row(test_db, sample_products: List[Product]) -> None:
+    """Test that updated_at is taken when a row is written, not at import time."""
+    product = sample_products[0]
+    created = product.updated_at
+
+    crud_product.update_product(test_db, product.id, ProductUpdate(price=5.0))
+
+    assert product.updated_at > created
+    assert product.created_at <= created
+
+
+def test_versions_increase_with_every_write(
+    test_db, sample_products: List[Product]
+) -> None:
+    """Test that every insert and update draws a new, higher version."""
+    versions = [product.version for product in sample_products]
+    assert versions == sorted(set(versions))
+
+    product = crud_product.update_product_stock(test_db, sample_products[0].id, 1)
+
+    assert product.version > max(versions)
+
+
+def test_changes_since(test_db, sample_products: List[Product]) -> None:
+    """Test that only rows changed after the given version are returned."""
+    changed, deleted, since, has_more = crud_product.get_product_changes(test_db)
+    assert [p.id for p in changed] == [p.id for p in sample_products]
+    assert (deleted, has_more) == ([], False)
+
+    crud_product.update_product_stock(test_db, sample_products[1].id, 3)
+    crud_product.delete_product(test_db, sample_products[2].id)
+
+    changed, deleted, next_since, _ = crud_product.get_product_changes(test_db, since)
+    assert [(p.id, p.stock) for p in changed] == [(sample_products[1].id, 8)]
+    assert [t.product_id for t in deleted] == [sample_products[2].id]
+    assert next_since == deleted[0].version
+
+    assert crud_product.get_product_changes(test_db, next_since)[:3] == (
+        [],
+        [],
+        next_since,
+    )
+
+
+def test_changes_are_paged(test_db, sample_products: List[Product]) -> None:
+    """Test that limit pages through the changes in version order."""
+    first, _, since, has_more = crud_product.get_product_changes(test_db, limit=2)
+    assert has_more
+    rest, _, _, has_more = crud_product.get_product_changes(test_db, since, limit=2)
+
+    assert [p.id for p in first + rest] == [p.id for p in sample_products]
+    assert not has_more
+
+
+def test_bulk_update_is_paged_across_a_boundary(
+    test_db, sample_products: List[Product]
+) -> None:
+    """Test that a page ending among the rows of one UPDATE loses none of them."""
+    since = max(product.version for product in sample_products)
+    # One UPDATE over every product
+    backdate(test_db)
+
+    seen, has_more = [], True
+    while has_more:
+        changed, _, since, has_more = crud_product.get_product_changes(
+            test_db, since=since, limit=2
+        )
+        seen.extend(product.id for product in changed)
+
+    assert sorted(seen) == [product.id for product in sample_products]
+
+
+def test_recent_changes_settle(test_db, sample_products: List[Product]) -> None:
+    """Test that changes younger than the settle time are held back."""
+    changed, _, since, _ = crud_product.get_product_changes(test_db, settle_seconds=60)
+    assert (changed, since) == ([], 0)
+
+    backdate(test_db)
+    changed, _, since, _ = crud_product.get_product_changes(test_db, settle_seconds=60)
+    assert len(changed) == 3
+
+
+def test_sharded_orders_are_changes(
+    client: Any, test_db, sample_products: List[Product]
+) -> None:
+    """Test that orders writing only stock shards still show up in the feed."""
+    set_stock_shards(test_db, sample_products[1].id, 4)
+    _, _, since, _ = crud_product.get_product_changes(test_db)
+
+    response = client.post(
+        "/api/v1/orders/",
+        json={"items": [{"product_id": sample_products[1].id, "quantity": 3}]},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    changed, _, next_since, _ = crud_product.get_product_changes(test_db, since)
+    assert [(p.id, p.stock) for p in changed] == [(sample_products[1].id, 2)]
+    assert next_since == changed[0].version > since
+    assert crud_product.get_product_changes(test_db, next_since)[0] == []
+
+
+def test_changes_endpoint(client: Any, test_db, sample_products: List[Any]) -> None:
+    """Test the change feed and the tombstones left by the delete endpoint."""
+    response = client.delete(f"/api/v1/products/{sample_products[0].id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["product_id"] == sample_products[0].id
+    backdate(test_db)
+
+    response = client.get("/api/v1/products/changes", params={"since": 0})
+
+    assert response.status_code == status.HTTP_200_OK
+    feed = response.json()
+    assert [p["id"] for p in feed["changes"]] == [p.id for p in sample_products[1:]]
+    assert [t["product_id"] for t in feed["deleted"]] == [sample_products[0].id]
+    assert feed["has_more"] is False
+
+
+def test_delete_product_in_orders(client: Any, sample_products: List[Any]) -> None:
+    """Test that products referenced by orders cannot be deleted."""
+    client.post(
+        "/api/v1/orders/",
+        json={"items": [{"product_id": sample_products[0].id, "quantity": 1}]},
+    )
+
+    response = client.delete(f"/api/v1/products/{sample_products[0].id}")
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    response = client.delete("/api/v1/products/999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,157 @@
+import asyncio
+import json
+
+from app.api.routes.product_events import broadcaster as product_broadcaster
+from app.broadcast.broadcaster import PRODUCT_EVENT, RESET_EVENT, Broadcaster
+from app.broadcast.bus import _chunk, change_payloads
+from app.crud import product as crud_product
+from app.main import app
+
+
+def test_change_payloads() -> None:
+    """Test that committed rows become compact events."""
+    changes = {
+        2: None,
+        1: {"id": 1, "name": "Widget", "price": 9.99, "stock": 3, "version": 7},
+    }
+
+    assert change_payloads(changes) == [
+        {"id": 1, "stock": 3, "price": 9.99, "version": 7},
+        {"id": 2, "deleted": True},
+    ]
+
+
+def test_notify_messages_are_chunked() -> None:
+    """Test that large change sets are split below the NOTIFY size limit."""
+    payloads = [{"id": i, "stock": i, "price": 1.5} for i in range(2000)]
+
+    messages = _chunk(payloads, 7900)
+
+    assert len(messages) > 1
+    assert all(len(message) <= 7900 for message in messages)
+    assert [p for message in messages for p in json.loads(message)] == payloads
+
+
+def test_fan_out_to_every_subscriber() -> None:
+    """Test that each subscriber receives every published event in order."""
+
+    async def run():
+        broadcaster = Broadcaster()
+        first, second = broadcaster.subscribe(), broadcaster.subscribe()
+        broadcaster.publish([{"id": 1, "stock": 4}, {"id": 2, "stock": 0}])
+        return [
+            [(await s.get(1))["data"]["id"] for _ in range(2)] for s in (first, second)
+        ]
+
+    assert asyncio.run(run()) == [[1, 2], [1, 2]]
+
+
+def test_resume_from_last_event_id() -> None:
+    """Test that reconnecting clients get the events they missed, or a reset."""
+
+    async def run():
+        broadcaster = Broadcaster(history=3)
+        seen = broadcaster.publish([{"id": 1}])[0]["id"]
+        broadcaster.publish([{"id": 2}, {"id": 3}])
+        resumed = broadcaster.subscribe(seen)
+        replayed = [(await resumed.get(1))["data"]["id"] for _ in range(2)]
+
+        broadcaster.publish([{"id": 4}, {"id": 5}])
+        too_old = await broadcaster.subscribe(seen).get(1)
+        unknown = await broadcaster.subscribe("feedbeef-1").get(1)
+        return replayed, too_old["event"], unknown["event"]
+
+    assert asyncio.run(run()) == ([2, 3], RESET_EVENT, RESET_EVENT)
+
+
+def test_resume_on_another_worker() -> None:
+    """Test that an event id issued by one worker resumes the stream on another."""
+
+    async def run():
+        workers = [Broadcaster(), Broadcaster()]
+        for payloads in ([{"id": 1}], [{"id": 2}, {"id": 3}]):
+            # What the postgres bus does: ids issued by the committing worker
+            ids = workers[0].new_event_ids(len(payloads))
+            for broadcaster in workers:
+                broadcaster.publish(payloads, ids=ids)
+        seen = workers[0].last_event_id
+        for broadcaster in workers:
+            broadcaster.publish([{"id": 4}], ids=["feedbeef-9"])
+
+        resumed = workers[1].subscribe(seen)
+        return await resumed.get(1)
+
+    event = asyncio.run(run())
+    assert (event["id"], event["event"], event["data"]) == (
+        "feedbeef-9",
+        PRODUCT_EVENT,
+        {"id": 4},
+    )
+
+
+def test_slow_consumer_is_disconnected() -> None:
+    """Test that a subscriber that falls behind is dropped without blocking others."""
+
+    async def run():
+        broadcaster = Broadcaster(max_pending=2)
+        slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+        for i in range(3):
+            broadcaster.publish([{"id": i}])
+            await fast.get(1)
+        received = [await slow.get(1) for _ in range(3)]
+        return slow.closed, fast.closed, broadcaster.subscriber_count, received
+
+    closed, fast_closed, count, received = asyncio.run(run())
+
+    assert closed and not fast_closed
+    assert count == 1
+    # Queued events are kept, the end-of-stream marker follows them
+    assert [item and item["data"]["id"] for item in received] == [0, 1, None]
+
+
+def test_stream_delivers_committed_stock_changes(sample_products, test_db) -> None:
+    """Test that a committed stock update reaches an event stream subscriber."""
+    product = sample_products[0]
+    since = product_broadcaster.last_event_id
+    version = product.version
+    crud_product.update_product_stock(test_db, product.id, -2)
+
+    messages = []
+    requested = False
+
+    async def receive() -> dict:
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(0.3)
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    path = "/api/v1/product-events/"
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": f"last_event_id={since}".encode() if since else b"",
+        "headers": [(b"accept", b"text/event-stream")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+
+    assert messages[0]["status"] == 200
+    body = b"".join(m.get("body", b"") for m in messages[1:]).decode()
+    assert f"event: {PRODUCT_EVENT}" in body
+    data = json.loads(body.split("data: ", 1)[1].split("\n", 1)[0])
+    assert data["id"] == product.id
+    assert data["stock"] == 8
+    assert data["price"] == product.price
+    assert data["version"] > version
@@ -0,0 +1,104 @@
+from typing import Any, List
+
+from fastapi import status
+
+from app.crud import product as crud_product
+from app.crud.stock_shard import set_stock_shards
+from app.db import events
+from app.models.product import Product
+from app.schemas.product import StockAdjustment
+
+
+def adjust(client: Any, *adjustments: dict) -> Any:
+    return client.post(
+        "/api/v1/products/adjustments", json={"adjustments": list(adjustments)}
+    )
+
+
+def test_adjustments(client: Any, test_db, sample_products: List[Product]) -> None:
+    """Test deltas, absolute stock and prices with per-item outcomes in order."""
+    first, second, third = (product.id for product in sample_products)
+
+    response = adjust(
+        client,
+        {"product_id": third, "stock": 7, "price": 45.5},
+        {"product_id": 999, "stock_delta": 1},
+        {"product_id": first, "stock_delta": -4},
+        {"product_id": second, "stock_delta": -6, "price": 1.0},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert [(r["product_id"], r["status"], r["stock"]) for r in report["results"]] == [
+        (third, "applied", 7),
+        (999, "not_found", None),
+        (first, "applied", 6),
+        (second, "insufficient_stock", 5),
+    ]
+    assert (report["applied"], report["failed"]) == (2, 2)
+
+    test_db.expire_all()
+    stock = {p.id: (p.stock, p.price) for p in test_db.query(Product)}
+    assert stock == {first: (6, 19.99), second: (5, 29.99), third: (7, 45.5)}
+
+
+def test_invalid_adjustments(client: Any, sample_products: List[Product]) -> None:
+    """Test that duplicates, conflicting and empty adjustments are rejected."""
+    product_id = sample_products[0].id
+    for adjustments in (
+        [{"product_id": product_id, "stock": 1}, {"product_id": product_id}],
+        [{"product_id": product_id, "stock": 1, "stock_delta": 1}],
+        [{"product_id": product_id}],
+        [{"product_id": product_id, "stock": -1}],
+        [],
+    ):
+        response = adjust(client, *adjustments)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_adjustments_in_chunks(
+    test_db, sample_products: List[Product], monkeypatch
+) -> None:
+    """Test that every chunk is committed and published on its own."""
+    published = []
+    monkeypatch.setitem(events._callbacks, "products", [published.append])
+    adjustments = [
+        StockAdjustment(product_id=product.id, stock_delta=1)
+        for product in sample_products
+    ]
+
+    results = crud_product.adjust_products(test_db, adjustments, chunk_size=2)
+
+    assert [r["stock"] for r in results] == [11, 6, 1]
+    assert [sorted(changes) for changes in published] == [
+        [sample_products[0].id, sample_products[1].id],
+        [sample_products[2].id],
+    ]
+    assert published[1][sample_products[2].id]["stock"] == 1
+
+
+def test_sharded_adjustments(test_db, sample_products: List[Product]) -> None:
+    """Test that sharded products are adjusted through their shards."""
+    sharded = set_stock_shards(test_db, sample_products[0].id, 4)
+    other = set_stock_shards(test_db, sample_products[1].id, 2)
+    priced = set_stock_shards(test_db, sample_products[2].id, 2)
+
+    results = crud_product.adjust_products(
+        test_db,
+        [
+            StockAdjustment(product_id=sharded.id, stock_delta=-7, price=9.5),
+            StockAdjustment(product_id=other.id, stock_delta=-6),
+            StockAdjustment(product_id=priced.id, price=2.0),
+        ],
+    )
+
+    assert [(r["status"], r["stock"], r["price"]) for r in results] == [
+        ("applied", 3, 9.5),
+        ("insufficient_stock", 5, 29.99),
+        ("applied", 0, 2.0),
+    ]
+    results = crud_product.adjust_products(
+        test_db, [StockAdjustment(product_id=sharded.id, stock=12)]
+    )
+    assert results[0]["stock"] == 12
+    assert crud_product.get_product(test_db, sharded.id).stock == 12
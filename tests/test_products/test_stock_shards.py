@@ -0,0 +1,124 @@
+from typing import Any, List
+
+import pytest
+from fastapi import status
+
+from app.api.routes import products as product_routes
+from app.cache.catalog_snapshot import CatalogSnapshot
+from app.crud import product as crud_product
+from app.crud.stock_shard import rebalance_stock_shards, set_stock_shards, split_stock
+from app.exceptions.http_exceptions import InsufficientStockException
+from app.models.product import Product, ProductStockShard
+from app.schemas.product import ProductUpdate
+
+
+def shard_stock(test_db, product_id: int) -> List[int]:
+    return [
+        shard.stock
+        for shard in test_db.query(ProductStockShard)
+        .filter(ProductStockShard.product_id == product_id)
+        .order_by(ProductStockShard.shard)
+    ]
+
+
+@pytest.fixture
+def sharded_product(test_db, sample_products: List[Product]) -> Product:
+    """The first sample product, 10 in stock, spread over 4 shards."""
+    return set_stock_shards(test_db, sample_products[0].id, 4)
+
+
+def test_split_stock() -> None:
+    """Test that stock is spread evenly with the remainder on the first shards."""
+    assert split_stock(10, 4) == [3, 3, 2, 2]
+    assert split_stock(2, 4) == [1, 1, 0, 0]
+
+
+def test_sharding_keeps_total(test_db, sharded_product: Product) -> None:
+    """Test that sharding a product spreads its stock without changing the total."""
+    assert sharded_product.stock_shards == 4
+    assert shard_stock(test_db, sharded_product.id) == [3, 3, 2, 2]
+
+
+def test_order_takes_stock_from_shards(
+    client: Any, test_db, sharded_product: Product
+) -> None:
+    """Test that orders drain shards and responses report the shard total."""
+    response = client.post(
+        "/api/v1/orders/",
+        json={"items": [{"product_id": sharded_product.id, "quantity": 2}]},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    assert sum(shard_stock(test_db, sharded_product.id)) == 8
+    response = client.get(f"/api/v1/products/{sharded_product.id}")
+    assert response.json()["stock"] == 8
+    listing = client.get("/api/v1/products/").json()
+    assert next(p for p in listing if p["id"] == sharded_product.id)["stock"] == 8
+
+
+def test_order_spanning_shards(client: Any, test_db, sharded_product: Product) -> None:
+    """Test that a quantity no single shard holds is taken from several."""
+    response = client.post(
+        "/api/v1/orders/",
+        json={"items": [{"product_id": sharded_product.id, "quantity": 9}]},
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert shard_stock(test_db, sharded_product.id) == [0, 0, 0, 1]
+
+
+def test_sharded_insufficient_stock(test_db, sharded_product: Product) -> None:
+    """Test that taking more than all shards hold fails and leaves them intact."""
+    with pytest.raises(InsufficientStockException) as error:
+        crud_product.update_product_stock(test_db, sharded_product.id, -11)
+    test_db.rollback()
+
+    assert error.value.available_quantity == 10
+    assert sum(shard_stock(test_db, sharded_product.id)) == 10
+
+
+def test_rebalance_and_unshard(test_db, sharded_product: Product) -> None:
+    """Test that rebalancing evens out shards and unsharding restores the row."""
+    crud_product.update_product_stock(test_db, sharded_product.id, -5)
+
+    product = rebalance_stock_shards(test_db, sharded_product.id)
+    assert product.stock == 5
+    assert shard_stock(test_db, product.id) == [2, 1, 1, 1]
+
+    product = set_stock_shards(test_db, product.id, 0)
+    assert (product.stock, product.stock_shards) == (5, 0)
+    assert shard_stock(test_db, product.id) == []
+
+
+def test_update_sets_sharded_total(test_db, sharded_product: Product) -> None:
+    """Test that setting the stock of a sharded product spreads it over shards."""
+    product = crud_product.update_product(
+        test_db, sharded_product.id, ProductUpdate(stock=6)
+    )
+
+    assert product.stock == 6
+    assert shard_stock(test_db, product.id) == [2, 2, 1, 1]
+
+
+def test_searches_follow_shard_stock(
+    client: Any, test_db, sharded_product: Product, monkeypatch
+) -> None:
+    """Test that snapshot and SQL searches filter and sort on the shard totals."""
+    snapshot = CatalogSnapshot(max_age=0)
+    monkeypatch.setattr(product_routes, "catalog_snapshot", snapshot)
+    client.get("/api/v1/products/search")
+
+    response = client.post(
+        "/api/v1/orders/",
+        json={"items": [{"product_id": sharded_product.id, "quantity": 9}]},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    params = {"min_stock": 2, "sort": "-stock"}
+    from_snapshot = client.get("/api/v1/products/search", params=params).json()
+    from_sql = crud_product.search_products(test_db, **params)
+    assert [(p["id"], p["stock"]) for p in from_snapshot] == [(2, 5)]
+    assert [(p.id, p.stock) for p in from_sql] == [(2, 5)]
+
+    stock = client.get("/api/v1/products/search", params={"sort": "stock"}).json()
+    assert [(p["id"], p["stock"]) for p in stock] == [(3, 0), (1, 1), (2, 5)]